@@ -1,11 +1,15 @@
 #!/usr/bin/env python
 # -*- coding: utf-8 -*-
 import os
+import threading
 import time
+from contextlib import contextmanager
 
 import requests
 
-from .src import endpoints, entities, errors, wrappers
+from .src import breaker, caching, endpoints, entities, errors, paging, ratelimit, schema, util, wrappers
+from .src.profiler import ParseProfiler
+from .src.wrappers import NOT_MODIFIED
 
 def _parse_steam_account(cur_args):
     """steam_account/account_id parse helper"""
@@ -25,12 +29,28 @@ def _parse_hero(cur_args):
     if 'hero' in cur_args:
         cur_args['hero_id'] = cur_args.pop('hero')['hero_id']
 
+def _parse_fields(wrapper_class, cur_args):
+    """fields (projection) parse helper"""
+    fields = cur_args.pop('fields', None)
+    return wrapper_class if fields is None else schema.project(wrapper_class, fields)
+
+def _parse_where(wrapper_class, cur_args):
+    """where (match filter) parse helper"""
+    where = cur_args.pop('where', None)
+    return wrapper_class if where is None else wrappers.filtered(wrapper_class, where)
+
+def _paging_fields(cur_args, required):
+    """Add the attributes needed to request the next page to a projection"""
+    if cur_args.get('fields') is not None:
+        fields = cur_args['fields']
+        cur_args['fields'] = ([fields] if isinstance(fields, str) else list(fields)) + list(required)
+
 def _parse_steam_account_list(cur_args):
     """account_ids/steam_accounts parse helper"""
     account_ids = None
 
     if 'account_ids' in cur_args:
-        account_ids = ','.join([str(entities.SteamAccount(s)['id64']) for s in cur_args.pop('account_ids')])
+        account_ids = ','.join(map(str, entities.steam_ids_to_64(cur_args.pop('account_ids'))))
 
     if 'steam_accounts' in cur_args:
         account_ids = ','.join([str(s['id64']) for s in cur_args.pop('steam_accounts')])
@@ -50,60 +70,312 @@ class APIWrapper:
         set to ``False`` to get an unparsed json string
     requests_per_second : int
         rate limit requests to send requests politely (set to ``-1`` to ignore rate limiting)
+    base_url : str
+        send requests to this host instead of ``https://api.steampowered.com`` (e.g. a :any:`MockServer`)
+    conditional_requests : bool or list(str)
+        set to ``True`` to skip decoding and parsing unchanged responses of live endpoints
+        (``GetTopLiveGame`` and ``GetLiveLeagueGames``), or provide a list of WebAPI method names.
+        ``ETag``/``Last-Modified`` validators are sent when the server provides them, and bodies are
+        compared by hash otherwise. An unchanged response returns the previously returned object.
+    return_not_modified : bool
+        with ``conditional_requests``, return ``d2api.NOT_MODIFIED`` instead of the previous object for unchanged responses
+    keep_raw_json : bool
+        set to ``False`` to not keep the response body in the ``raw_json`` attribute of parsed responses
+    request_timeout : float
+        connect/read timeout (in seconds) of calls made without a ``timeout``
+    lanes : dict, optional
+        weights of the priority lanes sharing the rate limit (see :any:`RateLimiter`), by default
+        ``{'interactive': 9, 'background': 1}``
+    default_lane : str, optional
+        lane of calls made without a ``lane``, by default ``'background'`` (or the lane of lowest weight
+        when there is no such lane). Background refreshes of ``catalog_cache`` also use it.
+    circuit_breaker : bool or CircuitBreaker
+        set to ``True`` (or provide a configured :any:`CircuitBreaker`) to stop calling endpoints that
+        fail repeatedly, raising :any:`APICircuitOpen` without waiting for the rate limit instead
+    catalog_cache : bool or CatalogCache
+        set to ``True`` (or provide a configured :any:`CatalogCache`) to serve :any:`get_heroes` and
+        :any:`get_game_items` from memory, refreshing them in the background. Cached responses are
+        shared between callers and should not be modified.
+
+    Every endpoint method also accepts ``timeout`` (a budget in seconds covering the rate limit wait,
+    the request and parsing, raising :any:`APIDeadlineExceeded` when exceeded), ``cancel``
+    (a :any:`CancelToken`, raising :any:`APICancelled` once cancelled) and ``lane`` (the priority
+    lane waiting for the rate limit, ``default_lane`` by default).
     """
-    def __init__(self, api_key = None, parse_response = True, requests_per_second = 1):
+    def __init__(self, api_key = None, parse_response = True, requests_per_second = 1, base_url = None,
+                 conditional_requests = False, return_not_modified = False, keep_raw_json = True, request_timeout = 60,
+                 lanes = None, default_lane = None, circuit_breaker = False, catalog_cache = False):
         self.api_key = api_key if api_key else os.environ.get('D2_API_KEY')
 
+        self.base_url = base_url.rstrip('/') if base_url else None
+
         self.parse_response = parse_response
+        self.keep_raw_json = keep_raw_json
+
+        # Requests are spaced out to prevent spamming.
+        self._limiter = ratelimit.RateLimiter(requests_per_second, lanes, default_lane)
+        self.request_timeout = request_timeout
+        self._local = threading.local()
+
+        # A shared session reuses connections between requests
+        self._session = requests.Session()
 
-        if requests_per_second > 0:
-            self._interval = 1/requests_per_second
+        self.profiler = None
+
+        if conditional_requests is True:
+            self._conditional = caching.ConditionalCache()
+        elif conditional_requests:
+            self._conditional = caching.ConditionalCache(conditional_requests)
         else:
-            self._interval = 0
-        
-        self._last_request = 0
+            self._conditional = None
+        self.return_not_modified = return_not_modified
 
-    def _api_call(self, url, wrapper_class = lambda x: x, **kwargs):
-        """Helper function to perform WebAPI requests.
+        if circuit_breaker is True:
+            self._breaker = breaker.CircuitBreaker()
+        else:
+            self._breaker = circuit_breaker or None
+
+        if catalog_cache is True:
+            self._catalogs = caching.CatalogCache()
+        else:
+            self._catalogs = catalog_cache or None
+
+        self._hooks = {e: [] for e in ('before_request', 'after_response', 'after_decode', 'after_parse', 'on_error')}
+
+    def add_hook(self, event, func):
+        """Register a function to be called at a stage of every request.
 
         Parameters
         ----------
-        url : string
-            Request url
-        wrapper_class : Class
-            Wrapper class used to parse response
+        event : str
+            One of ``before_request``, ``after_response``, ``after_decode``, ``after_parse`` or ``on_error``
+        func : callable
+            Called with a dict describing the request, containing ``endpoint``, ``url``, ``params``
+            and ``timings`` (seconds spent in ``rate_limit_wait``, ``response``, ``download``,
+            ``decode``, ``parse`` and ``total`` so far). ``status`` and ``bytes`` are added once a
+            response is received, ``not_modified`` if an unchanged response was skipped, and
+            ``error`` is set for ``on_error``.
         """
-        if not 'key' in kwargs:
-            kwargs['key'] = self.api_key
+        if event not in self._hooks:
+            raise ValueError("Unknown hook event \"{}\". Expected one of {}".format(event, sorted(self._hooks)))
+        self._hooks[event].append(func)
 
-        # Maintain time of last request to prevent spamming.
-        if self._interval != 0:
-            remain = self._last_request + self._interval - time.time()
-            if remain > 0:
-                time.sleep(remain)
-            self._last_request = time.time()
+    def remove_hook(self, event, func):
+        """Unregister a function added with :any:`add_hook`."""
+        self._hooks[event].remove(func)
 
-        response = requests.get(url, params = kwargs, timeout = 60)
-        status = response.status_code
+    def _run_hooks(self, event, info):
+        for func in self._hooks[event]:
+            func(info)
 
-        if status == 200:
-            if self.parse_response:
-                current_response = wrapper_class(response.text)
-                current_response.url = response.url
-                return current_response
-            else:
-                return response.text
-        elif status == 403:
+    def enable_profiling(self, sample_rate = 0.01, seed = None):
+        """Profile parsers for a random sample of responses.
+
+        Parameters
+        ----------
+        sample_rate : float
+            Fraction of responses to profile
+        seed : int, optional
+            Seed for the sampling decision
+
+        Returns
+        -------
+        ParseProfiler
+            Profiler holding the statistics (see ``ParseProfiler.report()``)
+        """
+        self.profiler = ParseProfiler(sample_rate, seed)
+        return self.profiler
+
+    def disable_profiling(self):
+        """Stop profiling responses. Returns the profiler, if one was enabled."""
+        profiler, self.profiler = self.profiler, None
+        return profiler
+
+    def _wait_for_slot(self, deadline = None, cancel = None, lane = None):
+        """Block until the rate limit allows another request. Returns the time spent waiting."""
+        return self._limiter.acquire(deadline, cancel, lane)
+
+    def circuit_stats(self):
+        """State of the circuit of every endpoint called (see :any:`CircuitBreaker.stats`)."""
+        return self._breaker.stats() if self._breaker is not None else {}
+
+    def lane_stats(self):
+        """Queue depth and totals of every priority lane (see :any:`RateLimiter.stats`)."""
+        return self._limiter.stats()
+
+    def _read_body(self, response, deadline, cancel):
+        """Download a streamed response body, checking the deadline and cancellation between chunks."""
+        if deadline is None and cancel is None:
+            return response.content
+        chunks = []
+        for chunk in response.iter_content(1 << 16):
+            ratelimit.check(deadline, cancel, 'reading the response')
+            chunks.append(chunk)
+        return b''.join(chunks)
+
+    @contextmanager
+    def _deferred_parsing(self):
+        """Make calls in the current thread return ``(wrapper_class, response_body, url)`` instead of parsing."""
+        self._local.defer_parsing = True
+        try:
+            yield
+        finally:
+            self._local.defer_parsing = False
+
+    def _raise_for_status(self, response, url, params):
+        status = response.status_code
+        if status == 403:
             raise errors.APIAuthenticationError(self.api_key)
         elif status == 404:
             raise errors.APIMethodUnavailable(url)
+        elif status == 429:
+            raise errors.APIRateLimitError()
         elif status == 503: # pragma: no cover
             raise errors.APITimeoutError()
         elif status == 400:
-            raise errors.APIInsufficientArguments(url, kwargs)
-        else: # pragma: no cover
+            raise errors.APIInsufficientArguments(url, params)
+        elif status != 200: # pragma: no cover
             raise errors.BaseError(msg = response.reason)
 
+    def _not_modified(self, cached, info, start):
+        """Finish a call whose response did not change since the previous one."""
+        info['not_modified'] = True
+        info['timings']['total'] = time.perf_counter() - start
+        self._run_hooks('after_parse', info)
+        return NOT_MODIFIED if self.return_not_modified else cached['value']
+
+    def _api_call(self, url, wrapper_class = lambda x: x, **kwargs):
+        """Helper function to perform WebAPI requests.
+
+        Parameters
+        ----------
+        url : string
+            Request url
+        wrapper_class : Class
+            Wrapper class used to parse response
+        timeout : float, optional
+            Budget of the call in seconds (rate limit wait, request and parsing)
+        cancel : CancelToken, optional
+            Token cancelling the call
+        lane : str, optional
+            Priority lane of the call
+        """
+        timeout = kwargs.pop('timeout', None)
+        cancel = kwargs.pop('cancel', None)
+        lane = kwargs.pop('lane', None) or self._limiter.default_lane
+        deadline = time.monotonic() + timeout if timeout is not None else None
+
+        if not 'key' in kwargs:
+            kwargs['key'] = self.api_key
+
+        if self.base_url and url.startswith(endpoints.ROOT_URL):
+            url = self.base_url + url[len(endpoints.ROOT_URL):]
+
+        timings = {}
+        info = {
+            'endpoint': endpoints.method_name(url),
+            'url': url,
+            'params': {k: v for k, v in kwargs.items() if k != 'key'},
+            'lane': lane,
+            'timings': timings
+        }
+        start = time.perf_counter()
+        probe = None
+        try:
+            # endpoints known to be failing are refused before taking a rate limit slot
+            if self._breaker is not None:
+                probe = self._breaker.before_call(info['endpoint'])
+            timings['rate_limit_wait'] = self._wait_for_slot(deadline, cancel, lane)
+            self._run_hooks('before_request', info)
+
+            cache_key = cached = None
+            if self._conditional is not None and self._conditional.applies(info['endpoint']):
+                # responses parsed with different projections are cached separately
+                cache_key = self._conditional.key(url, kwargs) + (wrapper_class,)
+                cached = self._conditional.get(cache_key)
+
+            # 'response' covers connecting and waiting for the server, 'download' the response body
+            mark = time.perf_counter()
+            ratelimit.check(deadline, cancel, 'connecting')
+            request_timeout = self.request_timeout if deadline is None else deadline - time.monotonic()
+            try:
+                response = self._session.get(url, params = kwargs, timeout = request_timeout, stream = True,
+                                             headers = caching.ConditionalCache.request_headers(cached))
+                timings['response'] = time.perf_counter() - mark
+                mark = time.perf_counter()
+                content = self._read_body(response, deadline, cancel)
+            except requests.Timeout:
+                if deadline is None:
+                    raise
+                raise errors.APIDeadlineExceeded('waiting for the response')
+            timings['download'] = time.perf_counter() - mark
+            info['status'] = response.status_code
+            info['bytes'] = len(content)
+            self._run_hooks('after_response', info)
+            if probe is not None and response.status_code in (200, 304):
+                self._breaker.after_call(info['endpoint'], probe)
+                probe = None
+
+            if cache_key is not None:
+                if response.status_code == 304 and cached is not None:
+                    return self._not_modified(cached, info, start)
+                self._raise_for_status(response, url, kwargs)
+                digest = self._conditional.digest(content)
+                if cached is not None and cached['digest'] == digest:
+                    return self._not_modified(cached, info, start)
+            else:
+                self._raise_for_status(response, url, kwargs)
+
+            if getattr(self._local, 'defer_parsing', False):
+                timings['total'] = time.perf_counter() - start
+                self._run_hooks('after_decode', info)
+                return (wrapper_class, content, response.url)
+
+            ratelimit.check(deadline, cancel, 'parsing')
+            mark = time.perf_counter()
+            is_response_class = isinstance(wrapper_class, type) and issubclass(wrapper_class, wrappers.AbstractResponse)
+            if not self.parse_response or not is_response_class:
+                # the body may have been streamed already (see _read_body), decode the bytes read
+                response_text = content.decode(response.encoding or 'utf-8', 'replace')
+                timings['decode'] = time.perf_counter() - mark
+                if not self.parse_response:
+                    timings['total'] = time.perf_counter() - start
+                    if cache_key is not None:
+                        self._conditional.put(cache_key, response, digest, response_text)
+                    self._run_hooks('after_decode', info)
+                    return response_text
+                mark = time.perf_counter()
+                current_response = wrapper_class(response_text)
+            else:
+                # Decode straight from the response bytes, without building an intermediate response.text
+                data = util.decode_json(content)
+                timings['decode'] = time.perf_counter() - mark
+                self._run_hooks('after_decode', info)
+                raw = content if self.keep_raw_json else None
+                mark = time.perf_counter()
+                profiler = self.profiler
+                if profiler is not None and profiler.should_sample():
+                    with profiler.sampling(info['endpoint']):
+                        current_response = wrapper_class.from_json(data, raw)
+                else:
+                    current_response = wrapper_class.from_json(data, raw)
+            timings['parse'] = time.perf_counter() - mark
+
+            if isinstance(current_response, wrappers.AbstractResponse):
+                current_response.url = response.url
+            if cache_key is not None:
+                self._conditional.put(cache_key, response, digest, current_response)
+            timings['total'] = time.perf_counter() - start
+            self._run_hooks('after_parse', info)
+            return current_response
+        except Exception as e:
+            if probe is not None:
+                self._breaker.after_call(info['endpoint'], probe, e, info.get('status'))
+            info['error'] = e
+            timings['total'] = time.perf_counter() - start
+            self._run_hooks('on_error', info)
+            raise
+
     def get_match_history(self, **kwargs):
         """Get a list of matches, filtered by various parameters.
 
@@ -131,6 +403,12 @@ class APIWrapper:
             Defaults to `100`
         tournament_games_only : int, optional
             0 = False, 1 = True
+        fields : list(str), optional
+            Only build these attributes (e.g. ``['matches[].match_id']``, see :any:`project`)
+        where : callable, optional
+            Only parse matches accepted by this predicate over the decoded json of a match
+            (see :mod:`d2api.src.filters`). Other matches are dropped before parsing. Predicates
+            of calls made through a :any:`ParsePipeline` with parsing processes must be picklable.
 
         Returns
         -------
@@ -139,7 +417,8 @@ class APIWrapper:
         """
         _parse_steam_account(kwargs)
         _parse_hero(kwargs)
-        return self._api_call(endpoints.GET_MATCH_HISTORY, wrappers.MatchHistory, **kwargs)
+        wrapper_class = _parse_where(_parse_fields(wrappers.MatchHistory, kwargs), kwargs)
+        return self._api_call(endpoints.GET_MATCH_HISTORY, wrapper_class, **kwargs)
 
     def get_match_history_by_sequence_num(self, **kwargs):
         """Get a list of matches ordered by sequence number.
@@ -151,13 +430,86 @@ class APIWrapper:
             The match sequence number to start returning results from
         matches_requested : int, optional
             Defaults to `100`
+        fields : list(str), optional
+            Only build these attributes (see :any:`get_match_history()`)
+        where : callable, optional
+            Only parse matches accepted by this predicate (see :any:`get_match_history()`),
+            e.g. ``filters.all_of(filters.lobby_type(7), filters.no_leavers)``
 
         Returns
         -------
         MatchHistory
             Information of matches.
         """
-        return self._api_call(endpoints.GET_MATCH_HISTORY_BY_SEQ_NUM, wrappers.MatchHistory, **kwargs)
+        wrapper_class = _parse_where(_parse_fields(wrappers.MatchHistory, kwargs), kwargs)
+        return self._api_call(endpoints.GET_MATCH_HISTORY_BY_SEQ_NUM, wrapper_class, **kwargs)
+
+    def _fetch_page(self, method, kwargs):
+        """Fetch and parse a page for :any:`PageIterator`. Returns the page and its body size."""
+        with self._deferred_parsing():
+            raw = method(**kwargs)
+        if not isinstance(raw, tuple):
+            return raw, len(raw.raw_bytes or b'')
+        wrapper_class, body, url = raw
+        page = wrapper_class.from_json(util.decode_json(body), body if self.keep_raw_json else None)
+        page.url = url
+        return page, len(body)
+
+    def iter_match_history(self, prefetch = 2, max_buffered_bytes = None, max_pages = None, **kwargs):
+        """Iterate over pages of :any:`get_match_history()`, from the newest match to the oldest.
+
+        Pages are fetched ahead of the consumer in a background thread, but never more than
+        ``prefetch`` pages or ``max_buffered_bytes`` ahead, so slow consumers bound memory use.
+
+        Parameters
+        ----------
+        prefetch : int, optional
+            Maximum number of pages fetched ahead (``0`` fetches each page when requested)
+        max_buffered_bytes : int, optional
+            Approximate memory budget of pages fetched ahead
+        max_pages : int, optional
+            Stop after this many pages
+        kwargs
+            Arguments of :any:`get_match_history()` (a ``fields`` projection is extended with the
+            attributes needed to request the next page)
+
+        Returns
+        -------
+        PageIterator
+            Iterator of MatchHistory pages (call ``close()`` to stop fetching early)
+        """
+        _paging_fields(kwargs, ('matches[].match_id', 'results_remaining'))
+        return paging.PageIterator(lambda args: self._fetch_page(self.get_match_history, args),
+                                   paging.next_match_history_args, kwargs, prefetch, max_buffered_bytes, max_pages)
+
+    def iter_match_history_by_sequence_num(self, start_at_match_seq_num, prefetch = 2, max_buffered_bytes = None, max_pages = None, **kwargs):
+        """Iterate over pages of :any:`get_match_history_by_sequence_num()`, in ascending sequence number.
+
+        Iteration ends at the first empty page (pages emptied by a ``where`` filter are still followed).
+        See :any:`iter_match_history()` for read-ahead bounds.
+
+        Parameters
+        ----------
+        start_at_match_seq_num : int
+            The match sequence number to start returning results from
+        prefetch : int, optional
+            Maximum number of pages fetched ahead (``0`` fetches each page when requested)
+        max_buffered_bytes : int, optional
+            Approximate memory budget of pages fetched ahead
+        max_pages : int, optional
+            Stop after this many pages
+        kwargs
+            Arguments of :any:`get_match_history_by_sequence_num()`
+
+        Returns
+        -------
+        PageIterator
+            Iterator of MatchHistory pages (call ``close()`` to stop fetching early)
+        """
+        kwargs['start_at_match_seq_num'] = start_at_match_seq_num
+        _paging_fields(kwargs, ('matches[].match_seq_num',))
+        return paging.PageIterator(lambda args: self._fetch_page(self.get_match_history_by_sequence_num, args),
+                                   paging.next_sequence_num_args, kwargs, prefetch, max_buffered_bytes, max_pages)
 
     def get_match_details(self, match_id, **kwargs):
         """Get detailed information about a particular match.
@@ -166,6 +518,8 @@ class APIWrapper:
         ----------
         match_id : int, string
             Match ID
+        fields : list(str), optional
+            Only build these attributes, e.g. ``['match_id', 'winner', 'players[].hero']`` (see :any:`project`)
 
         Returns
         -------
@@ -173,7 +527,8 @@ class APIWrapper:
             Details of a match.
         """
         kwargs['match_id'] = match_id
-        return self._api_call(endpoints.GET_MATCH_DETAILS, wrappers.MatchDetails, **kwargs)
+        wrapper_class = _parse_fields(wrappers.MatchDetails, kwargs)
+        return self._api_call(endpoints.GET_MATCH_DETAILS, wrapper_class, **kwargs)
 
     def get_heroes(self, **kwargs):
         """Get a list of heroes in Dota 2.
@@ -190,6 +545,8 @@ class APIWrapper:
         Heroes
             Hero information.
         """
+        if self._catalogs is not None and self.parse_response:
+            return self._catalog(endpoints.GET_HEROES, wrappers.Heroes, 'heroes', kwargs)[0]
         return self._api_call(endpoints.GET_HEROES, wrappers.Heroes, **kwargs)
 
     def get_game_items(self, **kwargs):
@@ -205,8 +562,70 @@ class APIWrapper:
         GameItems
             Item information.
         """
+        if self._catalogs is not None and self.parse_response:
+            return self._catalog(endpoints.GET_GAME_ITEMS, wrappers.GameItems, 'game_items', kwargs)[0]
         return self._api_call(endpoints.GET_GAME_ITEMS, wrappers.GameItems, **kwargs)
 
+    def _parsed_call(self, url, wrapper_class, **kwargs):
+        """Perform a call and return the parsed response, regardless of ``parse_response`` and deferred parsing."""
+        deferred = getattr(self._local, 'defer_parsing', False)
+        self._local.defer_parsing = False
+        try:
+            response = self._api_call(url, wrapper_class, **kwargs)
+        finally:
+            self._local.defer_parsing = deferred
+        return response if isinstance(response, wrappers.AbstractResponse) else wrapper_class(response)
+
+    def _catalog(self, url, wrapper_class, list_key, kwargs):
+        """Catalog response and its objects by ID, from the catalog cache."""
+        params = {k: v for k, v in kwargs.items() if k not in ('timeout', 'cancel', 'lane')}
+        key = caching.ConditionalCache.key(url, params)
+
+        def fetch(background = False):
+            # background refreshes do not inherit the deadline, cancellation or lane of the first call
+            if background:
+                return self._parsed_call(url, wrapper_class, **params)
+            return self._parsed_call(url, wrapper_class, **kwargs)
+
+        return self._catalogs.get(key, fetch, lambda response: {obj['id']: obj for obj in response[list_key]})
+
+    def hero_catalog(self, **kwargs):
+        """Localized heroes by hero ID.
+
+        Served from memory with ``catalog_cache``, the lookup map being built once per refresh.
+        Responses are parsed even without ``parse_response``.
+
+        Parameters
+        ----------
+        language : string, optional
+            Language of hero names (see :any:`get_heroes`)
+
+        Returns
+        -------
+        dict(int, LocalizedHero)
+            Heroes by ID
+        """
+        if self._catalogs is not None:
+            return self._catalog(endpoints.GET_HEROES, wrappers.Heroes, 'heroes', kwargs)[1]
+        return {hero['id']: hero for hero in self._parsed_call(endpoints.GET_HEROES, wrappers.Heroes, **kwargs)['heroes']}
+
+    def item_catalog(self, **kwargs):
+        """Localized items by item ID (see :any:`hero_catalog`).
+
+        Parameters
+        ----------
+        language : string, optional
+            Language of item names (see :any:`get_game_items`)
+
+        Returns
+        -------
+        dict(int, LocalizedGameItem)
+            Items by ID
+        """
+        if self._catalogs is not None:
+            return self._catalog(endpoints.GET_GAME_ITEMS, wrappers.GameItems, 'game_items', kwargs)[1]
+        return {item['id']: item for item in self._parsed_call(endpoints.GET_GAME_ITEMS, wrappers.GameItems, **kwargs)['game_items']}
+
     def get_tournament_prize_pool(self, **kwargs):
         """Get the current prizepool of specific tournaments.
 
@@ -309,6 +728,7 @@ def update_local_data(purge = True):
     Parameters
     ----------
     purge : bool
-        Set to ``True`` to delete local content
+        Set to ``True`` to verify every local file against the remote data (re-downloading all files
+        if the remote data has no checksums) and delete local files that are no longer used
     """
     return entities._update(purge)
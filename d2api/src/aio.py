@@ -0,0 +1,41 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+"""Calling the wrapper from asyncio code (Python 3.5+).
+
+Calls run in the event loop's executor. Cancelling the awaiting task cancels the call: a call
+waiting for the rate limit stops immediately, and one in flight stops at its next stage::
+
+    heroes = await aio.call(api, 'get_heroes', language = 'en_us', timeout = 0.5)
+"""
+import asyncio
+import functools
+
+from .ratelimit import CancelToken
+
+async def call(api, method_name, *args, executor = None, **kwargs):
+    """Perform a call of an :any:`APIWrapper` method without blocking the event loop.
+
+    Parameters
+    ----------
+    api : APIWrapper
+        Wrapper used to perform the request
+    method_name : str
+        Name of the method, e.g. ``'get_match_details'``
+    args, kwargs
+        Arguments of the method (including ``timeout``)
+    executor : concurrent.futures.Executor, optional
+        Executor running the call (defaults to the loop's default executor)
+
+    Returns
+    -------
+    object
+        Response of the method
+    """
+    token = CancelToken()
+    method = functools.partial(getattr(api, method_name), *args, cancel = token, **kwargs)
+    future = asyncio.get_event_loop().run_in_executor(executor, method)
+    try:
+        return await future
+    except asyncio.CancelledError:
+        token.cancel()
+        raise
@@ -0,0 +1,241 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+"""Offline benchmarks for parser hot paths.
+
+Every benchmark runs against local fixtures (synthetic payloads from :mod:`d2api.src.samples`
+unless a recorded fixture is provided), so results are comparable between releases.
+"""
+import copy
+import gc
+import json
+import platform
+import time
+import tracemalloc
+
+from . import entities
+from . import samples
+from . import util
+from . import wrappers
+
+class _CannedResponse:
+    """Stand-in for ``requests.Response`` used to measure ``_api_call`` overhead."""
+    status_code = 200
+    reason = 'OK'
+    headers = {}
+
+    def __init__(self, url, content):
+        self.url = url
+        self.content = content
+
+    @property
+    def text(self):
+        return str(self.content, 'utf-8')
+
+class _CannedSession:
+    """Serves the same body for every request."""
+    def __init__(self, body):
+        self.body = body.encode('utf-8')
+
+    def get(self, url, params = None, **kwargs):
+        return _CannedResponse(url, self.body)
+
+def _percentile(sorted_values, q):
+    """Nearest-rank percentile of an already sorted list."""
+    if not sorted_values:
+        return 0.0
+    idx = min(len(sorted_values) - 1, max(0, int(round(q / 100 * len(sorted_values))) - 1))
+    return sorted_values[idx]
+
+def measure(func, setup = None, iterations = 200, objects_per_call = 1):
+    """Time ``func`` repeatedly and summarize throughput, latency and peak memory.
+
+    Parameters
+    ----------
+    func : callable
+        Benchmarked callable, called with the value returned by ``setup``
+    setup : callable, optional
+        Called before every iteration (outside the timed section) to build fresh input
+    iterations : int
+        Number of timed calls
+    objects_per_call : int
+        Number of objects produced per call (used to compute throughput)
+
+    Returns
+    -------
+    dict
+        Summary with latencies in seconds and peak memory in bytes
+    """
+    setup = setup if setup else (lambda: None)
+
+    # warm up caches before timing
+    func(setup())
+
+    gc_enabled = gc.isenabled()
+    gc.disable()
+    latencies = []
+    try:
+        for _ in range(iterations):
+            arg = setup()
+            start = time.perf_counter()
+            func(arg)
+            latencies.append(time.perf_counter() - start)
+    finally:
+        if gc_enabled:
+            gc.enable()
+
+    # peak memory is measured separately since tracing skews timings
+    arg = setup()
+    tracemalloc.start()
+    try:
+        func(arg)
+        peak_memory = tracemalloc.get_traced_memory()[1]
+    finally:
+        tracemalloc.stop()
+
+    total = sum(latencies)
+    latencies.sort()
+    return {
+        'iterations': iterations,
+        'objects_per_second': objects_per_call * iterations / total if total else 0.0,
+        'mean': total / iterations,
+        'p50': _percentile(latencies, 50),
+        'p90': _percentile(latencies, 90),
+        'p99': _percentile(latencies, 99),
+        'max': latencies[-1],
+        'peak_memory': peak_memory
+    }
+
+def default_benchmarks(live_game = None):
+    """Build the default benchmark table.
+
+    Parameters
+    ----------
+    live_game : str, optional
+        Text of a recorded live league game (e.g. ``tests/ref/livegame.json``).
+        A synthetic game is used if omitted.
+
+    Returns
+    -------
+    list(tuple)
+        ``(name, func, setup, objects_per_call)`` entries
+    """
+    # imported here to avoid a circular import (d2api imports this package)
+    import d2api
+
+    details_text = samples.match_details_text()
+    details_bytes = details_text.encode('utf-8')
+    details_batch = [samples.match_details_text(4176987886 - i).encode('utf-8') for i in range(20)]
+    if live_game is None:
+        live_game = samples.dumps(samples.live_league_game())
+    live_json = util.decode_json(live_game)
+    team_json = live_json['scoreboard']['radiant']
+    live_games_text = samples.live_league_games_text()
+    item_ids = sorted(entities.all_items)
+
+    api = d2api.APIWrapper(api_key = 'benchmark', requests_per_second = -1)
+    api._session = _CannedSession(details_text)
+
+    return [
+        ('util.decode_json', util.decode_json, lambda: details_text, 1),
+        ('MatchDetails', wrappers.MatchDetails, lambda: details_text, 1),
+        ('MatchDetails (bytes)', wrappers.MatchDetails, lambda: details_bytes, 1),
+        ('wrappers.parse_many', lambda bodies: wrappers.parse_many(wrappers.MatchDetails, bodies),
+            lambda: details_batch, len(details_batch)),
+        ('MatchDetails.parse_response', lambda m: m.parse_response(),
+            lambda: _unparsed(wrappers.MatchDetails, details_text), 1),
+        ('LiveLeagueGames', wrappers.LiveLeagueGames, lambda: live_games_text, 1),
+        ('Game', wrappers.Game, lambda: copy.deepcopy(live_json), 1),
+        ('TeamLive.parse', wrappers.TeamLive, lambda: copy.deepcopy(team_json), 1),
+        ('entities.Item.__init__', lambda ids: [entities.Item(i) for i in ids], lambda: item_ids, len(item_ids)),
+        ('APIWrapper._api_call', lambda _: api.get_match_details(4176987886), None, 1)
+    ]
+
+def _unparsed(cls, text):
+    """Decode a response without running its parser."""
+    obj = cls.__new__(cls)
+    obj.raw_json = text
+    wrappers.Dota2Dict.__init__(obj, util.decode_json(text))
+    return obj
+
+def run(benchmarks = None, iterations = 200, names = None):
+    """Run benchmarks.
+
+    Parameters
+    ----------
+    benchmarks : list(tuple), optional
+        Benchmark table (see :any:`default_benchmarks`)
+    iterations : int
+        Number of timed calls per benchmark
+    names : list(str), optional
+        Only run benchmarks with these names
+
+    Returns
+    -------
+    dict
+        Environment metadata and per-benchmark results
+    """
+    benchmarks = benchmarks if benchmarks is not None else default_benchmarks()
+    results = {}
+    for name, func, setup, objects_per_call in benchmarks:
+        if names and name not in names:
+            continue
+        results[name] = measure(func, setup, iterations, objects_per_call)
+
+    return {
+        'meta': {
+            'python': platform.python_version(),
+            'implementation': platform.python_implementation(),
+            'platform': platform.platform(),
+            'timestamp': int(time.time()),
+            'iterations': iterations
+        },
+        'results': results
+    }
+
+def save(report, file_name):
+    """Write a benchmark report as json."""
+    with open(file_name, 'w') as f:
+        json.dump(report, f, sort_keys = True, indent = 4)
+
+def load(file_name):
+    """Read a benchmark report written by :any:`save`."""
+    with open(file_name, 'r') as f:
+        return json.load(f)
+
+def compare(baseline, current, tolerance = 0.1):
+    """Find benchmarks that regressed between two reports.
+
+    Parameters
+    ----------
+    baseline : dict
+        Reference report
+    current : dict
+        New report
+    tolerance : float
+        Allowed relative slowdown of ``p50`` and growth of ``peak_memory``
+
+    Returns
+    -------
+    dict
+        Mapping of benchmark name to a dict of regressed metrics and their ``(baseline, current)`` values
+    """
+    regressions = {}
+    for name, cur in current['results'].items():
+        base = baseline['results'].get(name)
+        if base is None:
+            continue
+        regressed = {}
+        for metric in ('p50', 'peak_memory'):
+            if base[metric] and cur[metric] > base[metric] * (1 + tolerance):
+                regressed[metric] = (base[metric], cur[metric])
+        if regressed:
+            regressions[name] = regressed
+    return regressions
+
+def format_report(report):
+    """Human readable table of a report."""
+    lines = ['{:<30} {:>12} {:>10} {:>10} {:>10} {:>12}'.format('benchmark', 'objects/s', 'p50 ms', 'p90 ms', 'p99 ms', 'peak KiB')]
+    for name, r in sorted(report['results'].items()):
+        lines.append('{:<30} {:>12.1f} {:>10.3f} {:>10.3f} {:>10.3f} {:>12.1f}'.format(
+            name, r['objects_per_second'], r['p50'] * 1e3, r['p90'] * 1e3, r['p99'] * 1e3, r['peak_memory'] / 1024))
+    return '\n'.join(lines)
@@ -0,0 +1,169 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+"""Per-endpoint circuit breakers.
+
+Some WebAPI methods (e.g. ``GetTopLiveGame`` or ``GetBroadcasterInfo``) fail for long periods.
+Every call to them still waits for the rate limit, taking slots from healthy endpoints. A
+:class:`CircuitBreaker` stops calling an endpoint after repeated failures, and fails calls to it
+locally, before they wait for the rate limit, until a probe call succeeds::
+
+    api = APIWrapper(circuit_breaker = CircuitBreaker(failures = 3, window = 60, cooldown = 120))
+"""
+import threading
+import time
+from collections import deque
+
+import requests
+
+from . import errors
+
+CLOSED = 'closed'
+OPEN = 'open'
+HALF_OPEN = 'half_open'
+
+# Errors of the endpoint itself (rather than of the call or of the client)
+FAILURES = (errors.APIMethodUnavailable, errors.APITimeoutError, requests.ConnectionError, requests.Timeout)
+
+class _Circuit:
+    def __init__(self):
+        self.state = CLOSED
+        self.failures = deque()
+        self.open_until = 0
+        self.probing = 0
+
+        self.opened = 0
+        self.rejected = 0
+
+class CircuitBreaker:
+    """Fail fast on endpoints that keep failing.
+
+    A circuit opens once an endpoint fails ``failures`` times within ``window`` seconds. Calls to
+    an open endpoint raise :any:`APICircuitOpen` without a request. After ``cooldown`` seconds,
+    up to ``probes`` calls are let through at once (half-open): the circuit closes when one
+    succeeds, and opens again when one fails.
+
+    Failures are the errors in ``failure_types`` and responses with a 5xx status. Other errors
+    (invalid arguments, authentication, throttling, deadlines and cancellation) are not caused by
+    the endpoint and are ignored.
+
+    Parameters
+    ----------
+    failures : int
+        Number of failures opening the circuit
+    window : float
+        Period (in seconds) failures are counted over
+    cooldown : float
+        Time (in seconds) before probing an open endpoint
+    probes : int
+        Number of concurrent probe calls to a half-open endpoint
+    failure_types : tuple(type), optional
+        Errors counted as failures
+    """
+    def __init__(self, failures = 5, window = 60, cooldown = 30, probes = 1, failure_types = FAILURES):
+        self.failures = failures
+        self.window = window
+        self.cooldown = cooldown
+        self.probes = probes
+        self.failure_types = failure_types
+
+        self._circuits = {}
+        self._lock = threading.Lock()
+
+    def _circuit(self, endpoint):
+        circuit = self._circuits.get(endpoint)
+        if circuit is None:
+            circuit = self._circuits[endpoint] = _Circuit()
+        return circuit
+
+    def _open(self, circuit, now):
+        circuit.state = OPEN
+        circuit.open_until = now + self.cooldown
+        circuit.opened += 1
+        circuit.failures.clear()
+
+    def before_call(self, endpoint):
+        """Admit a call to an endpoint.
+
+        Returns
+        -------
+        bool
+            ``True`` if the call probes a half-open endpoint
+
+        Raises
+        ------
+        APICircuitOpen
+            If the endpoint is open, or already probed by other calls
+        """
+        now = time.monotonic()
+        with self._lock:
+            circuit = self._circuit(endpoint)
+            circuit.state = self._state(circuit, now)
+            if circuit.state == CLOSED:
+                return False
+            if circuit.state == HALF_OPEN and circuit.probing < self.probes:
+                circuit.probing += 1
+                return True
+            circuit.rejected += 1
+            retry_after = max(0, circuit.open_until - now)
+        raise errors.APICircuitOpen(endpoint, retry_after)
+
+    def after_call(self, endpoint, probe, error = None, status = None):
+        """Record the outcome of a call admitted by :any:`before_call`.
+
+        Parameters
+        ----------
+        endpoint : str
+            WebAPI method name
+        probe : bool
+            Value returned by :any:`before_call`
+        error : Exception, optional
+            Error raised by the call (``None`` once the endpoint responded successfully)
+        status : int, optional
+            HTTP status of the response, if any
+        """
+        failed = isinstance(error, self.failure_types) or (status is not None and status >= 500)
+        now = time.monotonic()
+        with self._lock:
+            circuit = self._circuit(endpoint)
+            if probe and circuit.probing:
+                circuit.probing -= 1
+            if error is None:
+                if probe:
+                    circuit.state = CLOSED
+                    circuit.failures.clear()
+            elif failed:
+                if probe or circuit.state == HALF_OPEN:
+                    self._open(circuit, now)
+                elif circuit.state == CLOSED:
+                    circuit.failures.append(now)
+                    while circuit.failures[0] <= now - self.window:
+                        circuit.failures.popleft()
+                    if len(circuit.failures) >= self.failures:
+                        self._open(circuit, now)
+
+    @staticmethod
+    def _state(circuit, now):
+        if circuit.state == OPEN and now >= circuit.open_until:
+            return HALF_OPEN
+        return circuit.state
+
+    def state(self, endpoint):
+        """State of an endpoint (``'closed'``, ``'open'`` or ``'half_open'``)."""
+        with self._lock:
+            circuit = self._circuits.get(endpoint)
+            return CLOSED if circuit is None else self._state(circuit, time.monotonic())
+
+    def reset(self, endpoint = None):
+        """Close the circuit of an endpoint, or of all endpoints."""
+        with self._lock:
+            if endpoint is None:
+                self._circuits.clear()
+            else:
+                self._circuits.pop(endpoint, None)
+
+    def stats(self):
+        """State, recent failures, times opened and calls rejected of every endpoint called."""
+        now = time.monotonic()
+        with self._lock:
+            return {endpoint: {'state': self._state(c, now), 'failures': len(c.failures), 'opened': c.opened, 'rejected': c.rejected}
+                    for endpoint, c in self._circuits.items()}
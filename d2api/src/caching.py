@@ -0,0 +1,183 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+"""Response caches used by :any:`APIWrapper`."""
+import hashlib
+import threading
+import time
+from collections import OrderedDict
+
+# Endpoints polled at high frequency, whose payloads rarely change between polls
+LIVE_ENDPOINTS = ('GetTopLiveGame', 'GetLiveLeagueGames')
+
+class ConditionalCache:
+    """Remembers the last response of each polled resource to skip unchanged payloads.
+
+    A resource is an endpoint together with its parameters. The cache stores validators
+    (``ETag``/``Last-Modified``) to send conditional requests, and a digest of the response body
+    so that unchanged bodies are detected even if the server ignores conditional requests.
+
+    Parameters
+    ----------
+    endpoints : tuple(str)
+        WebAPI method names (e.g. ``GetLiveLeagueGames``) to cache
+    max_entries : int
+        Maximum number of resources remembered (least recently used are evicted)
+    """
+    def __init__(self, endpoints = LIVE_ENDPOINTS, max_entries = 64):
+        self.endpoints = frozenset(endpoints)
+        self.max_entries = max_entries
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    def applies(self, endpoint):
+        return endpoint in self.endpoints
+
+    @staticmethod
+    def key(url, params):
+        return (url, tuple(sorted((k, str(v)) for k, v in params.items() if k != 'key')))
+
+    @staticmethod
+    def digest(content):
+        return hashlib.sha1(content).digest()
+
+    def get(self, key):
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                self._entries.move_to_end(key)
+            return entry
+
+    def put(self, key, response, digest, value):
+        entry = {
+            'etag': response.headers.get('ETag'),
+            'last_modified': response.headers.get('Last-Modified'),
+            'digest': digest,
+            'value': value
+        }
+        with self._lock:
+            self._entries[key] = entry
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last = False)
+
+    @staticmethod
+    def request_headers(entry):
+        """Conditional request headers for a cached entry."""
+        headers = {}
+        if entry is not None:
+            if entry['etag']:
+                headers['If-None-Match'] = entry['etag']
+            if entry['last_modified']:
+                headers['If-Modified-Since'] = entry['last_modified']
+        return headers
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+class _Catalog:
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.value = None
+        self.index = None
+        self.expires = 0
+        self.next_refresh = 0
+        self.refreshing = False
+
+class CatalogCache:
+    """Keeps catalogs that only change with game patches (heroes and items) in memory.
+
+    A catalog is fetched on first use, and refreshed in the background once ``refresh_ahead`` of
+    its ``ttl`` has passed, so calls never wait for it afterwards. A failed refresh keeps the
+    current catalog and is retried halfway to its expiry. Catalogs are only fetched in the
+    foreground once expired (e.g. when not used for a while).
+
+    Every catalog is stored with a lookup map of its objects, built once per fetch.
+
+    Parameters
+    ----------
+    ttl : float
+        Time (in seconds) a catalog is served for
+    refresh_ahead : float
+        Fraction of ``ttl`` after which a catalog is refreshed in the background
+    """
+    def __init__(self, ttl = 6 * 3600, refresh_ahead = 0.75):
+        self.ttl = ttl
+        self.refresh_ahead = refresh_ahead
+        self._catalogs = {}
+        self._lock = threading.Lock()
+
+        self.hits = 0
+        self.misses = 0
+        self.refreshes = 0
+        self.refresh_errors = 0
+
+    def _store(self, catalog, value, index):
+        now = time.monotonic()
+        catalog.value = value
+        catalog.index = index(value)
+        catalog.expires = now + self.ttl
+        catalog.next_refresh = now + self.ttl * self.refresh_ahead
+
+    def _refresh(self, catalog, fetch, index):
+        try:
+            value = fetch()
+        except Exception:
+            with self._lock:
+                self.refresh_errors += 1
+                now = time.monotonic()
+                catalog.next_refresh = now + max(1, (catalog.expires - now) / 2)
+        else:
+            # value and lookup map are replaced together for callers served from memory
+            with self._lock:
+                self._store(catalog, value, index)
+                self.refreshes += 1
+        finally:
+            catalog.refreshing = False
+
+    def get(self, key, fetch, index):
+        """A catalog and its lookup map.
+
+        Parameters
+        ----------
+        key : hashable
+            Name of the catalog (e.g. endpoint and language)
+        fetch : callable
+            Fetches the catalog. It is called with ``background = True`` for background refreshes.
+        index : callable
+            Builds the lookup map of a fetched catalog
+
+        Returns
+        -------
+        tuple
+            Catalog and lookup map
+        """
+        with self._lock:
+            catalog = self._catalogs.get(key)
+            if catalog is None:
+                catalog = self._catalogs[key] = _Catalog()
+            now = time.monotonic()
+            if now < catalog.expires:
+                self.hits += 1
+                if now >= catalog.next_refresh and not catalog.refreshing:
+                    catalog.refreshing = True
+                    threading.Thread(target = self._refresh, args = (catalog, lambda: fetch(background = True), index),
+                                     daemon = True).start()
+                return catalog.value, catalog.index
+
+        # concurrent calls for the same expired catalog wait for a single fetch
+        with catalog.lock:
+            if time.monotonic() >= catalog.expires:
+                with self._lock:
+                    self.misses += 1
+                self._store(catalog, fetch(), index)
+            return catalog.value, catalog.index
+
+    def stats(self):
+        """Number of hits, misses (foreground fetches), background refreshes and failed refreshes."""
+        with self._lock:
+            return {'hits': self.hits, 'misses': self.misses, 'refreshes': self.refreshes, 'refresh_errors': self.refresh_errors}
+
+    def clear(self):
+        with self._lock:
+            self._catalogs.clear()
@@ -0,0 +1,303 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+"""Command line tool for bulk jobs.
+
+Installed as the ``d2api`` console script (also runnable as ``python -m d2api``)::
+
+    d2api --key KEY --rate 2 crawl-seq --start 4000000000 --state crawl.json --lobby-type 7 -o matches.ndjson
+    cut -f1 ids.txt | d2api --workers 8 fetch-details --fields match_id winner 'players[].hero' > details.ndjson
+    d2api export matches.ndjson --format sqlite -o matches.db
+    d2api poll-live --duration 600 -o live.ndjson
+    d2api bench --iterations 100
+
+Responses are written as newline delimited json, one match (or one live response) per line.
+"""
+import argparse
+import json
+import os
+import sqlite3
+import sys
+import threading
+import time
+from collections.abc import Mapping
+
+import d2api
+
+from . import benchmark
+from . import filters
+from . import paging
+from . import polling
+from . import wrappers
+from .pipeline import ParsePipeline
+
+def _json_default(obj):
+    if isinstance(obj, wrappers.Dota2Dict):
+        return obj.data
+    if isinstance(obj, Mapping):
+        return dict(obj)
+    raise TypeError('{} is not json serializable'.format(type(obj).__name__))
+
+def _dumps(obj):
+    return json.dumps(obj, default = _json_default, separators = (',', ':'))
+
+def _open_output(file_name, mode = 'a'):
+    if file_name in (None, '-'):
+        return sys.stdout
+    return open(file_name, mode, encoding = 'utf-8')
+
+def _open_input(file_name):
+    if file_name in (None, '-'):
+        return sys.stdin
+    return open(file_name, 'r', encoding = 'utf-8')
+
+def _close(f):
+    if f not in (sys.stdin, sys.stdout):
+        f.close()
+
+def _api(args):
+    return d2api.APIWrapper(api_key = args.key, base_url = args.base_url, requests_per_second = args.rate)
+
+def _match_filter(args):
+    predicates = []
+    if args.lobby_type:
+        predicates.append(filters.lobby_type(*args.lobby_type))
+    if args.game_mode:
+        predicates.append(filters.game_mode(*args.game_mode))
+    if args.human_players is not None:
+        predicates.append(filters.human_players(args.human_players))
+    if args.no_leavers:
+        predicates.append(filters.no_leavers)
+    return filters.all_of(*predicates) if predicates else None
+
+def _save_state(file_name, state):
+    """Write a state file atomically, so that an interrupted crawl never leaves it truncated."""
+    tmp = '{}.tmp'.format(file_name)
+    with open(tmp, 'w') as f:
+        json.dump(state, f)
+    os.replace(tmp, file_name)
+
+def crawl_seq(args):
+    """Crawl matches by sequence number, resuming from the state file if it exists."""
+    start = args.start
+    if args.state and os.path.exists(args.state):
+        with open(args.state, 'r') as f:
+            start = json.load(f)['start_at_match_seq_num']
+    if start is None:
+        raise SystemExit('crawl-seq: --start is required without a state file to resume from')
+
+    api = _api(args)
+    kwargs = {'matches_requested': args.matches_requested, 'where': _match_filter(args)}
+    if args.fields:
+        kwargs['fields'] = ['matches[].{}'.format(f) for f in args.fields]
+    pages = api.iter_match_history_by_sequence_num(start, prefetch = args.prefetch, max_pages = args.max_pages, **kwargs)
+
+    out = _open_output(args.output)
+    written = 0
+    try:
+        with pages:
+            for page in pages:
+                for match in page['matches']:
+                    out.write(_dumps(match) + '\n')
+                    written += 1
+                out.flush()
+                # the state is saved once the page is written, so a resumed crawl never skips matches
+                next_args = paging.next_sequence_num_args(page, {})
+                if args.state and next_args is not None:
+                    _save_state(args.state, next_args)
+    finally:
+        _close(out)
+    print('{} matches written'.format(written), file = sys.stderr)
+
+def fetch_details(args):
+    """Fetch details of the match IDs read from the input (one per line), concurrently."""
+    source = _open_input(args.input)
+    match_ids = (line.split()[0] for line in source if line.strip())
+    kwargs = {'fields': args.fields} if args.fields else {}
+    calls = (('get_match_details', dict(kwargs, match_id = m)) for m in match_ids)
+
+    pipeline = ParsePipeline(_api(args), fetch_workers = args.workers, parse_workers = args.parse_workers)
+    out = _open_output(args.output)
+    written = failed = 0
+    try:
+        for call, match, error in pipeline.run(calls):
+            if error is not None:
+                print('{}: {!r}'.format(call[1]['match_id'], error), file = sys.stderr)
+                failed += 1
+                continue
+            out.write(_dumps(match) + '\n')
+            written += 1
+    finally:
+        _close(out)
+        _close(source)
+    print('{} matches written, {} failed'.format(written, failed), file = sys.stderr)
+    if failed:
+        sys.exit(1)
+
+def _flat_rows(lines):
+    """Decode json lines, keeping scalars and storing nested values as json text."""
+    for line in lines:
+        if not line.strip():
+            continue
+        row = json.loads(line)
+        yield {k: v if v is None or isinstance(v, (int, float, str)) else json.dumps(v, separators = (',', ':'))
+               for k, v in row.items()}
+
+def _export_sqlite(rows, file_name, table):
+    con = sqlite3.connect(file_name)
+    columns = []
+    try:
+        for row in rows:
+            if not columns:
+                columns = list(row)
+                con.execute('CREATE TABLE IF NOT EXISTS "{}" ({})'.format(table, ', '.join('"{}"'.format(c) for c in columns)))
+            for c in row:
+                if c not in columns:
+                    con.execute('ALTER TABLE "{}" ADD COLUMN "{}"'.format(table, c))
+                    columns.append(c)
+            con.execute('INSERT INTO "{}" ({}) VALUES ({})'.format(table, ', '.join('"{}"'.format(c) for c in row),
+                        ', '.join('?' * len(row))), list(row.values()))
+        con.commit()
+    finally:
+        con.close()
+
+def _export_parquet(rows, file_name):
+    try:
+        import pyarrow
+        import pyarrow.parquet
+    except ImportError:
+        raise SystemExit('export: the parquet format requires pyarrow (pip install pyarrow)')
+    rows = list(rows)
+    columns = {}
+    for i, row in enumerate(rows):
+        for k, v in row.items():
+            columns.setdefault(k, [None] * len(rows))[i] = v
+    pyarrow.parquet.write_table(pyarrow.table(columns), file_name)
+
+def export(args):
+    """Convert newline delimited json (e.g. the output of crawl-seq) to another format."""
+    source = _open_input(args.input)
+    try:
+        if args.format == 'ndjson':
+            out = _open_output(args.output, 'w')
+            try:
+                for line in source:
+                    if line.strip():
+                        out.write(line if line.endswith('\n') else line + '\n')
+            finally:
+                _close(out)
+        elif args.output in (None, '-'):
+            raise SystemExit('export: --output is required for the {} format'.format(args.format))
+        elif args.format == 'sqlite':
+            _export_sqlite(_flat_rows(source), args.output, args.table)
+        else:
+            _export_parquet(_flat_rows(source), args.output)
+    finally:
+        _close(source)
+
+def poll_live(args):
+    """Write live responses whenever they change."""
+    api = _api(args)
+    if args.endpoint == 'top':
+        fetch, version = lambda: api.get_top_live_game(partner = args.partner), polling.top_live_game_version
+    else:
+        fetch, version = api.get_live_league_games, polling.live_league_games_version
+
+    out = _open_output(args.output)
+    def on_update(key, response):
+        out.write(_dumps({'time': time.time(), 'endpoint': key, 'response': response}) + '\n')
+        out.flush()
+
+    scheduler = polling.PollScheduler(requests_per_second = args.rate if args.rate > 0 else None)
+    scheduler.watch(args.endpoint, fetch, version = version, on_update = on_update)
+    stop = threading.Event()
+    if args.duration:
+        timer = threading.Timer(args.duration, stop.set)
+        timer.daemon = True
+        timer.start()
+    try:
+        scheduler.run(stop)
+    except KeyboardInterrupt:
+        pass
+    finally:
+        _close(out)
+
+def bench(args):
+    """Run the offline parser benchmarks, optionally comparing against a previous report."""
+    live_game = None
+    if args.live_game:
+        with open(args.live_game, encoding = 'utf8') as f:
+            live_game = f.read()
+    report = benchmark.run(benchmark.default_benchmarks(live_game), args.iterations, args.names)
+    print(benchmark.format_report(report))
+    if args.output:
+        benchmark.save(report, args.output)
+    if args.baseline:
+        regressions = benchmark.compare(benchmark.load(args.baseline), report, args.tolerance)
+        for name, metrics in sorted(regressions.items()):
+            for metric, (old, new) in sorted(metrics.items()):
+                print('REGRESSION {}: {} {:.6g} -> {:.6g}'.format(name, metric, old, new))
+        if regressions:
+            sys.exit(1)
+
+def _parser():
+    parser = argparse.ArgumentParser(prog = 'd2api', description = 'Bulk jobs against the Dota 2 WebAPI')
+    parser.add_argument('--key', help = 'Steam API key (defaults to the D2_API_KEY environment variable)')
+    parser.add_argument('--base-url', help = 'send requests to this host instead of the WebAPI (e.g. a mock server)')
+    parser.add_argument('--rate', type = float, default = 1, help = 'requests per second (-1 for no limit)')
+    parser.add_argument('--workers', type = int, default = 4, help = 'concurrent requests')
+    commands = parser.add_subparsers(dest = 'command')
+    commands.required = True
+
+    def match_filters(p):
+        p.add_argument('--lobby-type', type = int, nargs = '+', help = 'only keep matches of these lobby types')
+        p.add_argument('--game-mode', type = int, nargs = '+', help = 'only keep matches of these game modes')
+        p.add_argument('--human-players', type = int, help = 'only keep matches with this many human players')
+        p.add_argument('--no-leavers', action = 'store_true', help = 'drop matches with leavers')
+
+    p = commands.add_parser('crawl-seq', help = 'crawl matches by sequence number')
+    p.add_argument('--start', type = int, help = 'first match sequence number')
+    p.add_argument('--state', help = 'file recording the crawl position, used to resume')
+    p.add_argument('--matches-requested', type = int, default = 100)
+    p.add_argument('--max-pages', type = int)
+    p.add_argument('--prefetch', type = int, default = 2, help = 'pages fetched ahead')
+    p.add_argument('--fields', nargs = '+', help = 'match attributes to keep (e.g. match_id players[].hero)')
+    p.add_argument('-o', '--output', help = 'append matches to this file (defaults to stdout)')
+    match_filters(p)
+    p.set_defaults(func = crawl_seq)
+
+    p = commands.add_parser('fetch-details', help = 'fetch details of match IDs read from stdin')
+    p.add_argument('input', nargs = '?', help = 'file of match IDs, one per line (defaults to stdin)')
+    p.add_argument('--parse-workers', type = int, default = 0, help = 'parsing processes (0 parses in the fetching threads)')
+    p.add_argument('--fields', nargs = '+', help = 'attributes to keep (e.g. match_id winner players[].hero)')
+    p.add_argument('-o', '--output', help = 'append matches to this file (defaults to stdout)')
+    p.set_defaults(func = fetch_details)
+
+    p = commands.add_parser('export', help = 'convert newline delimited json matches')
+    p.add_argument('input', nargs = '?', help = 'input file (defaults to stdin)')
+    p.add_argument('--format', choices = ('ndjson', 'parquet', 'sqlite'), default = 'ndjson')
+    p.add_argument('--table', default = 'matches', help = 'sqlite table name')
+    p.add_argument('-o', '--output', help = 'output file')
+    p.set_defaults(func = export)
+
+    p = commands.add_parser('poll-live', help = 'write live games whenever they change')
+    p.add_argument('--endpoint', choices = ('league', 'top'), default = 'league')
+    p.add_argument('--partner', type = int, default = 0, help = 'partner of top live games')
+    p.add_argument('--duration', type = float, help = 'stop after this many seconds')
+    p.add_argument('-o', '--output', help = 'append responses to this file (defaults to stdout)')
+    p.set_defaults(func = poll_live)
+
+    p = commands.add_parser('bench', help = 'run offline parser benchmarks')
+    p.add_argument('--iterations', type = int, default = 200)
+    p.add_argument('--live-game', help = 'recorded GetLiveLeagueGames fixture')
+    p.add_argument('--output', help = 'write the report as json to this file')
+    p.add_argument('--baseline', help = 'report to compare results against')
+    p.add_argument('--tolerance', type = float, default = 0.1, help = 'allowed relative regression')
+    p.add_argument('names', nargs = '*', help = 'only run these benchmarks')
+    p.set_defaults(func = bench)
+    return parser
+
+def main(argv = None):
+    """Entry point of the ``d2api`` console script."""
+    parser = _parser()
+    args = parser.parse_args(argv)
+    args.func(args)
@@ -14,3 +14,9 @@ GET_TOURNAMENT_PRIZE_POOL = ROOT_URL + "/IEconDOTA2_570/GetTournamentPrizePool/v
 GET_TOP_LIVE_GAME = ROOT_URL + "/IDOTA2Match_570/GetTopLiveGame/v1/"
 GET_BROADCASTER_INFO = ROOT_URL + "/IDOTA2StreamSystem_570/GetBroadcasterInfo/v1"
 GET_PLAYER_SUMMARIES = ROOT_URL + "/ISteamUser/GetPlayerSummaries/v0002/"
+
+
+def method_name(url):
+    """Name of the WebAPI method an endpoint url points to (e.g. ``GetMatchDetails``)."""
+    parts = [p for p in url.split('?')[0].split('/') if p]
+    return parts[-2] if len(parts) > 2 else url
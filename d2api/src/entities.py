@@ -1,11 +1,21 @@
 #!/usr/bin/env python
 # -*- coding: utf-8 -*-
+import bisect
+import hashlib
 import json
 import os
-import shutil
+import tempfile
+import threading
+from contextlib import contextmanager
+from functools import wraps
 
 import requests
 
+try:
+    import numpy
+except ImportError:
+    numpy = None
+
 # TODO : Implement cleaner way to ensure data is up to date and multi-language compliant
 # This appears to be an especially weird problem since the data has to parsed from a local Dota 2 installation
 
@@ -26,36 +36,278 @@ def _load_local_json(file_name):
     except IOError:
         return {}
 
+def _remote_url(file_name):
+    return "https://raw.githubusercontent.com/whoophee/d2api/master/d2api/ref/{}".format(file_name)
+
 def _load_remote_json(file_name):
     """Helper method to retrieve remote data."""
-    url = "https://raw.githubusercontent.com/whoophee/d2api/master/d2api/ref/{}".format(file_name)
-    res = requests.get(url)
+    res = requests.get(_remote_url(file_name))
     if res.status_code == 200:
         return res.json()
     else: # pragma: no cover
         return {}
 
+def _load_remote_file(file_name):
+    """Helper method to retrieve remote data as bytes."""
+    res = requests.get(_remote_url(file_name))
+    if res.status_code == 200:
+        return res.content
+    else: # pragma: no cover
+        return None
+
+def _local_path(file_name):
+    return os.path.abspath(os.path.join(_here, '..', 'ref', file_name))
+
+def _checksum(data):
+    """SHA-256 checksum of file contents."""
+    return hashlib.sha256(data).hexdigest()
+
+def _local_checksum(file_name):
+    """SHA-256 checksum of a local data file (``None`` if it is missing)."""
+    try:
+        with open(_local_path(file_name), 'rb') as f:
+            return _checksum(f.read())
+    except IOError:
+        return None
+
+def _write_local_file(data, file_name):
+    """Helper method to atomically replace a local data file.
+
+    Content is written to a temporary file in the same folder and renamed over the old file,
+    so readers never see a partially written file.
+    """
+    p = _local_path(file_name)
+    fd, tmp = tempfile.mkstemp(prefix = '.{}.'.format(file_name), dir = os.path.dirname(p))
+    try:
+        with os.fdopen(fd, 'wb') as f:
+            f.write(data)
+        os.replace(tmp, p)
+    except BaseException:
+        os.remove(tmp)
+        raise
+
 def _write_local_json(data, file_name):
     """Helper method to write local data."""
-    p = os.path.abspath(os.path.join(_here, '..', 'ref', file_name))
-    with open(p, 'w') as outfile:
-        if file_name == 'meta.json':
-            json.dump(data, outfile, sort_keys=True, indent=4)
-        else:
-            json.dump(data, outfile)
+    if file_name == 'meta.json':
+        content = json.dumps(data, sort_keys=True, indent=4)
+    else:
+        content = json.dumps(data)
+    _write_local_file(content.encode('utf-8'), file_name)
+
+def _load_patches(meta):
+    """Sorted list of ``(release_time, version)`` of known game patches."""
+    return sorted((t, v) for v, t in meta.get('patches', {}).items())
 
+# Lookup tables of the latest patch
 all_heroes = _load_local_json('heroes.json')
 all_items = _load_local_json('items.json')
 all_abilities = _load_local_json('abilities.json')
 
+# Older patches are stored as overrides of the latest tables, so data shared between
+# patches is only held once: {version: {'heroes': {id: data or None}, 'items': ..., 'abilities': ...}}
+_history = _load_local_json('history.json')
+_patches = _load_patches(_load_local_json('meta.json'))
+
+# Patch used by entities built in the current thread (see using_patch)
+_active_patch = threading.local()
+
+def patch_for_time(timestamp):
+    """Game patch that was live at a given time.
+
+    Parameters
+    ----------
+    timestamp : int
+        Unix timestamp (e.g. ``start_time`` of a match)
+
+    Returns
+    -------
+    str
+        Patch version (``None`` if the time precedes all known patches)
+    """
+    idx = bisect.bisect_right(_patches, (timestamp, '\uffff')) - 1
+    return _patches[idx][1] if idx >= 0 else None
+
+@contextmanager
+def using_patch(patch = None, timestamp = None):
+    """Resolve entities built in the current thread against the data of a patch.
+
+    Parameters
+    ----------
+    patch : str, optional
+        Patch version (e.g. ``'7.20'``)
+    timestamp : int, optional
+        Unix timestamp used to find the patch, if ``patch`` is not given.
+        If neither is given, the active patch is left unchanged.
+    """
+    previous = getattr(_active_patch, 'version', None)
+    if patch is None:
+        patch = patch_for_time(timestamp) if timestamp is not None else previous
+    _active_patch.version = patch
+    try:
+        yield patch
+    finally:
+        _active_patch.version = previous
+
+def _resolve(base, table, key, patch, timestamp):
+    """Data of an entity, as of a patch (by default the thread's active patch, else the latest one)."""
+    if patch is None:
+        patch = patch_for_time(timestamp) if timestamp is not None else getattr(_active_patch, 'version', None)
+    if patch is not None:
+        overrides = _history.get(patch)
+        if overrides:
+            table_overrides = overrides.get(table)
+            if table_overrides and key in table_overrides:
+                return table_overrides[key] or {}
+    return base.get(key, {})
+
+# Entities already built in the current thread's batch (see shared_entities)
+_batch = threading.local()
+
+@contextmanager
+def shared_entities():
+    """Build repeated entities in the current thread from a copy of the first one.
+
+    Batches of responses mention the same heroes, items and abilities over and over. Within
+    this context, each distinct entity is resolved once and later ones are copied from it.
+    """
+    previous = getattr(_batch, 'memo', None)
+    _batch.memo = previous if previous is not None else {}
+    try:
+        yield
+    finally:
+        _batch.memo = previous
+
+def _memoized(init):
+    """Decorate an entity ``__init__`` to reuse entities built earlier in the batch."""
+    @wraps(init)
+    def __init__(self, *args, **kwargs):
+        memo = getattr(_batch, 'memo', None)
+        # only entities resolved by id alone (the usual case within parsers) are shared
+        if memo is None or kwargs or len(args) != 1:
+            init(self, *args, **kwargs)
+            return
+        memo_key = (type(self), args[0], getattr(_active_patch, 'version', None))
+        built = memo.get(memo_key)
+        if built is None:
+            init(self, *args)
+            memo[memo_key] = built = dict(self)
+        else:
+            dict.update(self, built)
+    return __init__
+
+# Serializes updates of the local data
+_update_lock = threading.Lock()
+
+
+def _normalize_name(name):
+    """Case-folded name, with underscores treated as spaces."""
+    return name.casefold().replace('_', ' ').strip()
+
+class _NameIndex:
+    """Reverse index of a lookup table, by name and alias.
+
+    Names are indexed exactly, case-folded, and as a sorted key list for prefix search.
+    Internal names are also indexed without their prefix (e.g. ``blink`` for ``item_blink``).
+    """
+    def __init__(self, table, name_key, prefix, alias_key = None):
+        self.exact = {}
+        self.folded = {}
+        for entity_id in sorted(table, key = lambda k: int(k) if k.lstrip('-').isdigit() else 0):
+            data = table[entity_id]
+            name = data.get(name_key)
+            if not name:
+                continue
+            names = [name]
+            if name.startswith(prefix):
+                names.append(name[len(prefix):])
+            if alias_key:
+                names.extend(data.get(alias_key, []))
+            for n in names:
+                self.exact.setdefault(n, entity_id)
+                self.folded.setdefault(_normalize_name(n), entity_id)
+        self.keys = sorted(self.folded)
+
+    def find(self, name):
+        """ID of the entity with this name or alias (``None`` if unknown)."""
+        entity_id = self.exact.get(name)
+        if entity_id is None:
+            entity_id = self.folded.get(_normalize_name(name))
+        return entity_id
+
+    def find_prefix(self, prefix, limit = None):
+        """IDs of entities having a name or alias starting with ``prefix``."""
+        prefix = _normalize_name(prefix)
+        ids = []
+        for i in range(bisect.bisect_left(self.keys, prefix), len(self.keys)):
+            key = self.keys[i]
+            if not key.startswith(prefix):
+                break
+            entity_id = self.folded[key]
+            if entity_id not in ids:
+                ids.append(entity_id)
+                if limit is not None and len(ids) >= limit:
+                    break
+        return ids
+
+def _build_indexes(heroes, items, abilities):
+    return {
+        'heroes': _NameIndex(heroes, 'hero_name', 'npc_dota_hero_'),
+        'items': _NameIndex(items, 'item_name', 'item_', 'item_aliases'),
+        'abilities': _NameIndex(abilities, 'ability_name', '')
+    }
+
+_name_indexes = _build_indexes(all_heroes, all_items, all_abilities)
 
 # Most ID based response values have more data associated with them.
 # This wrapper helps fetch them without having to use auxillary/helper functions.
 class Entity(dict):
     """Generic entity class"""
+    __slots__ = ()
+
+    # Name of the reference table the entity is looked up in
+    _table = None
+
     def __str__(self):
         return self.__repr__()
 
+    @classmethod
+    def by_name(cls, name):
+        """Find an entity by name or alias.
+
+        Exact names are tried first, then names ignoring case (and ``_``/space differences).
+        Internal names may be given with or without their prefix (e.g. ``npc_dota_hero_axe`` or ``axe``).
+
+        Parameters
+        ----------
+        name : str
+            Name or alias (e.g. ``'bkb'``)
+
+        Returns
+        -------
+        Entity
+            Matching entity, or ``None`` if the name is unknown
+        """
+        entity_id = _name_indexes[cls._table].find(name)
+        return cls(entity_id) if entity_id is not None else None
+
+    @classmethod
+    def by_prefix(cls, prefix, limit = None):
+        """Find entities having a name or alias starting with ``prefix`` (ignoring case).
+
+        Parameters
+        ----------
+        prefix : str
+            Beginning of a name or alias
+        limit : int, optional
+            Maximum number of entities returned
+
+        Returns
+        -------
+        list(Entity)
+            Matching entities, ordered by name
+        """
+        return [cls(i) for i in _name_indexes[cls._table].find_prefix(prefix, limit)]
+
 class Hero(Entity):
     """Wrapper to map hero information to hero_id
 
@@ -65,18 +317,30 @@ class Hero(Entity):
         Unique identifier of hero
     hero_name : str
         Name of the hero
+
+    Parameters
+    ----------
+    hero_id : int
+        Unique identifier of hero
+    patch : str, optional
+        Resolve data as of this game patch
+    timestamp : int, optional
+        Resolve data as of the patch live at this unix time
     """
+    _table = 'heroes'
+
     def __repr__(self):
         return "Hero(hero_id = {})".format(self['hero_id'])
 
     def __bool__(self):
         return self['hero_id'] != None
 
-    def __init__(self, hero_id):
+    @_memoized
+    def __init__(self, hero_id, patch = None, timestamp = None):
         if hero_id != None:
             hero_id = str(hero_id)
         self['hero_id'] = hero_id
-        cur_hero = all_heroes.get(hero_id, {})
+        cur_hero = _resolve(all_heroes, 'heroes', hero_id, patch, timestamp)
         self['hero_name'] = cur_hero.get('hero_name', 'unknown_hero')
 
 
@@ -93,18 +357,30 @@ class Item(Entity):
         List of names by which the item is known
     item_name : str
         Name of the item
+
+    Parameters
+    ----------
+    item_id : int
+        Unique identifier of item
+    patch : str, optional
+        Resolve data as of this game patch
+    timestamp : int, optional
+        Resolve data as of the patch live at this unix time
     """
+    _table = 'items'
+
     def __repr__(self):
         return "Item(item_id = {})".format(self['item_id'])
 
     def __bool__(self):
         return self['item_id'] != None
 
-    def __init__(self, item_id):
+    @_memoized
+    def __init__(self, item_id, patch = None, timestamp = None):
         if item_id != None:
             item_id = str(item_id)
         self['item_id'] = item_id
-        cur_item = all_items.get(item_id, {})
+        cur_item = _resolve(all_items, 'items', item_id, patch, timestamp)
         self['item_cost'] = cur_item.get('item_cost', 0)
         self['item_aliases'] = cur_item.get('item_aliases', [])
         self['item_name'] = cur_item.get('item_name', 'unknown_item')
@@ -118,24 +394,57 @@ class Ability(Entity):
         Unique identifier of ability
     ability_name : str
         Name of the ability
+
+    Parameters
+    ----------
+    ability_id : int
+        Unique identifier of ability
+    patch : str, optional
+        Resolve data as of this game patch
+    timestamp : int, optional
+        Resolve data as of the patch live at this unix time
     """
+    _table = 'abilities'
+
     def __repr__(self):
         return "Ability(ability_id = {})".format(self['ability_id'])
 
     def __bool__(self):
         return self['ability_id'] != None
 
-    def __init__(self, ability_id):
+    @_memoized
+    def __init__(self, ability_id, patch = None, timestamp = None):
         if ability_id != None:
             ability_id = str(ability_id)
         self['ability_id'] = ability_id
-        cur_ability = all_abilities.get(ability_id, {})
+        cur_ability = _resolve(all_abilities, 'abilities', ability_id, patch, timestamp)
         self['ability_name'] = cur_ability.get('ability_name', 'unknown_ability')
 
 # Removes the hassle of having to manually convert between Steam 32-bit/64-bit IDs
+# Offset between 32-bit and 64-bit Steam IDs of individual accounts
+_STEAM64_BASE = 76561197960265728
+
+# SteamAccount instances are immutable, so one instance is shared by all equal account ids
+_account_cache = {}
+_ACCOUNT_CACHE_SIZE = 1 << 16
+
+def _steam_ids(account_id):
+    """``(id32, id64)`` of a 32 or 64-bit Steam ID."""
+    if account_id is None:
+        return None, None
+    account_id = int(account_id)
+    if account_id < _STEAM64_BASE:
+        return account_id, account_id + _STEAM64_BASE
+    return account_id - _STEAM64_BASE, account_id
+
+def _readonly(self, *args, **kwargs):
+    raise TypeError("'{}' object is immutable".format(type(self).__name__))
+
 class SteamAccount(Entity):
     """Wrapper to implicitly store steam32 and steam64 account IDs
 
+    Instances are immutable, and created once per account ID.
+
     Attributes
     ----------
     id32 : int
@@ -143,53 +452,158 @@ class SteamAccount(Entity):
     id64 : int
         64-bit Steam ID
     """
+    __slots__ = ()
+
     def __repr__(self):
         return "SteamAccount(account_id = {})".format(self['id32'])
 
     def __bool__(self):
         return self['id32'] != None
 
-    def __init__(self, account_id):
-        if account_id is None:
-            self['id32'] = self['id64'] = None
-        else:
-            account_id = int(account_id)
-            steam64 = 76561197960265728
-            if account_id < steam64:
-                self['id32'] = account_id
-                self['id64'] = account_id + steam64
-            else:
-                self['id32'] = account_id - steam64
-                self['id64'] = account_id
+    def __new__(cls, account_id = None):
+        key = (cls, account_id)
+        try:
+            return _account_cache[key]
+        except KeyError:
+            pass
+        except TypeError:
+            key = None
 
-def _update(purge):
-    """Helper function to synchronize local with remote data."""
+        self = dict.__new__(cls)
+        id32, id64 = _steam_ids(account_id)
+        dict.__setitem__(self, 'id32', id32)
+        dict.__setitem__(self, 'id64', id64)
+        if key is not None:
+            if len(_account_cache) >= _ACCOUNT_CACHE_SIZE:
+                _account_cache.clear()
+            _account_cache[key] = self
+        return self
+
+    def __init__(self, account_id = None):
+        # initialized in __new__
+        pass
+
+    def __reduce__(self):
+        return (type(self), (self['id32'],))
+
+    def __copy__(self):
+        return self
+
+    def __deepcopy__(self, memo):
+        return self
+
+    __setitem__ = __delitem__ = __ior__ = _readonly
+    clear = pop = popitem = setdefault = update = _readonly
+
+def steam_ids_to_32(account_ids):
+    """Convert a batch of 32 or 64-bit Steam IDs to 32-bit Steam IDs.
+
+    Parameters
+    ----------
+    account_ids : iterable(int) or numpy.ndarray
+        Steam IDs (both kinds may be mixed)
+
+    Returns
+    -------
+    list(int) or numpy.ndarray
+        32-bit Steam IDs (an ``int64`` array if ``account_ids`` is an array)
+    """
+    if numpy is not None and isinstance(account_ids, numpy.ndarray):
+        ids = account_ids.astype(numpy.int64, copy = False)
+        return numpy.where(ids >= _STEAM64_BASE, ids - _STEAM64_BASE, ids)
+    return [_steam_ids(a)[0] for a in account_ids]
+
+def steam_ids_to_64(account_ids):
+    """Convert a batch of 32 or 64-bit Steam IDs to 64-bit Steam IDs.
+
+    Parameters
+    ----------
+    account_ids : iterable(int) or numpy.ndarray
+        Steam IDs (both kinds may be mixed)
+
+    Returns
+    -------
+    list(int) or numpy.ndarray
+        64-bit Steam IDs (an ``int64`` array if ``account_ids`` is an array)
+    """
+    if numpy is not None and isinstance(account_ids, numpy.ndarray):
+        ids = account_ids.astype(numpy.int64, copy = False)
+        return numpy.where(ids < _STEAM64_BASE, ids + _STEAM64_BASE, ids)
+    return [_steam_ids(a)[1] for a in account_ids]
+
+def _reload():
+    """Load local data and swap it in.
+
+    Tables are fully loaded before being published, and entities read each table once
+    on construction, so entities built concurrently see either the old or the new data.
+    """
     global all_heroes
     global all_items
     global all_abilities
+    global _history
+    global _patches
+    global _name_indexes
+
+    heroes = _load_local_json('heroes.json')
+    items = _load_local_json('items.json')
+    abilities = _load_local_json('abilities.json')
+    history = _load_local_json('history.json')
+    patches = _load_patches(_load_local_json('meta.json'))
+
+    indexes = _build_indexes(heroes, items, abilities)
+
+    all_heroes, all_items, all_abilities, _history, _patches = heroes, items, abilities, history, patches
+    _name_indexes = indexes
+
+def _update(purge):
+    """Helper function to synchronize local with remote data.
+
+    Only files whose checksum differs from the one listed in the remote ``meta.json`` are downloaded.
+    Without remote checksums, all files are downloaded if the data version changed (or ``purge`` is set).
+    """
     try:
-        path = os.path.abspath(os.path.join(_here, '..', 'ref'))
-        if purge and os.path.exists(path):
-            shutil.rmtree(path)
-        # Find version of local data
-        local_meta = _load_local_json('meta.json')
-        local_version = local_meta.get('version')
-        # find version of remote data
-        remote_meta = _load_remote_json('meta.json')
-        remote_version = remote_meta.get('version')
-
-        # update local files if they're outdated
-        if local_version != remote_version:
+        with _update_lock:
+            # find version of remote data
+            remote_meta = _load_remote_json('meta.json')
+            if not remote_meta:
+                return remote_meta
+
+            # Find version of local data
+            local_meta = _load_local_json('meta.json')
+            outdated = purge or local_meta.get('version') != remote_meta.get('version')
+            checksums = remote_meta.get('checksums', {})
+            content_files = remote_meta.get('content_files', [])
+
             _ensure_data_folder()
-            _write_local_json(remote_meta, "meta.json")
+            downloads = {}
+            for content_name in content_files:
+                expected = checksums.get(content_name)
+                local = _local_checksum(content_name)
+                if expected is None and not outdated and local is not None:
+                    continue
+                if expected is not None and local == expected:
+                    continue
+
+                content = _load_remote_file(content_name)
+                if content is None: # pragma: no cover
+                    raise IOError("Could not download \"{}\"".format(content_name))
+                if expected is not None and _checksum(content) != expected: # pragma: no cover
+                    raise IOError("Checksum mismatch for \"{}\"".format(content_name))
+                downloads[content_name] = content
+
+            # all files are downloaded and verified before any of them replaces local data
+            for content_name, content in downloads.items():
+                _write_local_file(content, content_name)
 
-            for content_name in remote_meta.get('content_files', []):
-                remote_content = _load_remote_json(content_name)
-                _write_local_json(remote_content, content_name)
+            if purge:
+                keep = set(content_files) | {'meta.json'}
+                for file_name in os.listdir(_local_path('')):
+                    if file_name.endswith('.json') and file_name not in keep:
+                        os.remove(_local_path(file_name))
 
-        all_heroes = _load_local_json('heroes.json')
-        all_items = _load_local_json('items.json')
-        all_abilities = _load_local_json('abilities.json')
-        return remote_meta
+            if downloads or local_meta != remote_meta:
+                _write_local_json(remote_meta, 'meta.json')
+            _reload()
+            return remote_meta
     except Exception as e: # pragma: no cover
         return {"exception":e}
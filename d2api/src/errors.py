@@ -23,7 +23,29 @@ class APIInsufficientArguments(BaseError):
     def __init__(self, query = None, params = None):
         self._msg = "HTTP 400: Insufficient arguments for \"{0}\". Parameters provided: {1}".format(query, params)
 
+class APIRateLimitError(BaseError):
+    """Error for throttled requests."""
+    def __init__(self):
+        self._msg = "HTTP 429: Too many requests."
+
 class APITimeoutError(BaseError): # pragma: no cover
     """Error for server timeout."""
     def __init__(self):
-        self._msg = "HTTP 503: Timeout error."
\ No newline at end of file
+        self._msg = "HTTP 503: Timeout error."
+
+class APIDeadlineExceeded(BaseError):
+    """Error for calls that could not complete within their deadline."""
+    def __init__(self, stage = None):
+        self._msg = "Deadline exceeded while {}.".format(stage) if stage else "Deadline exceeded."
+
+class APICancelled(BaseError):
+    """Error for calls cancelled by their caller."""
+    def __init__(self):
+        self._msg = "Call cancelled."
+
+class APICircuitOpen(BaseError):
+    """Error for calls to an endpoint that failed repeatedly (see :any:`CircuitBreaker`)."""
+    def __init__(self, endpoint = None, retry_after = None):
+        self.endpoint = endpoint
+        self.retry_after = retry_after
+        self._msg = "\"{}\" is failing, calls are suspended for {:.0f}s.".format(endpoint, retry_after or 0)
@@ -0,0 +1,69 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+"""Predicates over raw matches.
+
+Predicates are evaluated on the decoded json of every match before it is parsed, so rejected
+matches never build players or entities. They are passed as ``where`` to match history
+requests and iterators, or to :any:`parse_many`::
+
+    ranked = filters.all_of(filters.lobby_type(7), filters.human_players(10), filters.no_leavers)
+    for page in api.iter_match_history_by_sequence_num(start, where = ranked):
+        ...
+
+Any callable taking the match dict and returning a bool can be used as a predicate. Predicates
+of a :any:`ParsePipeline` with parsing processes must be picklable (e.g. module-level functions,
+or the predicates below, which compare equal when built from the same arguments).
+"""
+
+class _Predicate:
+    def __init__(self, *args):
+        self.args = args
+
+    def __eq__(self, other):
+        return type(self) is type(other) and self.args == other.args
+
+    def __hash__(self):
+        return hash((type(self), self.args))
+
+    def __repr__(self):
+        return '{}{!r}'.format(type(self).__name__, self.args)
+
+class _Equals(_Predicate):
+    def __call__(self, match):
+        return match.get(self.args[0]) in self.args[1]
+
+class _AllOf(_Predicate):
+    def __call__(self, match):
+        return all(p(match) for p in self.args)
+
+class _AnyOf(_Predicate):
+    def __call__(self, match):
+        return any(p(match) for p in self.args)
+
+def equals(key, *values):
+    """Matches whose value at ``key`` is one of ``values``."""
+    return _Equals(key, frozenset(values))
+
+def lobby_type(*lobby_types):
+    """Matches of one of the given lobby types (e.g. ``7`` for ranked matchmaking)."""
+    return equals('lobby_type', *lobby_types)
+
+def game_mode(*game_modes):
+    """Matches of one of the given game modes (e.g. ``22`` for ranked all pick)."""
+    return equals('game_mode', *game_modes)
+
+def human_players(count = 10):
+    """Matches with exactly ``count`` human players."""
+    return equals('human_players', count)
+
+def no_leavers(match):
+    """Matches in which no player abandoned (see :any:`MatchDetails.has_leavers`)."""
+    return not any(p.get('leaver_status', 0) for p in match.get('players', ()))
+
+def all_of(*predicates):
+    """Matches accepted by every predicate (evaluated in the given order)."""
+    return _AllOf(*predicates)
+
+def any_of(*predicates):
+    """Matches accepted by at least one predicate."""
+    return _AnyOf(*predicates)
@@ -0,0 +1,167 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+"""Follow leagues with polling that adapts to their activity.
+
+:class:`LeagueTracker` combines live league games, league match history and prize pools.
+Each source is polled on its own schedule, which speeds up while something changes and backs
+off while the league is idle::
+
+    tracker = LeagueTracker(api, [10749], on_match = store_match)
+    tracker.run()
+"""
+import time
+
+import requests
+
+from . import errors
+
+class _Schedule:
+    """Polling interval that resets to ``fastest`` on activity and doubles while idle."""
+    def __init__(self, fastest, slowest):
+        self.fastest = fastest
+        self.slowest = slowest
+        self.interval = fastest
+        self.due = 0
+
+    def done(self, now, active):
+        self.interval = self.fastest if active else min(self.slowest, self.interval * 2)
+        self.due = now + self.interval
+
+    def expedite(self, now):
+        self.interval = self.fastest
+        self.due = min(self.due, now)
+
+def _series_key(game):
+    teams = sorted((game['radiant_team'].get('team_id', 0), game['dire_team'].get('team_id', 0)))
+    return '{}:{}:{}'.format(game['league_id'], teams[0], teams[1])
+
+class LeagueTracker:
+    """Track live games, finished matches, series and prize pools of leagues.
+
+    Details of a finished match are fetched once, when it first appears in the match history of
+    its league. Series state is updated from live games.
+
+    Parameters
+    ----------
+    api : APIWrapper
+        Wrapper used to perform requests
+    league_ids : list(int)
+        Tracked leagues
+    on_match : callable, optional
+        Called with the :any:`MatchDetails` of every newly finished match
+    live_interval : tuple(float, float)
+        Fastest and slowest polling interval (in seconds) of live league games
+    history_interval : tuple(float, float)
+        Fastest and slowest polling interval of league match histories
+    prize_pool_interval : tuple(float, float)
+        Fastest and slowest polling interval of prize pools
+    backfill : bool
+        Fetch matches finished before the tracker started (only the first history page)
+
+    Attributes
+    ----------
+    live : dict
+        Live games of the tracked leagues by match ID
+    series : dict
+        Series state by ``'<league_id>:<team_id>:<team_id>'``, with ``series_type``,
+        ``radiant_series_wins``, ``dire_series_wins`` and the ``match_ids`` seen live
+    prize_pools : dict
+        Last known prize pool by league ID
+    """
+    def __init__(self, api, league_ids, on_match = None, live_interval = (15, 300), history_interval = (60, 3600),
+                 prize_pool_interval = (300, 6 * 3600), backfill = False):
+        self.api = api
+        self.league_ids = set(league_ids)
+        self.on_match = on_match
+        self.backfill = backfill
+
+        self.live = {}
+        self.series = {}
+        self.prize_pools = {}
+
+        self._last_match_id = {}
+        self._schedules = {
+            'live': _Schedule(*live_interval),
+            'history': _Schedule(*history_interval),
+            'prize_pool': _Schedule(*prize_pool_interval)
+        }
+
+    def poll(self, now = None):
+        """Perform the requests that are due.
+
+        Failed requests are retried on the slower schedule of an idle source.
+
+        Returns
+        -------
+        float
+            Seconds until the next request is due
+        """
+        now = time.time() if now is None else now
+        tasks = (('live', self._poll_live), ('history', self._poll_history), ('prize_pool', self._poll_prize_pools))
+        for name, task in tasks:
+            schedule = self._schedules[name]
+            if schedule.due > now:
+                continue
+            try:
+                active = task(now)
+            except (errors.BaseError, requests.RequestException):
+                active = False
+            schedule.done(now, active)
+        return max(0, min(s.due for s in self._schedules.values()) - now)
+
+    def run(self, stop = None):
+        """Poll until ``stop`` (a ``threading.Event``) is set, or forever."""
+        while stop is None or not stop.is_set():
+            delay = self.poll()
+            if stop is None:
+                time.sleep(delay)
+            else:
+                stop.wait(delay)
+
+    def _poll_live(self, now):
+        games = self.api.get_live_league_games()['games']
+        live = {g['match_id']: g for g in games if g.get('league_id') in self.league_ids}
+
+        for match_id, game in live.items():
+            series = self.series.setdefault(_series_key(game), {'league_id': game['league_id'], 'match_ids': []})
+            series['series_type'] = game.get('series_type')
+            series['radiant_series_wins'] = game.get('radiant_series_wins')
+            series['dire_series_wins'] = game.get('dire_series_wins')
+            if match_id not in series['match_ids']:
+                series['match_ids'].append(match_id)
+
+        finished = set(self.live) - set(live)
+        self.live = live
+        if finished:
+            # finished games show up in match history, and may change prize pools
+            self._schedules['history'].expedite(now)
+            self._schedules['prize_pool'].expedite(now)
+        return bool(live)
+
+    def _poll_history(self, now):
+        active = False
+        for league_id in sorted(self.league_ids):
+            page = self.api.get_match_history(league_id = league_id)
+            match_ids = sorted(m['match_id'] for m in page.get('matches', []))
+            last_match_id = self._last_match_id.get(league_id)
+            if last_match_id is None and not self.backfill:
+                self._last_match_id[league_id] = match_ids[-1] if match_ids else 0
+                continue
+
+            for match_id in match_ids:
+                if match_id <= (last_match_id or 0):
+                    continue
+                match = self.api.get_match_details(match_id)
+                self._last_match_id[league_id] = match_id
+                active = True
+                if self.on_match is not None:
+                    self.on_match(match)
+        return active
+
+    def _poll_prize_pools(self, now):
+        changed = False
+        for league_id in sorted(self.league_ids):
+            prize_pool = self.api.get_tournament_prize_pool(leagueid = league_id).get('prize_pool')
+            changed |= self.prize_pools.get(league_id, prize_pool) != prize_pool
+            self.prize_pools[league_id] = prize_pool
+        return changed
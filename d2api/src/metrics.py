@@ -0,0 +1,178 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+"""In-process request metrics, exportable in Prometheus text format."""
+import threading
+
+from . import errors
+
+DEFAULT_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10)
+
+def _labels(**labels):
+    """Render a Prometheus label set."""
+    escape = lambda v: str(v).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+    return '{' + ','.join('{}="{}"'.format(k, escape(v)) for k, v in sorted(labels.items())) + '}'
+
+def _format_value(value):
+    return repr(float(value)) if isinstance(value, float) else str(value)
+
+class Histogram:
+    """Cumulative histogram with fixed bucket upper bounds.
+
+    Parameters
+    ----------
+    buckets : tuple(float)
+        Sorted bucket upper bounds (``+Inf`` is implied)
+    """
+    def __init__(self, buckets = DEFAULT_BUCKETS):
+        self.buckets = tuple(buckets)
+        self.counts = [0] * (len(self.buckets) + 1)
+        self.sum = 0.0
+        self.count = 0
+
+    def observe(self, value):
+        for i, bound in enumerate(self.buckets):
+            if value <= bound:
+                self.counts[i] += 1
+                break
+        else:
+            self.counts[-1] += 1
+        self.sum += value
+        self.count += 1
+
+    def cumulative(self):
+        """List of ``(upper_bound, cumulative_count)`` pairs, ending with ``+Inf``."""
+        total = 0
+        ret = []
+        for bound, count in zip(self.buckets + (float('inf'),), self.counts):
+            total += count
+            ret.append((bound, total))
+        return ret
+
+class MetricsCollector:
+    """Collects per-endpoint counters and latency histograms from :any:`APIWrapper` hooks.
+
+    Usage::
+
+        collector = MetricsCollector()
+        collector.attach(api)
+        ...
+        print(collector.to_prometheus())
+
+    Parameters
+    ----------
+    buckets : tuple(float)
+        Latency histogram bucket bounds in seconds
+    namespace : str
+        Prefix of exported metric names
+    """
+    def __init__(self, buckets = DEFAULT_BUCKETS, namespace = 'd2api'):
+        self.buckets = buckets
+        self.namespace = namespace
+        self._lock = threading.Lock()
+        self.requests = {}
+        self.errors = {}
+        self.response_bytes = {}
+        self.latency = {}
+        self._limiters = []
+
+    def attach(self, api):
+        """Register the collector's hooks on an :any:`APIWrapper`, and export its priority lanes."""
+        self._limiters.append(api._limiter)
+        api.add_hook('after_response', self.on_response)
+        api.add_hook('after_decode', self.on_complete)
+        api.add_hook('after_parse', self.on_complete)
+        api.add_hook('on_error', self.on_error)
+        return self
+
+    def detach(self, api):
+        """Unregister hooks added with :any:`attach`."""
+        if api._limiter in self._limiters:
+            self._limiters.remove(api._limiter)
+        api.remove_hook('after_response', self.on_response)
+        api.remove_hook('after_decode', self.on_complete)
+        api.remove_hook('after_parse', self.on_complete)
+        api.remove_hook('on_error', self.on_error)
+
+    def _observe(self, endpoint, phase, value):
+        key = (endpoint, phase)
+        if key not in self.latency:
+            self.latency[key] = Histogram(self.buckets)
+        self.latency[key].observe(value)
+
+    def on_response(self, info):
+        with self._lock:
+            key = (info['endpoint'], info['status'])
+            self.requests[key] = self.requests.get(key, 0) + 1
+            self.response_bytes[info['endpoint']] = self.response_bytes.get(info['endpoint'], 0) + info['bytes']
+
+    def on_complete(self, info):
+        # unparsed responses end at 'after_decode', parsed ones at 'after_parse'
+        if 'total' not in info['timings']:
+            return
+        with self._lock:
+            for phase, value in info['timings'].items():
+                self._observe(info['endpoint'], phase, value)
+
+    def on_error(self, info):
+        with self._lock:
+            if 'status' not in info:
+                key = (info['endpoint'], 'none')
+                self.requests[key] = self.requests.get(key, 0) + 1
+            key = (info['endpoint'], type(info['error']).__name__)
+            self.errors[key] = self.errors.get(key, 0) + 1
+            self._observe(info['endpoint'], 'total', info['timings']['total'])
+
+    def throttled(self, endpoint = None):
+        """Number of HTTP 429 responses (for one endpoint, or all of them)."""
+        with self._lock:
+            return sum(v for (e, err), v in self.errors.items()
+                       if err == errors.APIRateLimitError.__name__ and endpoint in (None, e))
+
+    def to_prometheus(self):
+        """Render all metrics in the Prometheus text exposition format."""
+        ns = self.namespace
+        lines = []
+        with self._lock:
+            lines.append('# HELP {}_requests_total WebAPI responses by endpoint and HTTP status.'.format(ns))
+            lines.append('# TYPE {}_requests_total counter'.format(ns))
+            for (endpoint, status), v in sorted(self.requests.items(), key = str):
+                lines.append('{}_requests_total{} {}'.format(ns, _labels(endpoint = endpoint, status = status), v))
+
+            lines.append('# HELP {}_errors_total Failed WebAPI calls by endpoint and error type.'.format(ns))
+            lines.append('# TYPE {}_errors_total counter'.format(ns))
+            for (endpoint, error), v in sorted(self.errors.items()):
+                lines.append('{}_errors_total{} {}'.format(ns, _labels(endpoint = endpoint, error = error), v))
+
+            lines.append('# HELP {}_response_bytes_total Downloaded response body bytes by endpoint.'.format(ns))
+            lines.append('# TYPE {}_response_bytes_total counter'.format(ns))
+            for endpoint, v in sorted(self.response_bytes.items()):
+                lines.append('{}_response_bytes_total{} {}'.format(ns, _labels(endpoint = endpoint), v))
+
+            lines.append('# HELP {}_request_duration_seconds Time spent per request phase by endpoint.'.format(ns))
+            lines.append('# TYPE {}_request_duration_seconds histogram'.format(ns))
+            for (endpoint, phase), h in sorted(self.latency.items()):
+                for bound, count in h.cumulative():
+                    le = '+Inf' if bound == float('inf') else _format_value(float(bound))
+                    lines.append('{}_request_duration_seconds_bucket{} {}'.format(ns, _labels(endpoint = endpoint, phase = phase, le = le), count))
+                lines.append('{}_request_duration_seconds_sum{} {}'.format(ns, _labels(endpoint = endpoint, phase = phase), _format_value(h.sum)))
+                lines.append('{}_request_duration_seconds_count{} {}'.format(ns, _labels(endpoint = endpoint, phase = phase), h.count))
+
+        lanes = {}
+        for limiter in self._limiters:
+            for lane, stats in limiter.stats().items():
+                total = lanes.setdefault(lane, dict.fromkeys(('queued', 'max_queued', 'granted', 'rejected', 'wait'), 0))
+                for k in total:
+                    total[k] += stats[k]
+        metrics = (
+            ('lane_queue_depth', 'gauge', 'queued', 'Calls waiting for the rate limit by priority lane.'),
+            ('lane_max_queue_depth', 'gauge', 'max_queued', 'Largest number of calls that waited at once by priority lane.'),
+            ('lane_granted_total', 'counter', 'granted', 'Rate limit slots granted by priority lane.'),
+            ('lane_rejected_total', 'counter', 'rejected', 'Calls refused by the rate limit (deadline) by priority lane.'),
+            ('lane_wait_seconds_total', 'counter', 'wait', 'Time spent waiting for the rate limit by priority lane.')
+        )
+        for name, kind, key, descr in metrics:
+            lines.append('# HELP {}_{} {}'.format(ns, name, descr))
+            lines.append('# TYPE {}_{} {}'.format(ns, name, kind))
+            for lane, stats in sorted(lanes.items()):
+                lines.append('{}_{}{} {}'.format(ns, name, _labels(lane = lane), _format_value(stats[key])))
+        return '\n'.join(lines) + '\n'
@@ -0,0 +1,264 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+"""Local mock of the Steam WebAPI endpoints used by d2api.
+
+The server answers every URL in :mod:`d2api.src.endpoints` with deterministic payloads from
+:mod:`d2api.src.samples`. Latency, error injection and rate limiting are configurable, which
+makes it suitable for offline integration and load testing::
+
+    with MockServer(latency = 0.05, error_rates = {429: 0.01}) as server:
+        api = d2api.APIWrapper(api_key = 'mock', base_url = server.url, requests_per_second = -1)
+        api.get_match_details(4176987886)
+
+It can also be run standalone with ``python -m d2api.src.mockserver``.
+"""
+import argparse
+import hashlib
+import http
+import random
+import socketserver
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, HTTPServer
+from urllib.parse import parse_qsl, urlsplit
+
+from . import endpoints
+from . import samples
+
+class _HTTPError(Exception):
+    def __init__(self, status):
+        self.status = status
+
+def _require(params, *keys):
+    """Emulate the HTTP 400 returned for missing arguments."""
+    for k in keys:
+        if not params.get(k):
+            raise _HTTPError(400)
+
+def _match_details(server, params):
+    _require(params, 'match_id')
+    return {'result': samples.match_details(int(params['match_id']))}
+
+def _live_league_games(server, params):
+    return samples.live_league_games(server.live_games, server.live_seed())
+
+def _top_live_game(server, params):
+    return samples.top_live_game(params.get('partner', 0), seed = server.live_seed())
+
+def _broadcaster_info(server, params):
+    _require(params, 'broadcaster_steam_id')
+    return samples.broadcaster_info(**params)
+
+def _player_summaries(server, params):
+    _require(params, 'steamids')
+    return samples.player_summaries(**params)
+
+def _path(url):
+    return urlsplit(url).path.rstrip('/')
+
+_ROUTES = {
+    _path(endpoints.GET_MATCH_HISTORY): lambda server, params: samples.match_history(**params),
+    _path(endpoints.GET_MATCH_HISTORY_BY_SEQ_NUM): lambda server, params: samples.match_history_by_sequence_num(**params),
+    _path(endpoints.GET_MATCH_DETAILS): _match_details,
+    _path(endpoints.GET_LIVE_LEAGUE_GAMES): _live_league_games,
+    _path(endpoints.GET_TEAM_INFO_BY_TEAM_ID): lambda server, params: samples.team_info_by_team_id(**params),
+    _path(endpoints.GET_HEROES): lambda server, params: samples.heroes(**params),
+    _path(endpoints.GET_GAME_ITEMS): lambda server, params: samples.game_items(**params),
+    _path(endpoints.GET_TOURNAMENT_PRIZE_POOL): lambda server, params: samples.tournament_prize_pool(**params),
+    _path(endpoints.GET_TOP_LIVE_GAME): _top_live_game,
+    _path(endpoints.GET_BROADCASTER_INFO): _broadcaster_info,
+    _path(endpoints.GET_PLAYER_SUMMARIES): _player_summaries
+}
+
+class _Handler(BaseHTTPRequestHandler):
+    def do_GET(self):
+        server = self.server.mock
+        split = urlsplit(self.path)
+        method = split.path.rstrip('/')
+        params = dict(parse_qsl(split.query))
+        etag = None
+
+        try:
+            server._before_request(method, params)
+            route = _ROUTES.get(method)
+            if route is None:
+                raise _HTTPError(404)
+            params.pop('key', None)
+            params.pop('format', None)
+            body = samples.dumps(route(server, params)).encode('utf-8')
+            status = 200
+            etag = '"{}"'.format(hashlib.sha1(body).hexdigest()) if server.etags else None
+            if etag is not None and self.headers.get('If-None-Match') == etag:
+                status = 304
+                body = b''
+        except _HTTPError as e:
+            status = e.status
+            body = '<html><head><title>{0} {1}</title></head></html>'.format(status, http.HTTPStatus(status).phrase).encode('utf-8')
+        except (TypeError, ValueError):
+            status = 400
+            body = b'<html><head><title>400 Bad Request</title></head></html>'
+
+        server._record(method, status)
+        self.send_response(status, http.HTTPStatus(status).phrase)
+        self.send_header('Content-Type', 'application/json; charset=UTF-8' if status in (200, 304) else 'text/html')
+        if status in (200, 304) and etag is not None:
+            self.send_header('ETag', etag)
+        self.send_header('Content-Length', str(len(body)))
+        try:
+            self.end_headers()
+            self.wfile.write(body)
+        except ConnectionError:
+            # the client gave up on the request (e.g. its deadline passed)
+            pass
+
+    def log_message(self, format, *args):
+        pass
+
+class _ThreadingHTTPServer(socketserver.ThreadingMixIn, HTTPServer):
+    daemon_threads = True
+
+class MockServer:
+    """Threaded mock WebAPI server.
+
+    Parameters
+    ----------
+    host : str
+        Interface to bind to
+    port : int
+        Port to bind to (``0`` picks a free port)
+    latency : float or tuple(float, float)
+        Delay (in seconds) added to every response, or a ``(min, max)`` range
+    error_rates : dict, optional
+        Probability of answering with a given HTTP status instead of the payload (e.g. ``{429: 0.05, 503: 0.01}``)
+    requests_per_second : float, optional
+        Enforced rate limit. Requests beyond it are answered with HTTP 429
+    burst : int
+        Number of requests that may be sent back to back before rate limiting applies
+    api_key : str, optional
+        If set, requests with any other key are answered with HTTP 403
+    live_update_interval : float
+        Live endpoints change their payload once every ``live_update_interval`` seconds
+    live_games : int
+        Number of games returned by ``GetLiveLeagueGames``
+    etags : bool
+        Send ``ETag`` headers and answer matching ``If-None-Match`` requests with HTTP 304
+    seed : int
+        Seed used for latency and error injection
+    """
+    def __init__(self, host = '127.0.0.1', port = 0, latency = 0, error_rates = None, requests_per_second = None,
+                 burst = 1, api_key = None, live_update_interval = 5, live_games = 5, etags = False, seed = 0):
+        self.latency = latency
+        self.error_rates = error_rates if error_rates else {}
+        self.requests_per_second = requests_per_second
+        self.burst = burst
+        self.api_key = api_key
+        self.live_update_interval = live_update_interval
+        self.live_games = live_games
+        self.etags = etags
+
+        self.requests = {}
+        self.statuses = {}
+
+        self._rng = random.Random(seed)
+        self._lock = threading.Lock()
+        self._tokens = burst
+        self._last_refill = time.time()
+        self._thread = None
+
+        self._httpd = _ThreadingHTTPServer((host, port), _Handler)
+        self._httpd.mock = self
+
+    @property
+    def url(self):
+        """Base URL to pass as ``base_url`` to :any:`APIWrapper`."""
+        host, port = self._httpd.server_address[:2]
+        return 'http://{}:{}'.format(host, port)
+
+    def live_seed(self):
+        """Seed of the current live payloads."""
+        if not self.live_update_interval:
+            return 0
+        return int(time.time() // self.live_update_interval)
+
+    def _delay(self):
+        with self._lock:
+            if isinstance(self.latency, (tuple, list)):
+                return self._rng.uniform(*self.latency)
+            return self.latency
+
+    def _before_request(self, method, params):
+        delay = self._delay()
+        if delay > 0:
+            time.sleep(delay)
+
+        if self.api_key is not None and params.get('key') != self.api_key:
+            raise _HTTPError(403)
+
+        with self._lock:
+            if self.requests_per_second:
+                now = time.time()
+                self._tokens = min(self.burst, self._tokens + (now - self._last_refill) * self.requests_per_second)
+                self._last_refill = now
+                if self._tokens < 1:
+                    raise _HTTPError(429)
+                self._tokens -= 1
+
+            for status, rate in sorted(self.error_rates.items()):
+                if self._rng.random() < rate:
+                    raise _HTTPError(status)
+
+    def _record(self, method, status):
+        with self._lock:
+            self.requests[method] = self.requests.get(method, 0) + 1
+            self.statuses[status] = self.statuses.get(status, 0) + 1
+
+    def start(self):
+        """Serve requests in a background thread."""
+        if self._thread is None:
+            self._thread = threading.Thread(target = self._httpd.serve_forever, name = 'd2api-mockserver')
+            self._thread.daemon = True
+            self._thread.start()
+        return self
+
+    def stop(self):
+        """Stop serving and release the socket."""
+        if self._thread is not None:
+            self._httpd.shutdown()
+            self._thread.join()
+            self._thread = None
+        self._httpd.server_close()
+
+    def serve_forever(self):
+        """Serve requests in the current thread."""
+        self._httpd.serve_forever()
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, *exc):
+        self.stop()
+
+def main(argv = None):
+    parser = argparse.ArgumentParser(description = 'Mock Steam WebAPI server for d2api')
+    parser.add_argument('--host', default = '127.0.0.1')
+    parser.add_argument('--port', type = int, default = 8570)
+    parser.add_argument('--latency', type = float, default = 0)
+    parser.add_argument('--rate-429', type = float, default = 0, help = 'probability of HTTP 429 responses')
+    parser.add_argument('--rate-503', type = float, default = 0, help = 'probability of HTTP 503 responses')
+    parser.add_argument('--requests-per-second', type = float)
+    parser.add_argument('--burst', type = int, default = 1)
+    parser.add_argument('--api-key')
+    args = parser.parse_args(argv)
+
+    server = MockServer(args.host, args.port, args.latency, {429: args.rate_429, 503: args.rate_503},
+                        args.requests_per_second, args.burst, args.api_key)
+    print('Serving mock WebAPI on {}'.format(server.url))
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.stop()
+
+if __name__ == '__main__':
+    main()
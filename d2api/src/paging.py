@@ -0,0 +1,161 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+"""Paging iterators with bounded read-ahead."""
+import threading
+from collections import deque
+
+# Parsed responses take roughly this many times the size of their json body in memory
+PARSED_SIZE_FACTOR = 10
+
+class PageIterator:
+    """Iterate over pages of a paged endpoint, fetching ahead of the consumer within fixed bounds.
+
+    A background thread fetches at most ``prefetch`` pages ahead, and stops fetching while the
+    buffered pages exceed ``max_buffered_bytes``. It resumes once the consumer catches up, so
+    memory use stays bounded however slowly pages are consumed.
+
+    Parameters
+    ----------
+    fetch : callable
+        Called with the request arguments, returns ``(page, body_size)``
+    advance : callable
+        Called with a page and its request arguments, returns the arguments of the next page or ``None`` after the last page
+    kwargs : dict
+        Arguments of the first page
+    prefetch : int
+        Maximum number of buffered pages (``0`` fetches pages on demand, without a background thread)
+    max_buffered_bytes : int, optional
+        Approximate memory budget of buffered pages
+    max_pages : int, optional
+        Stop after this many pages
+    size_of : callable, optional
+        Estimates the memory used by a page from ``(page, body_size)``.
+        Defaults to ``body_size * PARSED_SIZE_FACTOR``.
+    """
+    def __init__(self, fetch, advance, kwargs, prefetch = 2, max_buffered_bytes = None, max_pages = None, size_of = None):
+        self._fetch = fetch
+        self._advance = advance
+        self._next_args = dict(kwargs)
+        self.prefetch = prefetch
+        self.max_buffered_bytes = max_buffered_bytes
+        self.max_pages = max_pages
+        self._size_of = size_of if size_of else (lambda page, body_size: body_size * PARSED_SIZE_FACTOR)
+
+        self.fetched_pages = 0
+        self.buffered_bytes = 0
+        self._buffer = deque()
+        self._done = False
+        self._error = None
+        self._closed = False
+        self._cond = threading.Condition()
+        self._thread = None
+
+    def _fetch_next(self):
+        """Fetch the next page. Returns ``(page, size)``, or ``None`` once exhausted."""
+        if self._next_args is None or (self.max_pages is not None and self.fetched_pages >= self.max_pages):
+            return None
+        page, body_size = self._fetch(dict(self._next_args))
+        self.fetched_pages += 1
+        self._next_args = self._advance(page, self._next_args)
+        return page, self._size_of(page, body_size)
+
+    def _has_room(self):
+        if not self._buffer:
+            return True
+        if len(self._buffer) >= self.prefetch:
+            return False
+        return self.max_buffered_bytes is None or self.buffered_bytes < self.max_buffered_bytes
+
+    def _run(self):
+        while True:
+            with self._cond:
+                # pause while the consumer lags behind
+                while not self._closed and not self._has_room():
+                    self._cond.wait()
+                if self._closed:
+                    return
+            try:
+                fetched = self._fetch_next()
+            except Exception as e:
+                fetched = e
+            with self._cond:
+                if self._closed:
+                    # closed while the page was fetched: drop it
+                    return
+                if isinstance(fetched, Exception):
+                    self._error = fetched
+                    self._done = True
+                elif fetched is None:
+                    self._done = True
+                else:
+                    self._buffer.append(fetched)
+                    self.buffered_bytes += fetched[1]
+                self._cond.notify_all()
+                if self._done:
+                    return
+
+    def __iter__(self):
+        return self
+
+    def __next__(self):
+        if self.prefetch <= 0:
+            fetched = None if self._closed else self._fetch_next()
+            if fetched is None:
+                raise StopIteration
+            return fetched[0]
+
+        with self._cond:
+            if self._closed:
+                raise StopIteration
+            if self._thread is None:
+                self._thread = threading.Thread(target = self._run, name = 'd2api-pages')
+                self._thread.daemon = True
+                self._thread.start()
+            while not self._buffer and not self._done and not self._closed:
+                self._cond.wait()
+            if self._buffer and not self._closed:
+                page, size = self._buffer.popleft()
+                self.buffered_bytes -= size
+                self._cond.notify_all()
+                return page
+            if self._error is not None and not self._closed:
+                error, self._error = self._error, None
+                raise error
+            raise StopIteration
+
+    def close(self):
+        """Stop fetching and drop buffered pages."""
+        with self._cond:
+            self._closed = True
+            self._buffer.clear()
+            self.buffered_bytes = 0
+            self._cond.notify_all()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+def _scanned(page):
+    """``(match_id, match_seq_num)`` of every match of a page, including matches filtered out."""
+    scanned = getattr(page, 'scanned', None)
+    if scanned is not None:
+        return scanned
+    return [(m.get('match_id'), m.get('match_seq_num')) for m in page.get('matches', [])]
+
+def next_match_history_args(page, kwargs):
+    """Arguments of the page following a ``GetMatchHistory`` page."""
+    scanned = _scanned(page)
+    if not scanned or not page.get('results_remaining'):
+        return None
+    kwargs['start_at_match_id'] = min(match_id for match_id, _ in scanned) - 1
+    return kwargs
+
+def next_sequence_num_args(page, kwargs):
+    """Arguments of the page following a ``GetMatchHistoryBySequenceNum`` page."""
+    scanned = _scanned(page)
+    if not scanned:
+        return None
+    kwargs['start_at_match_seq_num'] = max(seq_num for _, seq_num in scanned) + 1
+    return kwargs
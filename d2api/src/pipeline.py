@@ -0,0 +1,146 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+"""Bulk fetching with parsing offloaded to worker processes.
+
+Decoding and parsing responses is CPU bound and, in a single process, competes with network
+I/O for the GIL. :class:`ParsePipeline` fetches raw responses with a pool of threads (sharing the
+wrapper's rate limit) and parses them in a pool of processes::
+
+    pipeline = ParsePipeline(api, fetch_workers = 4, parse_workers = 4)
+    calls = (('get_match_details', {'match_id': m}) for m in match_ids)
+    for call, match, error in pipeline.run(calls):
+        ...
+"""
+import queue
+import threading
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+
+from . import util, wrappers
+
+_END = object()
+
+def _parse_body(wrapper_class, response_body, url, keep_raw_json = True):
+    """Parse a raw response (runs in a worker process)."""
+    if not issubclass(wrapper_class, wrappers.AbstractResponse):
+        return wrapper_class(str(response_body, 'utf-8', 'replace'))
+    parsed = wrapper_class.from_json(util.decode_json(response_body), response_body if keep_raw_json else None)
+    parsed.url = url
+    return parsed
+
+class ParsePipeline:
+    """Fetch responses concurrently and parse them in a process pool.
+
+    Parameters
+    ----------
+    api : APIWrapper
+        Wrapper used to perform requests (its rate limit is shared by all fetchers)
+    fetch_workers : int
+        Number of threads performing requests
+    parse_workers : int, optional
+        Number of parsing processes (defaults to the number of CPUs). Set to ``0`` to parse in the fetching threads.
+    max_pending : int
+        Maximum number of calls in flight or waiting to be consumed. Fetching pauses while
+        this many results are buffered.
+    """
+    def __init__(self, api, fetch_workers = 4, parse_workers = None, max_pending = 64):
+        self.api = api
+        self.fetch_workers = fetch_workers
+        self.parse_workers = parse_workers
+        self.max_pending = max(1, max_pending)
+
+    def _fetch(self, call, parsers, results):
+        method_name, kwargs = call
+        try:
+            with self.api._deferred_parsing():
+                raw = getattr(self.api, method_name)(**dict(kwargs))
+        except Exception as e:
+            results.put((call, None, e))
+            return
+
+        # unchanged responses (see conditional_requests) are returned already parsed
+        if not isinstance(raw, tuple):
+            results.put((call, raw, None))
+            return
+        wrapper_class, response_body, url = raw
+        keep_raw_json = self.api.keep_raw_json
+        if not isinstance(wrapper_class, type) or not self.api.parse_response:
+            results.put((call, str(response_body, 'utf-8', 'replace'), None))
+        elif parsers is None:
+            try:
+                results.put((call, _parse_body(wrapper_class, response_body, url, keep_raw_json), None))
+            except Exception as e:
+                results.put((call, None, e))
+        else:
+            future = parsers.submit(_parse_body, wrapper_class, response_body, url, keep_raw_json)
+            future.add_done_callback(lambda f: results.put((call, None, f.exception()) if f.exception() else (call, f.result(), None)))
+
+    def run(self, calls):
+        """Perform calls and yield their parsed responses in order of completion.
+
+        Parameters
+        ----------
+        calls : iterable
+            ``(method_name, kwargs)`` pairs, e.g. ``('get_match_details', {'match_id': 4176987886})``.
+            The iterable is consumed lazily. With parsing processes, ``where`` predicates must be
+            picklable (see :mod:`d2api.src.filters`).
+
+        Yields
+        ------
+        tuple
+            ``(call, response, error)``; ``error`` is the raised exception if the call failed, else ``None``
+
+        Raises
+        ------
+        Exception
+            Any error raised while iterating ``calls``, once the calls submitted before it are yielded
+        """
+        results = queue.Queue()
+        slots = threading.Semaphore(self.max_pending)
+        stop = threading.Event()
+
+        fetchers = ThreadPoolExecutor(self.fetch_workers)
+        parsers = ProcessPoolExecutor(self.parse_workers) if self.parse_workers != 0 else None
+
+        def produce():
+            submitted = 0
+            error = None
+            try:
+                for call in calls:
+                    slots.acquire()
+                    if stop.is_set():
+                        break
+                    fetchers.submit(self._fetch, call, parsers, results)
+                    submitted += 1
+            except Exception as e:
+                # e.g. failing to read the input of the calls, re-raised by the consumer
+                error = e
+            finally:
+                results.put((_END, submitted, error))
+
+        producer = threading.Thread(target = produce, name = 'd2api-pipeline')
+        producer.daemon = True
+        producer.start()
+
+        try:
+            total = None
+            done = 0
+            producer_error = None
+            while total is None or done < total:
+                call, response, error = results.get()
+                if call is _END:
+                    total, producer_error = response, error
+                    continue
+                done += 1
+                slots.release()
+                yield call, response, error
+            if producer_error is not None:
+                raise producer_error
+        finally:
+            stop.set()
+            # unblock the producer if it waits for a free slot
+            for _ in range(self.max_pending):
+                slots.release()
+            producer.join()
+            fetchers.shutdown(wait = True)
+            if parsers is not None:
+                parsers.shutdown(wait = True)
@@ -0,0 +1,188 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+"""Polling of live endpoints aligned with their update cadence.
+
+Live endpoints refresh their payloads periodically (every few seconds for ``GetTopLiveGame``).
+Polling on a fixed interval either misses updates or wastes requests on unchanged payloads.
+:class:`PollScheduler` learns the period and phase of each watched resource, and polls
+shortly after the next update is expected::
+
+    scheduler = PollScheduler(requests_per_second = 1)
+    scheduler.watch('top', lambda: api.get_top_live_game(), version = top_live_game_version, on_update = show)
+    scheduler.run()
+"""
+import time
+
+from .wrappers import NOT_MODIFIED
+
+def top_live_game_version(response):
+    """Latest ``last_update_time`` of a :any:`TopLiveGame` response."""
+    return max((int(g.get('last_update_time') or 0) for g in response.get('game_list', [])), default = None)
+
+def live_league_games_version(response):
+    """Latest game time of a :any:`LiveLeagueGames` response.
+
+    Game time advances with wall time (except during pauses), so it times updates of the
+    endpoint as well as a server timestamp would.
+    """
+    return max((g['scoreboard'].get('duration', 0) for g in response.get('games', [])), default = None)
+
+class _Watch:
+    def __init__(self, key, fetch, version, on_update, period):
+        self.key = key
+        self.fetch = fetch
+        self.version = version
+        self.on_update = on_update
+
+        self.period = period
+        self.last_update = None
+        self.last_version = None
+        self.last_response = None
+        self.last_poll = None
+        self.misses = 0
+        self.due = 0
+
+        self.polls = 0
+        self.updates = 0
+
+class PollScheduler:
+    """Poll resources shortly after they are expected to change.
+
+    The update period of every resource is estimated from its version (e.g. ``last_update_time``)
+    or, without one, from the polls that observed a change. Polls are scheduled ``margin`` seconds
+    after the next expected update. A poll that finds no change is retried after a quarter of
+    the period, and a resource that changes on every poll is probed with shorter periods.
+    When more polls are due than the request budget allows, the longest waiting ones are
+    performed first.
+
+    Parameters
+    ----------
+    requests_per_second : float, optional
+        Request budget shared by all resources (``None`` for no limit)
+    margin : float
+        Delay (in seconds) between an expected update and the poll
+    initial_interval : float
+        Polling interval until the period of a resource is known
+    min_interval : float
+        Shortest period assumed for any resource
+    max_interval : float
+        Longest period assumed for any resource
+    """
+    def __init__(self, requests_per_second = 1, margin = 1.0, initial_interval = 10, min_interval = 1, max_interval = 300):
+        self.spacing = 1 / requests_per_second if requests_per_second else 0
+        self.margin = margin
+        self.initial_interval = initial_interval
+        self.min_interval = min_interval
+        self.max_interval = max_interval
+
+        self._watches = {}
+        self._next_slot = 0
+
+    def watch(self, key, fetch, version = None, on_update = None):
+        """Start polling a resource.
+
+        Parameters
+        ----------
+        key : hashable
+            Name of the resource
+        fetch : callable
+            Performs the request, e.g. ``lambda: api.get_top_live_game(partner = 1)``
+        version : callable, optional
+            Returns a timestamp of the data in a response (see :any:`top_live_game_version`).
+            Responses are compared for equality if omitted.
+        on_update : callable, optional
+            Called with ``key`` and the response whenever it changes
+        """
+        self._watches[key] = _Watch(key, fetch, version, on_update, self.initial_interval)
+
+    def unwatch(self, key):
+        """Stop polling a resource."""
+        self._watches.pop(key, None)
+
+    def _learn(self, w, interval):
+        """Update the period estimate with an observed interval between updates."""
+        if interval > 0:
+            period = 0.7 * w.period + 0.3 * interval
+            w.period = min(self.max_interval, max(self.min_interval, period))
+
+    def _observe(self, w, response, now):
+        """Record a poll, returns ``True`` if the resource changed."""
+        w.polls += 1
+        if response is NOT_MODIFIED:
+            changed = False
+        elif w.version is not None:
+            version = w.version(response)
+            changed = version is not None and version != w.last_version
+            if changed and w.last_version is not None and version > w.last_version:
+                # server timestamps may use another clock, only their differences are used
+                self._learn(w, version - w.last_version)
+            if changed:
+                w.last_version = version
+        else:
+            changed = response != w.last_response
+
+        if changed:
+            # the update happened since the previous poll, most likely just before this one
+            update_time = now if w.last_poll is None else max(w.last_poll, now - self.margin)
+            if w.version is None and w.last_update is not None:
+                self._learn(w, update_time - w.last_update)
+            if w.misses == 0 and w.updates:
+                # every poll seeing a change means updates may be missed: probe a shorter period
+                w.period = max(self.min_interval, w.period * 0.9)
+            w.last_update = update_time
+            w.last_response = response
+            w.updates += 1
+            w.misses = 0
+        else:
+            w.misses += 1
+        w.last_poll = now
+        return changed
+
+    def _schedule(self, w, now):
+        if w.last_update is None:
+            w.due = now + w.period
+            return
+        expected = w.last_update + w.period
+        if w.misses and expected + self.margin <= now:
+            # the update is late: retry soon, a few times, before waiting for the next one
+            if w.misses <= 3:
+                w.due = now + max(self.min_interval, w.period / 4)
+                return
+        while expected + self.margin <= now:
+            expected += w.period
+        w.due = expected + self.margin
+
+    def poll(self, now = None):
+        """Poll the resources that are due, within the request budget.
+
+        Returns
+        -------
+        float
+            Seconds until the next poll is due
+        """
+        now = time.time() if now is None else now
+        for w in sorted(self._watches.values(), key = lambda w: w.due):
+            if w.due > now or self._next_slot > now:
+                break
+            self._next_slot = now + self.spacing
+            response = w.fetch()
+            if self._observe(w, response, now) and w.on_update is not None:
+                w.on_update(w.key, response)
+            self._schedule(w, now)
+
+        if not self._watches:
+            return self.initial_interval
+        return max(0, min(w.due for w in self._watches.values()) - now, self._next_slot - now)
+
+    def run(self, stop = None):
+        """Poll until ``stop`` (a ``threading.Event``) is set, or forever."""
+        while stop is None or not stop.is_set():
+            delay = self.poll()
+            if stop is None:
+                time.sleep(delay)
+            else:
+                stop.wait(delay)
+
+    def stats(self):
+        """Estimated period, number of polls and number of observed updates of every resource."""
+        return {k: {'period': w.period, 'polls': w.polls, 'updates': w.updates} for k, w in self._watches.items()}
@@ -0,0 +1,113 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+"""Sampling profiler for the parsers in :mod:`d2api.src.wrappers`."""
+import json
+import random
+import sys
+import threading
+import time
+from contextlib import contextmanager
+
+from . import wrappers
+
+class ParseProfiler:
+    """Records parse times and allocations of wrapper classes for a sample of responses.
+
+    Every ``parse``/``parse_response`` call made while a sampled response is parsed is timed.
+    Both inclusive time and self time (excluding nested wrapper parsers) are kept, along
+    with the net number of memory blocks allocated by the call.
+
+    Parameters
+    ----------
+    sample_rate : float
+        Fraction of responses to profile (``0`` to ``1``)
+    seed : int, optional
+        Seed for the sampling decision
+    """
+    def __init__(self, sample_rate = 0.01, seed = None):
+        self.sample_rate = sample_rate
+        self._rng = random.Random(seed)
+        self._lock = threading.Lock()
+        self._local = threading.local()
+        self.reset()
+
+    def reset(self):
+        """Discard collected statistics."""
+        with self._lock:
+            self.responses = {}
+            self.stats = {}
+
+    def should_sample(self):
+        """Randomly decide whether the next response is profiled."""
+        with self._lock:
+            return self._rng.random() < self.sample_rate
+
+    @contextmanager
+    def sampling(self, endpoint = None):
+        """Profile all parsers run by the current thread within this context."""
+        previous = getattr(wrappers._profiling, 'active', None)
+        wrappers._profiling.active = self
+        self._local.stack = []
+        try:
+            yield self
+        finally:
+            wrappers._profiling.active = previous
+            if endpoint is not None:
+                with self._lock:
+                    self.responses[endpoint] = self.responses.get(endpoint, 0) + 1
+
+    def record(self, name, parser):
+        """Run ``parser`` and account its cost to ``name`` (called by the wrappers)."""
+        stack = self._local.stack
+        stack.append(0.0)
+        blocks = sys.getallocatedblocks()
+        start = time.perf_counter()
+        try:
+            parser()
+        finally:
+            elapsed = time.perf_counter() - start
+            allocated = sys.getallocatedblocks() - blocks
+            children = stack.pop()
+            if stack:
+                stack[-1] += elapsed
+            self._add(name, elapsed, elapsed - children, allocated)
+
+    def _add(self, name, elapsed, self_time, allocated):
+        with self._lock:
+            cur = self.stats.get(name)
+            if cur is None:
+                cur = self.stats[name] = {'calls': 0, 'total': 0.0, 'self': 0.0, 'max': 0.0, 'allocated_blocks': 0}
+            cur['calls'] += 1
+            cur['total'] += elapsed
+            cur['self'] += self_time
+            cur['max'] = max(cur['max'], elapsed)
+            cur['allocated_blocks'] += allocated
+
+    def report(self):
+        """Aggregated statistics.
+
+        Returns
+        -------
+        dict
+            ``responses`` (profiled responses per endpoint) and ``parsers`` (per parser ``calls``,
+            ``total``/``self``/``mean``/``max`` seconds and ``allocated_blocks``)
+        """
+        with self._lock:
+            parsers = {}
+            for name, cur in self.stats.items():
+                parsers[name] = dict(cur, mean = cur['total'] / cur['calls'])
+            return {'sample_rate': self.sample_rate, 'responses': dict(self.responses), 'parsers': parsers}
+
+    def format_report(self):
+        """Human readable report, ordered by self time."""
+        parsers = self.report()['parsers']
+        lines = ['{:<36} {:>8} {:>10} {:>10} {:>10} {:>12}'.format('parser', 'calls', 'self ms', 'total ms', 'mean us', 'alloc blocks')]
+        for name, cur in sorted(parsers.items(), key = lambda x: -x[1]['self']):
+            lines.append('{:<36} {:>8} {:>10.3f} {:>10.3f} {:>10.1f} {:>12}'.format(
+                name, cur['calls'], cur['self'] * 1e3, cur['total'] * 1e3, cur['mean'] * 1e6, cur['allocated_blocks']))
+        return '\n'.join(lines)
+
+    def dump(self, file_name):
+        """Write :any:`report` as json."""
+        with open(file_name, 'w') as f:
+            json.dump(self.report(), f, sort_keys = True, indent = 4)
@@ -0,0 +1,200 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+"""Incrementally maintained player profiles.
+
+A profile aggregates the details of every match of an account. Only matches played since the
+last update are fetched, so refreshing a profile costs one request per new match::
+
+    builder = PlayerProfileBuilder.load(api, 'profile.json')
+    builder.update()
+    builder.save('profile.json')
+"""
+import json
+
+from . import entities
+from .pipeline import ParsePipeline
+
+# Running totals kept per hero
+_HERO_FIELDS = ('matches', 'wins', 'kills', 'deaths', 'assists', 'gold_per_min')
+
+def _empty_state(account_id):
+    return {
+        'account_id': account_id,
+        'last_match_id': 0,
+        'totals': dict.fromkeys(_HERO_FIELDS, 0),
+        'heroes': {},
+        'items': {}
+    }
+
+def _find_player(players, account_id, hero_id):
+    """Find the player of an account in a match.
+
+    Players hiding their match data appear anonymous in match details, so they are found
+    by the hero they played according to match history.
+    """
+    for p in players:
+        if p['steam_account']['id32'] == account_id:
+            return p
+    for p in players:
+        if hero_id is not None and p['hero']['hero_id'] == hero_id:
+            return p
+    return None
+
+class PlayerProfileBuilder:
+    """Build aggregate statistics of an account from its match history.
+
+    The state is a small json-serializable dict holding running totals (overall, per hero and
+    per item) and the last aggregated match ID.
+
+    Parameters
+    ----------
+    api : APIWrapper
+        Wrapper used to perform requests
+    account_id : int
+        32/64-bit account ID
+    state : dict, optional
+        State of a previous build (the ``state`` attribute, see :any:`save`)
+    fetch_workers : int
+        Number of match details fetched concurrently
+    matches_requested : int
+        Page size of match history requests
+    """
+    def __init__(self, api, account_id, state = None, fetch_workers = 4, matches_requested = 100):
+        self.api = api
+        self.account_id = entities.SteamAccount(account_id)['id32']
+        self.fetch_workers = fetch_workers
+        self.matches_requested = matches_requested
+
+        if state is not None and state.get('account_id') != self.account_id:
+            raise ValueError('State belongs to account {}'.format(state.get('account_id')))
+        self.state = state if state is not None else _empty_state(self.account_id)
+
+    def new_matches(self):
+        """Matches played since the last update.
+
+        Returns
+        -------
+        list(tuple)
+            ``(match_id, hero_id)`` pairs in ascending order of match ID
+        """
+        last_match_id = self.state['last_match_id']
+        found = []
+        pages = self.api.iter_match_history(account_id = self.account_id, matches_requested = self.matches_requested)
+        with pages:
+            for page in pages:
+                for match in page.get('matches', []):
+                    if match['match_id'] <= last_match_id:
+                        return sorted(found)
+                    player = _find_player(match['players'], self.account_id, None)
+                    found.append((match['match_id'], player['hero']['hero_id'] if player else None))
+        return sorted(found)
+
+    def update(self):
+        """Fetch and aggregate matches played since the last update.
+
+        Matches are aggregated in ascending order. If fetching a match fails, newer matches are
+        not aggregated and the error is raised; the next update resumes from the failed match.
+
+        Returns
+        -------
+        int
+            Number of matches aggregated
+        """
+        new_matches = self.new_matches()
+        if not new_matches:
+            return 0
+
+        heroes = dict(new_matches)
+        details = {}
+        first_error = None
+        pipeline = ParsePipeline(self.api, fetch_workers = self.fetch_workers, parse_workers = 0)
+        calls = (('get_match_details', {'match_id': match_id}) for match_id, _ in new_matches)
+        for call, match, error in pipeline.run(calls):
+            match_id = call[1]['match_id']
+            if error is not None:
+                if first_error is None or match_id < first_error[0]:
+                    first_error = (match_id, error)
+            else:
+                details[match_id] = match
+
+        aggregated = 0
+        for match_id, _ in new_matches:
+            if first_error is not None and match_id >= first_error[0]:
+                break
+            self._add_match(details[match_id], heroes[match_id])
+            self.state['last_match_id'] = match_id
+            aggregated += 1
+
+        if first_error is not None:
+            raise first_error[1]
+        return aggregated
+
+    def _add_match(self, match, hero_id):
+        player = _find_player(match['players'], self.account_id, hero_id)
+        if player is None:
+            return
+
+        stats = {
+            'matches': 1,
+            'wins': int(player['side'] == match.get('winner')),
+            'kills': player.get('kills', 0),
+            'deaths': player.get('deaths', 0),
+            'assists': player.get('assists', 0),
+            'gold_per_min': player.get('gold_per_min', 0)
+        }
+        totals = self.state['totals']
+        hero = self.state['heroes'].setdefault(str(player['hero']['hero_id']), dict.fromkeys(_HERO_FIELDS, 0))
+        for k, v in stats.items():
+            totals[k] += v
+            hero[k] += v
+
+        items = self.state['items']
+        for item in player['inventory'] + player['backpack']:
+            if item['item_id']:
+                key = str(item['item_id'])
+                items[key] = items.get(key, 0) + 1
+
+    def profile(self):
+        """Summary of the aggregated matches.
+
+        Returns
+        -------
+        dict
+            ``matches``, ``win_rate``, ``kda`` and average ``gold_per_min`` overall, the same per
+            hero (keyed by hero ID), and final item counts (keyed by item ID)
+        """
+        def summarize(s):
+            matches = s['matches']
+            return {
+                'matches': matches,
+                'win_rate': s['wins'] / matches if matches else 0.0,
+                'kda': (s['kills'] + s['assists']) / max(1, s['deaths']),
+                'gold_per_min': s['gold_per_min'] / matches if matches else 0.0
+            }
+
+        summary = summarize(self.state['totals'])
+        summary['heroes'] = {int(k): summarize(v) for k, v in self.state['heroes'].items()}
+        summary['items'] = {int(k): v for k, v in self.state['items'].items()}
+        return summary
+
+    def save(self, file_name):
+        """Write the state as json."""
+        with open(file_name, 'w') as f:
+            json.dump(self.state, f, sort_keys = True, separators = (',', ':'))
+
+    @classmethod
+    def load(cls, api, file_name, **kwargs):
+        """Resume a build from a state written by :any:`save`.
+
+        Parameters
+        ----------
+        api : APIWrapper
+            Wrapper used to perform requests
+        file_name : str
+            State file
+        kwargs
+            Other arguments of :any:`PlayerProfileBuilder`
+        """
+        with open(file_name, 'r') as f:
+            state = json.load(f)
+        return cls(api, state['account_id'], state, **kwargs)
@@ -0,0 +1,232 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+"""Request rate limiting with priority lanes, deadlines and cancellation.
+
+Requests are granted evenly spaced slots, shared between lanes by weight (so interactive calls
+are not stuck behind a crawl). A caller with a deadline is refused immediately if the calls
+queued ahead of it take too long, instead of sleeping past its budget::
+
+    limiter = RateLimiter(requests_per_second = 1)
+    limiter.acquire(deadline = time.monotonic() + 0.5, cancel = token, lane = 'interactive')
+"""
+import threading
+import time
+from collections import deque
+
+from . import errors
+
+class CancelToken:
+    """Cooperative cancellation of calls, shared between the caller and the calls.
+
+    Waiting for a rate limit slot ends as soon as the token is cancelled, and calls check it
+    between their stages (waiting, connecting, reading, parsing).
+    """
+    def __init__(self):
+        self._event = threading.Event()
+        self._callbacks = []
+        self._lock = threading.Lock()
+
+    def cancel(self):
+        with self._lock:
+            self._event.set()
+            callbacks = list(self._callbacks)
+        for func in callbacks:
+            func()
+
+    def add_callback(self, func):
+        """Call ``func`` when the token is cancelled (right away if it already is)."""
+        with self._lock:
+            if not self._event.is_set():
+                self._callbacks.append(func)
+                return
+        func()
+
+    def remove_callback(self, func):
+        with self._lock:
+            if func in self._callbacks:
+                self._callbacks.remove(func)
+
+    @property
+    def cancelled(self):
+        return self._event.is_set()
+
+    def wait(self, timeout = None):
+        """Sleep up to ``timeout`` seconds, returns ``True`` if the token was cancelled meanwhile."""
+        return self._event.wait(timeout)
+
+    def raise_if_cancelled(self):
+        if self._event.is_set():
+            raise errors.APICancelled()
+
+def check(deadline = None, cancel = None, stage = None):
+    """Raise if a call was cancelled or ran past its deadline (a ``time.monotonic`` value)."""
+    if cancel is not None:
+        cancel.raise_if_cancelled()
+    if deadline is not None and time.monotonic() >= deadline:
+        raise errors.APIDeadlineExceeded(stage)
+
+# Lanes of the default limiter, and their share of the rate budget while both have queued calls
+DEFAULT_LANES = {'interactive': 9, 'background': 1}
+DEFAULT_LANE = 'background'
+
+class _Waiter:
+    __slots__ = ('granted',)
+
+    def __init__(self):
+        self.granted = False
+
+class _Lane:
+    def __init__(self, weight):
+        self.weight = weight
+        self.queue = deque()
+        # stride scheduling: the lane with the lowest pass value is served next
+        self.pass_value = 0.0
+        self.max_queued = 0
+        self.granted = 0
+        self.rejected = 0
+        self.wait = 0.0
+
+class RateLimiter:
+    """Space requests evenly, at most ``requests_per_second`` (``<= 0`` for no limit).
+
+    Waiting calls queue in lanes. Each slot goes to the lane that received the smallest share of
+    slots relative to its weight, so a lane of weight 9 gets 90% of the slots while a lane of
+    weight 1 also has calls queued, and all of them when the other lane is empty. Within a lane,
+    calls are served in order of arrival.
+
+    Parameters
+    ----------
+    requests_per_second : float
+        Rate budget shared by all lanes
+    lanes : dict, optional
+        Weight of every lane by name (defaults to ``DEFAULT_LANES``)
+    default_lane : str, optional
+        Lane of calls made without a lane (defaults to ``'background'`` if there is such a lane,
+        the lane of lowest weight otherwise)
+    """
+    def __init__(self, requests_per_second = 1, lanes = None, default_lane = None):
+        self.interval = 1 / requests_per_second if requests_per_second > 0 else 0
+        self._lanes = {name: _Lane(weight) for name, weight in (lanes or DEFAULT_LANES).items()}
+        if default_lane is None:
+            default_lane = DEFAULT_LANE if DEFAULT_LANE in self._lanes else min(self._lanes, key = lambda name: self._lanes[name].weight)
+        elif default_lane not in self._lanes:
+            raise ValueError('Unknown default lane {!r} (lanes: {})'.format(default_lane, ', '.join(sorted(self._lanes))))
+        self.default_lane = default_lane
+        self._next_slot = float('-inf')
+        # pass value of the lane served last, given to lanes that start queueing
+        self._vtime = 0.0
+        self._cond = threading.Condition()
+
+    def _lane(self, name):
+        lane = self._lanes.get(name if name is not None else self.default_lane)
+        if lane is None:
+            raise ValueError('Unknown lane {!r} (lanes: {})'.format(name, ', '.join(sorted(self._lanes))))
+        return lane
+
+    def _dispatch(self, now):
+        """Grant the current slot to the head of the lane with the lowest pass value (lock held)."""
+        if self._next_slot > now:
+            return
+        active = [lane for lane in self._lanes.values() if lane.queue]
+        if not active:
+            return
+        lane = min(active, key = lambda l: l.pass_value)
+        self._vtime = lane.pass_value
+        lane.pass_value += 1 / lane.weight
+        lane.queue.popleft().granted = True
+        # spaced from the actual grant, so slots missed while idle are not made up in a burst
+        self._next_slot = max(now, self._next_slot) + self.interval
+        self._cond.notify_all()
+
+    def _wake(self):
+        with self._cond:
+            self._cond.notify_all()
+
+    def acquire(self, deadline = None, cancel = None, lane = None):
+        """Wait for a request slot.
+
+        Parameters
+        ----------
+        deadline : float, optional
+            ``time.monotonic`` value by which the slot must be granted
+        cancel : CancelToken, optional
+            Stops waiting when cancelled
+        lane : str, optional
+            Lane of the call (defaults to ``default_lane``)
+
+        Returns
+        -------
+        float
+            Time spent waiting (in seconds)
+
+        Raises
+        ------
+        APIDeadlineExceeded
+            If the slot cannot be granted before the deadline. Calls are refused immediately
+            if the calls already queued in their lane take longer.
+        APICancelled
+            If the token is cancelled before the slot is granted
+        """
+        if cancel is not None:
+            cancel.raise_if_cancelled()
+        start = time.monotonic()
+        with self._cond:
+            q = self._lane(lane)
+            if self.interval == 0:
+                q.granted += 1
+                return 0
+
+            # lower bound of the grant time: every call queued ahead in the lane goes first
+            if deadline is not None and max(start, self._next_slot) + len(q.queue) * self.interval > deadline:
+                q.rejected += 1
+                raise errors.APIDeadlineExceeded('waiting for the rate limit')
+
+            if not q.queue:
+                # lanes get neither credit nor debt for the time they were idle
+                q.pass_value = self._vtime
+
+            waiter = _Waiter()
+            q.queue.append(waiter)
+            q.max_queued = max(q.max_queued, len(q.queue))
+            if cancel is not None:
+                cancel.add_callback(self._wake)
+            try:
+                while True:
+                    now = time.monotonic()
+                    self._dispatch(now)
+                    if waiter.granted:
+                        break
+                    if cancel is not None and cancel.cancelled:
+                        raise errors.APICancelled()
+                    if deadline is not None and now >= deadline:
+                        q.rejected += 1
+                        raise errors.APIDeadlineExceeded('waiting for the rate limit')
+                    timeout = self._next_slot - now
+                    if deadline is not None:
+                        timeout = min(timeout, deadline - now)
+                    self._cond.wait(max(timeout, 0))
+            except errors.BaseError:
+                q.queue.remove(waiter)
+                raise
+            finally:
+                if cancel is not None:
+                    cancel.remove_callback(self._wake)
+
+            waited = time.monotonic() - start
+            q.granted += 1
+            q.wait += waited
+            return waited
+
+    def stats(self):
+        """Queue depth and totals of every lane.
+
+        Returns
+        -------
+        dict
+            ``queued`` (current queue depth), ``max_queued``, ``granted`` and ``rejected`` slots,
+            and total ``wait`` time in seconds, by lane
+        """
+        with self._cond:
+            return {name: {'queued': len(lane.queue), 'max_queued': lane.max_queued, 'granted': lane.granted,
+                           'rejected': lane.rejected, 'wait': lane.wait, 'weight': lane.weight}
+                    for name, lane in self._lanes.items()}
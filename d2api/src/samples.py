@@ -0,0 +1,402 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+"""Deterministic synthetic WebAPI payloads.
+
+Payloads follow the schema of the real Steam WebAPI responses closely enough to
+exercise every parser in :mod:`d2api.src.wrappers`, without requiring network access.
+The same ``seed`` always yields the same payload.
+"""
+import json
+import random
+
+from . import entities
+
+class _Pairs(list):
+    """A json object serialized from a list of key-value pairs (allows repeated keys)."""
+    pass
+
+def dumps(obj):
+    """Serialize ``obj`` to json text, emitting repeated keys for :class:`_Pairs` objects."""
+    if isinstance(obj, _Pairs):
+        return '{' + ', '.join('{}: {}'.format(json.dumps(k), dumps(v)) for k, v in obj) + '}'
+    if isinstance(obj, dict):
+        return '{' + ', '.join('{}: {}'.format(json.dumps(k), dumps(v)) for k, v in obj.items()) + '}'
+    if isinstance(obj, (list, tuple)):
+        return '[' + ', '.join(dumps(v) for v in obj) + ']'
+    return json.dumps(obj)
+
+def _ids(table, fallback):
+    """Sorted positive integer IDs of a reference table."""
+    ids = sorted(int(k) for k in table if k.lstrip('-').isdigit() and int(k) > 0)
+    return ids if ids else list(fallback)
+
+_HERO_IDS = _ids(entities.all_heroes, range(1, 120))
+_ITEM_IDS = _ids(entities.all_items, range(1, 260))
+_ABILITY_IDS = _ids(entities.all_abilities, range(5000, 5600))
+
+def _account_id(rng):
+    return rng.randint(10000000, 400000000)
+
+def match_details(match_id = 4176987886, seed = None):
+    """``GetMatchDetails`` payload (as a dict, without the ``result`` envelope).
+
+    Parameters
+    ----------
+    match_id : int
+        Match ID of the generated match
+    seed : int, optional
+        Random seed (defaults to ``match_id``)
+    """
+    rng = random.Random(match_id if seed is None else seed)
+    duration = rng.randint(900, 4500)
+    heroes = rng.sample(_HERO_IDS, 10)
+
+    players = []
+    for i, hero_id in enumerate(heroes):
+        player = {
+            'account_id': _account_id(rng) if rng.random() > 0.2 else 4294967295,
+            'player_slot': i if i < 5 else 123 + i,
+            'hero_id': hero_id
+        }
+        for j in range(6):
+            player['item_{}'.format(j)] = rng.choice(_ITEM_IDS) if rng.random() > 0.1 else 0
+        for j in range(3):
+            player['backpack_{}'.format(j)] = rng.choice(_ITEM_IDS) if rng.random() > 0.6 else 0
+        player.update({
+            'kills': rng.randint(0, 20),
+            'deaths': rng.randint(0, 15),
+            'assists': rng.randint(0, 30),
+            'leaver_status': 0 if rng.random() > 0.05 else rng.randint(1, 4),
+            'last_hits': rng.randint(0, 600),
+            'denies': rng.randint(0, 40),
+            'gold_per_min': rng.randint(200, 900),
+            'xp_per_min': rng.randint(200, 900),
+            'level': rng.randint(5, 30),
+            'hero_damage': rng.randint(1000, 60000),
+            'tower_damage': rng.randint(0, 15000),
+            'hero_healing': rng.randint(0, 8000),
+            'gold': rng.randint(0, 5000),
+            'gold_spent': rng.randint(5000, 40000),
+            'scaled_hero_damage': rng.randint(1000, 40000),
+            'scaled_tower_damage': rng.randint(0, 10000),
+            'scaled_hero_healing': rng.randint(0, 5000)
+        })
+        abilities = rng.sample(_ABILITY_IDS, 4)
+        player['ability_upgrades'] = [
+            {'ability': abilities[lvl % 4], 'time': 60 * lvl + rng.randint(0, 59), 'level': lvl + 1}
+            for lvl in range(player['level'])
+        ]
+        if rng.random() < 0.05:
+            unit = {'unitname': 'spirit_bear'}
+            for j in range(6):
+                unit['item_{}'.format(j)] = rng.choice(_ITEM_IDS)
+            for j in range(3):
+                unit['backpack_{}'.format(j)] = 0
+            player['additional_units'] = [unit]
+        players.append(player)
+
+    picks_bans = []
+    bans = rng.sample([h for h in _HERO_IDS if h not in heroes], 12)
+    for order in range(22):
+        is_pick = order % 2 == 1 and len([p for p in picks_bans if p['is_pick']]) < 10
+        hero_id = heroes[len([p for p in picks_bans if p['is_pick']])] if is_pick else bans.pop()
+        picks_bans.append({'is_pick': is_pick, 'hero_id': hero_id, 'team': order % 2, 'order': order})
+
+    return {
+        'players': players,
+        'radiant_win': rng.random() > 0.5,
+        'duration': duration,
+        'pre_game_duration': 90,
+        'start_time': 1540000000 + match_id % 10000000,
+        'match_id': match_id,
+        'match_seq_num': match_id - 500000000,
+        'tower_status_radiant': rng.randint(0, 2047),
+        'tower_status_dire': rng.randint(0, 2047),
+        'barracks_status_radiant': rng.randint(0, 63),
+        'barracks_status_dire': rng.randint(0, 63),
+        'cluster': rng.choice([111, 121, 133, 151, 184]),
+        'first_blood_time': rng.randint(0, 300),
+        'lobby_type': rng.choice([0, 0, 1, 2, 7, 7, 7]),
+        'human_players': 10,
+        'leagueid': 0,
+        'positive_votes': rng.randint(0, 5),
+        'negative_votes': rng.randint(0, 5),
+        'game_mode': rng.choice([1, 2, 3, 4, 22, 22]),
+        'flags': 0,
+        'engine': 1,
+        'radiant_score': rng.randint(5, 60),
+        'dire_score': rng.randint(5, 60),
+        'picks_bans': picks_bans
+    }
+
+def _team_live(rng, side):
+    heroes = rng.sample(_HERO_IDS, 11)
+    team = _Pairs([
+        ('score', rng.randint(0, 60)),
+        ('tower_state', rng.randint(0, 2047)),
+        ('barracks_state', rng.randint(0, 63)),
+        ('picks', [{'hero_id': h} for h in heroes[:5]]),
+        ('bans', [{'hero_id': h} for h in heroes[5:]])
+    ])
+    players = []
+    for i, hero_id in enumerate(heroes[:5]):
+        player = {
+            'player_slot': i if side == 'radiant' else 128 + i,
+            'account_id': _account_id(rng),
+            'hero_id': hero_id,
+            'kills': rng.randint(0, 20),
+            'death': rng.randint(0, 15),
+            'assists': rng.randint(0, 30),
+            'last_hits': rng.randint(0, 600),
+            'denies': rng.randint(0, 40),
+            'gold': rng.randint(0, 5000),
+            'level': rng.randint(1, 30),
+            'gold_per_min': rng.randint(200, 900),
+            'xp_per_min': rng.randint(200, 900),
+            'ultimate_state': rng.randint(0, 3),
+            'ultimate_cooldown': rng.randint(0, 120)
+        }
+        for j in range(6):
+            player['item{}'.format(j)] = rng.choice(_ITEM_IDS)
+        player.update({
+            'respawn_timer': rng.randint(0, 60),
+            'position_x': rng.uniform(-8000, 8000),
+            'position_y': rng.uniform(-8000, 8000),
+            'net_worth': rng.randint(500, 40000)
+        })
+        players.append(player)
+    team.append(('players', players))
+    # The WebAPI repeats the "abilities" key, once per player.
+    for i in range(5):
+        abilities = [{'ability_id': a, 'ability_level': rng.randint(1, 4)} for a in rng.sample(_ABILITY_IDS, 4)]
+        team.append(('abilities', abilities))
+    return team
+
+def live_league_game(match_id = 4375122984, seed = None):
+    """A single game of a ``GetLiveLeagueGames`` payload (with repeated ``abilities`` keys).
+
+    Parameters
+    ----------
+    match_id : int
+        Match ID of the generated game
+    seed : int, optional
+        Random seed (defaults to ``match_id``)
+    """
+    rng = random.Random(match_id if seed is None else seed)
+    radiant = _team_live(rng, 'radiant')
+    dire = _team_live(rng, 'dire')
+    players = []
+    for team_id, team in ((0, radiant), (1, dire)):
+        for p in dict(team)['players']:
+            players.append({'account_id': p['account_id'], 'name': 'player_{}'.format(p['account_id']), 'hero_id': p['hero_id'], 'team': team_id})
+    players.append({'account_id': _account_id(rng), 'name': 'caster', 'hero_id': 0, 'team': 2})
+
+    return _Pairs([
+        ('players', players),
+        ('radiant_team', {'team_name': 'Radiant {}'.format(match_id % 97), 'team_id': rng.randint(1, 7000000), 'team_logo': rng.randint(1, 2**60), 'complete': True}),
+        ('dire_team', {'team_name': 'Dire {}'.format(match_id % 89), 'team_id': rng.randint(1, 7000000), 'team_logo': rng.randint(1, 2**60), 'complete': True}),
+        ('lobby_id', rng.randint(2**50, 2**55)),
+        ('match_id', match_id),
+        ('spectators', rng.randint(0, 50000)),
+        ('league_id', rng.randint(1, 11000)),
+        ('league_node_id', 0),
+        ('stream_delay_s', rng.choice([120, 300])),
+        ('radiant_series_wins', rng.randint(0, 1)),
+        ('dire_series_wins', rng.randint(0, 1)),
+        ('series_type', rng.randint(0, 2)),
+        ('scoreboard', _Pairs([
+            ('duration', rng.uniform(0, 4000)),
+            ('roshan_respawn_timer', rng.randint(0, 660)),
+            ('radiant', radiant),
+            ('dire', dire)
+        ]))
+    ])
+
+def match_details_text(match_id = 4176987886, seed = None):
+    """``GetMatchDetails`` response body."""
+    return dumps({'result': match_details(match_id, seed)})
+
+def live_league_games_text(num_games = 5, seed = 0):
+    """``GetLiveLeagueGames`` response body."""
+    return dumps(live_league_games(num_games, seed))
+
+def match_summary(match_id):
+    """Entry of a ``GetMatchHistory`` payload."""
+    details = match_details(match_id)
+    return {
+        'match_id': match_id,
+        'match_seq_num': details['match_seq_num'],
+        'start_time': details['start_time'],
+        'lobby_type': details['lobby_type'],
+        'radiant_team_id': 0,
+        'dire_team_id': 0,
+        'players': [{k: p[k] for k in ('account_id', 'player_slot', 'hero_id')} for p in details['players']]
+    }
+
+def match_history(start_at_match_id = None, matches_requested = 100, total_results = 500, account_id = None, hero_id = None, **kwargs):
+    """``GetMatchHistory`` payload.
+
+    Matches are numbered downwards from ``start_at_match_id``. ``account_id`` and ``hero_id``
+    filters are honoured by placing the account/hero in the first player slot of every match.
+    """
+    top = 4176987886 if start_at_match_id is None else int(start_at_match_id)
+    offset = min(4176987886 - top, total_results) if top <= 4176987886 else 0
+    count = max(0, min(int(matches_requested), total_results - offset))
+
+    matches = []
+    for match_id in range(top, top - count, -1):
+        match = match_summary(match_id)
+        if account_id is not None:
+            match['players'][0]['account_id'] = entities.SteamAccount(account_id)['id32']
+        if hero_id is not None:
+            match['players'][0]['hero_id'] = int(hero_id)
+        matches.append(match)
+
+    return {'result': {
+        'status': 1,
+        'num_results': len(matches),
+        'total_results': total_results,
+        'results_remaining': total_results - offset - len(matches),
+        'matches': matches
+    }}
+
+def match_history_by_sequence_num(start_at_match_seq_num = 3600000000, matches_requested = 100, **kwargs):
+    """``GetMatchHistoryBySequenceNum`` payload (full match details, ascending sequence numbers)."""
+    start = int(start_at_match_seq_num)
+    matches = [match_details(seq + 500000000) for seq in range(start, start + int(matches_requested))]
+    return {'result': {'status': 1, 'matches': matches}}
+
+def live_league_games(num_games = 5, seed = 0):
+    """``GetLiveLeagueGames`` payload."""
+    return {'result': {'games': [live_league_game(4375122984 + i, seed + i) for i in range(num_games)], 'status': 200}}
+
+def _title(name, prefix):
+    return name[len(prefix):].replace('_', ' ').title() if name.startswith(prefix) else name
+
+def heroes(language = None, **kwargs):
+    """``GetHeroes`` payload built from local reference data."""
+    result = []
+    for hero_id in _HERO_IDS:
+        name = entities.all_heroes.get(str(hero_id), {}).get('hero_name', 'npc_dota_hero_{}'.format(hero_id))
+        hero = {'name': name, 'id': hero_id}
+        if language:
+            hero['localized_name'] = _title(name, 'npc_dota_hero_')
+        result.append(hero)
+    return {'result': {'heroes': result, 'count': len(result)}}
+
+def game_items(language = None, **kwargs):
+    """``GetGameItems`` payload built from local reference data."""
+    result = []
+    for item_id in _ITEM_IDS:
+        cur_item = entities.all_items.get(str(item_id), {})
+        name = cur_item.get('item_name', 'item_{}'.format(item_id))
+        item = {
+            'id': item_id,
+            'name': name,
+            'cost': int(cur_item.get('item_cost', 0)),
+            'secret_shop': 0,
+            'side_shop': 0,
+            'recipe': int(name.startswith('item_recipe'))
+        }
+        if language:
+            item['localized_name'] = _title(name, 'item_')
+        result.append(item)
+    return {'result': {'items': result, 'status': 200}}
+
+def tournament_prize_pool(leagueid = 0, **kwargs):
+    """``GetTournamentPrizePool`` payload."""
+    leagueid = int(leagueid)
+    return {'result': {'prize_pool': random.Random(leagueid).randint(0, 30000000) if leagueid else 0, 'league_id': leagueid, 'status': 200}}
+
+def top_live_game(partner = 0, num_games = 10, seed = 0, **kwargs):
+    """``GetTopLiveGame`` payload (no ``result`` envelope)."""
+    game_list = []
+    for i in range(num_games):
+        rng = random.Random(seed * 1000 + int(partner) * 100 + i)
+        match_id = 4375200000 + i
+        heroes = rng.sample(_HERO_IDS, 10)
+        game_list.append({
+            'activate_time': 1547000000 + seed,
+            'deactivate_time': 0,
+            'server_steam_id': str(90000000000000000 + rng.randint(0, 2**40)),
+            'lobby_id': str(rng.randint(2**50, 2**55)),
+            'league_id': 0,
+            'lobby_type': 7,
+            'game_time': rng.randint(0, 3600),
+            'delay': 120,
+            'spectators': rng.randint(0, 3000),
+            'game_mode': 22,
+            'average_mmr': rng.randint(5000, 9000),
+            'match_id': str(match_id),
+            'series_id': 0,
+            'team_name_radiant': '',
+            'team_name_dire': '',
+            'team_id_radiant': 0,
+            'team_id_dire': 0,
+            'sort_score': rng.randint(0, 10000),
+            'last_update_time': 1547000000 + seed,
+            'radiant_lead': rng.randint(-20000, 20000),
+            'radiant_score': rng.randint(0, 50),
+            'dire_score': rng.randint(0, 50),
+            'players': [{'account_id': _account_id(rng), 'hero_id': h} for h in heroes],
+            'building_state': rng.randint(0, 2**22 - 1)
+        })
+    return {'game_list': game_list}
+
+def team_info(team_id):
+    """Entry of a ``GetTeamInfoByTeamID`` payload."""
+    rng = random.Random(team_id)
+    team = {
+        'team_id': team_id,
+        'name': 'Team {}'.format(team_id),
+        'tag': 'T{}'.format(team_id % 1000),
+        'time_created': 1340000000 + team_id,
+        'calibration_games_remaining': 0,
+        'logo': rng.randint(1, 2**60),
+        'logo_sponsor': 0,
+        'country_code': '',
+        'url': '',
+        'games_played': rng.randint(0, 2000),
+        'admin_account_id': _account_id(rng)
+    }
+    for i in range(5):
+        team['player_{}_account_id'.format(i)] = _account_id(rng)
+    return team
+
+def team_info_by_team_id(start_at_team_id = 1, teams_requested = 100, **kwargs):
+    """``GetTeamInfoByTeamID`` payload."""
+    start = int(start_at_team_id)
+    return {'result': {'status': 1, 'teams': [team_info(t) for t in range(start, start + int(teams_requested))]}}
+
+def broadcaster_info(broadcaster_steam_id = None, **kwargs):
+    """``GetBroadcasterInfo`` payload (no ``result`` envelope)."""
+    account = entities.SteamAccount(broadcaster_steam_id)
+    live = random.Random(account['id64']).random() < 0.1
+    return {
+        'account_id': account['id32'],
+        'server_steam_id': str(90000000000000000 + account['id32']) if live else '0',
+        'live': live,
+        'allow_live_video': live
+    }
+
+def player_summary(account_id):
+    """Entry of a ``GetPlayerSummaries`` payload."""
+    account = entities.SteamAccount(account_id)
+    rng = random.Random(account['id64'])
+    return {
+        'steamid': str(account['id64']),
+        'communityvisibilitystate': rng.choice([1, 3]),
+        'profilestate': 1,
+        'personaname': 'player_{}'.format(account['id32']),
+        'lastlogoff': 1547000000 - rng.randint(0, 10**6),
+        'profileurl': 'https://steamcommunity.com/profiles/{}/'.format(account['id64']),
+        'avatar': 'https://example.invalid/avatars/{}.jpg'.format(account['id32']),
+        'avatarmedium': 'https://example.invalid/avatars/{}_medium.jpg'.format(account['id32']),
+        'avatarfull': 'https://example.invalid/avatars/{}_full.jpg'.format(account['id32']),
+        'personastate': rng.randint(0, 6),
+        'timecreated': 1100000000 + rng.randint(0, 4 * 10**8)
+    }
+
+def player_summaries(steamids = '', **kwargs):
+    """``GetPlayerSummaries`` payload."""
+    return {'response': {'players': [player_summary(s) for s in str(steamids).split(',') if s]}}
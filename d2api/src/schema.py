@@ -0,0 +1,379 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+"""Declarative schemas of response objects.
+
+Every wrapper class declares the attributes it exposes in a :class:`Schema`, along with how each
+attribute is built from the WebAPI response (renamed keys, entities, nested objects). The
+:func:`generated` class decorator turns a schema into a specialized parser function when the
+module is imported: keys are inlined as constants and loops over fixed key sets are unrolled, so
+parsing does no per-call string formatting or schema interpretation.
+
+Attributes declared without a ``source`` are only documented (they are either passed through
+unchanged from the response, or built by the class's own parser). Attributes combining several
+response keys are ``derived`` from them by a function. Schemas also describe the
+structure of responses for the quick reference (see :func:`describe`), and select the response
+keys to decode when only some attributes are requested (see :func:`project`).
+"""
+import copyreg
+from abc import ABCMeta
+from functools import lru_cache
+
+from . import entities
+
+class Field:
+    """An attribute of a response object (see the constructor functions below)."""
+    __slots__ = ('name', 'kind', 'source', 'target', 'default', 'key', 'renames', 'inputs', 'spread', 'optional')
+
+    def __init__(self, name, kind, source = None, target = None, default = None, key = None, renames = None, inputs = None,
+                 spread = None, optional = False):
+        self.name = name
+        self.kind = kind
+        self.source = source
+        self.target = target
+        self.default = default
+        self.key = key
+        self.renames = renames
+        self.inputs = inputs
+        self.spread = spread
+        self.optional = optional
+
+    def response_keys(self):
+        """Keys of the response the attribute is built from."""
+        if self.inputs is not None:
+            return self.inputs
+        if self.source is None:
+            return (self.name,)
+        return self.source if self.kind in ('entity_list', 'derived') else (self.source,)
+
+    def replace(self, **changes):
+        """Copy of the field with some slots changed."""
+        f = Field(self.name, self.kind)
+        for slot in self.__slots__:
+            setattr(f, slot, changes.get(slot, getattr(self, slot)))
+        return f
+
+    def __repr__(self):
+        return 'Field({!r}, {!r}, source = {!r})'.format(self.name, self.kind, self.source)
+
+# ``inputs`` lists the response keys an attribute built by a custom parser is derived from
+# (attributes with a ``source`` are derived from it, others from the key of the same name)
+
+def value(name, source = None, default = None, inputs = None):
+    """A plain value, renamed from ``source`` if given."""
+    return Field(name, 'value', source, default = default, inputs = inputs)
+
+def convert(name, func, source = None, default = None):
+    """A value converted by ``func`` from the value of ``source``."""
+    return Field(name, 'convert', source, func, default)
+
+def entity(name, cls, source = None, inputs = None):
+    """An entity built from the ID found at ``source``."""
+    return Field(name, 'entity', source, cls, inputs = inputs)
+
+def entity_list(name, cls, sources = None):
+    """A list of entities built from the IDs found at each key of ``sources`` (e.g. item slots)."""
+    return Field(name, 'entity_list', tuple(sources) if sources is not None else None, cls)
+
+def entity_each(name, cls, source = None, key = None):
+    """A list of entities built from the ``key`` of every object of the list at ``source``."""
+    return Field(name, 'entity_each', source, cls, key = key)
+
+def nested(name, cls, source = None, inputs = None):
+    """An object wrapped by ``cls``."""
+    return Field(name, 'nested', source, cls, inputs = inputs)
+
+def nested_list(name, cls, source = None, renames = None, inputs = None, sort_key = None, spread = None):
+    """A list of objects wrapped by ``cls``, with keys of each object renamed by ``renames`` beforehand.
+
+    ``sort_key`` sorts the wrapped objects. ``spread`` is a ``(key, sources)`` pair moving the value
+    of each response key of ``sources`` to ``key`` of the object at the same position.
+    """
+    return Field(name, 'nested_list', source, cls, key = sort_key, renames = renames, inputs = inputs, spread = spread)
+
+def bit(name, source, index):
+    """A bit of the bitmask at ``source`` (which is kept), left out if the bitmask is missing."""
+    return Field(name, 'bit', source, key = index)
+
+def derived(name, func, sources, default = None, optional = False, cls = None, many = False, keys = None):
+    """A value computed by ``func`` from the values of ``sources`` (which are kept, see ``Schema.drop``).
+
+    With ``optional``, the attribute is left out when every source is missing. ``cls`` documents the
+    class of the object (or, with ``many``, of the list of objects) returned by ``func``, and ``keys``
+    the keys ``func`` wraps with it (all attributes of ``cls`` are documented if not given).
+    """
+    key = (cls, many, tuple(keys) if keys is not None else None) if cls is not None else None
+    return Field(name, 'derived', tuple(sources), func, default, key = key, optional = optional)
+
+class Schema:
+    """Attributes of a response object.
+
+    Parameters
+    ----------
+    fields : Field
+        Attributes, built in the given order
+    envelope : str, optional
+        Key of the response holding the object (e.g. ``'result'``)
+    context : tuple(str), optional
+        Keys of the response used to build every attribute (e.g. ``'start_time'`` to resolve entities)
+    patch : str, optional
+        Key of the response holding the timestamp entities are resolved at (see :any:`using_patch`)
+    drop : tuple(str), optional
+        Keys of the response removed once every attribute is built (e.g. sources of derived attributes)
+    """
+    def __init__(self, *fields, envelope = None, context = (), patch = None, drop = ()):
+        self.fields = fields
+        self.envelope = envelope
+        self.context = context
+        self.patch = patch
+        self.drop = drop
+
+    def replace(self, *fields):
+        """Copy of the schema with other fields."""
+        return Schema(*fields, envelope = self.envelope, context = self.context, patch = self.patch, drop = self.drop)
+
+def _compile(schema, func_name, qualname, unwrap = True):
+    """Generate the source of a parser function for a schema, and compile it.
+
+    Custom parsers calling the generated one unwrap the envelope themselves (``unwrap = False``).
+    """
+    namespace = {}
+
+    def ref(obj):
+        name = '_{}'.format(len(namespace))
+        namespace[name] = obj
+        return name
+
+    header = ['def {}(self):'.format(func_name)]
+    if unwrap and schema.envelope is not None:
+        header.append('    self.data = self.data.get({!r}, {{}})'.format(schema.envelope))
+    header.extend(['    d = self.data', '    pop = d.pop', '    get = d.get'])
+    lines = []
+
+    for f in schema.fields:
+        if f.source is None:
+            continue
+        # values kept under the same key are replaced, others are moved
+        take = 'get' if f.source == f.name else 'pop'
+        if f.kind == 'derived':
+            args = ', '.join('get({!r}, {!r})'.format(k, f.default) for k in f.source)
+            if not f.optional:
+                lines.append('    d[{!r}] = {}({})'.format(f.name, ref(f.target), args))
+            else:
+                lines.append('    args = ({},)'.format(args))
+                lines.append('    if args != {!r}:'.format((None,) * len(f.source)))
+                lines.append('        d[{!r}] = {}(*args)'.format(f.name, ref(f.target)))
+            continue
+        if f.kind == 'bit':
+            lines.append('    mask = get({!r})'.format(f.source))
+            lines.append('    if mask is not None:')
+            lines.append('        d[{!r}] = (mask >> {}) & 1'.format(f.name, f.key))
+            continue
+        if f.kind == 'nested_list' and f.spread:
+            key, keys = f.spread
+            lines.append('    for k, x in zip({!r}, get({!r}, [])):'.format(tuple(keys), f.source))
+            lines.append('        x[{!r}] = pop(k, [])'.format(key))
+        if f.kind == 'value':
+            lines.append('    d[{!r}] = pop({!r}, {!r})'.format(f.name, f.source, f.default))
+        elif f.kind == 'convert':
+            lines.append('    d[{!r}] = {}(pop({!r}, {!r}))'.format(f.name, ref(f.target), f.source, f.default))
+        elif f.kind == 'entity':
+            lines.append('    d[{!r}] = {}(pop({!r}, None))'.format(f.name, ref(f.target), f.source))
+        elif f.kind == 'entity_list':
+            cls = ref(f.target)
+            items = ', '.join('{}(pop({!r}, None))'.format(cls, k) for k in f.source)
+            lines.append('    d[{!r}] = [{}]'.format(f.name, items))
+        elif f.kind == 'entity_each':
+            lines.append('    d[{!r}] = [{}(x[{!r}]) for x in {}({!r}, [])]'.format(f.name, ref(f.target), f.key, take, f.source))
+        elif f.kind == 'nested':
+            lines.append('    d[{!r}] = {}({}({!r}, {{}}))'.format(f.name, ref(f.target), take, f.source))
+        elif f.kind == 'nested_list' and f.renames:
+            lines.append('    objs = []')
+            lines.append('    for x in {}({!r}, []):'.format(take, f.source))
+            for old, new in f.renames.items():
+                lines.append('        x[{!r}] = x.pop({!r}, None)'.format(new, old))
+            lines.append('        objs.append({}(x))'.format(ref(f.target)))
+            lines.append('    d[{!r}] = objs'.format(f.name))
+        elif f.kind == 'nested_list':
+            lines.append('    d[{!r}] = [{}(x) for x in {}({!r}, [])]'.format(f.name, ref(f.target), take, f.source))
+        else:
+            raise ValueError('Unknown field kind {!r}'.format(f.kind))
+        if f.kind == 'nested_list' and f.key is not None:
+            lines.append('    d[{!r}].sort(key = {})'.format(f.name, ref(f.key)))
+
+    for k in schema.drop:
+        lines.append('    pop({!r}, None)'.format(k))
+    if not lines:
+        lines.append('    pass')
+    if schema.patch is not None:
+        # resolve entities as of the patch the response dates from
+        header.append('    with {}(timestamp = get({!r})):'.format(ref(entities.using_patch), schema.patch))
+        lines = ['    ' + line for line in lines]
+
+    source = '\n'.join(header + lines) + '\n'
+    exec(compile(source, '<schema of {}>'.format(qualname), 'exec'), namespace)
+    func = namespace[func_name]
+    func.__qualname__ = '{}.{}'.format(qualname, func_name)
+    func.source = source
+    return func
+
+def generated(cls):
+    """Class decorator generating the parser of a wrapper class from its ``_schema``.
+
+    The generated parser is available as ``_parse_schema``. It also becomes the ``parse`` (or
+    ``parse_response``) method, unless the class defines its own to add custom steps.
+    """
+    method = 'parse_response' if hasattr(cls, 'parse_response') else 'parse'
+    custom = method in cls.__dict__
+    func = _compile(cls._schema, method, cls.__name__, unwrap = not custom)
+    cls._parse_schema = func
+    if not custom:
+        setattr(cls, method, func)
+    return cls
+
+class _Derived(ABCMeta):
+    """Metaclass of wrapper classes (mappings, hence ``ABCMeta``) built at runtime (e.g. projections).
+
+    Such classes are not reachable by name, so they are pickled as the factory call building
+    them (stored as ``_derived``), which lets them reach the processes of a :any:`ParsePipeline`.
+    """
+
+def _reduce_derived(cls):
+    return cls.__dict__['_derived']
+
+copyreg.pickle(_Derived, _reduce_derived)
+
+def derive(cls, factory, args, namespace):
+    """Subclass of a wrapper class, pickled as ``factory(*args)`` (which must return the same class)."""
+    namespace = dict(namespace, __module__ = cls.__module__, __qualname__ = cls.__qualname__, _derived = (factory, args))
+    return _Derived(cls.__name__, (cls,), namespace)
+
+def _describe_entity(cls):
+    return {('list({})'.format(k) if isinstance(v, list) else k): {} for k, v in sorted(cls(None).items())}
+
+def describe(cls, keys = None):
+    """Attribute structure of a wrapper class.
+
+    Parameters
+    ----------
+    cls : type
+        Wrapper class
+    keys : tuple(str), optional
+        Keys of the wrapped objects, to only describe the attributes built from them
+
+    Returns
+    -------
+    dict
+        Nested dicts of attribute names sorted by name, with lists of objects named ``list(<name>)``
+    """
+    structure = {}
+    for f in sorted(cls._schema.fields, key = lambda f: f.name):
+        if keys is not None and not any(k in keys for k in f.response_keys()):
+            continue
+        if f.kind == 'entity':
+            structure[f.name] = _describe_entity(f.target)
+        elif f.kind in ('entity_list', 'entity_each'):
+            structure['list({})'.format(f.name)] = _describe_entity(f.target)
+        elif f.kind == 'nested':
+            structure[f.name] = describe(f.target)
+        elif f.kind == 'nested_list':
+            structure['list({})'.format(f.name)] = describe(f.target)
+        elif f.kind == 'derived' and f.key is not None:
+            target, many, target_keys = f.key
+            structure['list({})'.format(f.name) if many else f.name] = describe(target, target_keys)
+        else:
+            structure[f.name] = {}
+    return structure
+
+def _selection(fields):
+    """Tree of selected attributes from paths such as ``'players[].hero'`` (``None`` selects a whole attribute)."""
+    if isinstance(fields, str):
+        fields = [fields]
+    tree = {}
+    for path in fields:
+        node = tree
+        parts = [p[:-2] if p.endswith('[]') else p for p in path.split('.')]
+        for part in parts[:-1]:
+            child = node.setdefault(part, {})
+            if child is None:
+                break
+            node = child
+        else:
+            node[parts[-1]] = None
+    return tree
+
+def _freeze(tree):
+    return tuple(sorted((k, None if v is None else _freeze(v)) for k, v in tree.items()))
+
+def project(cls, fields):
+    """Variant of a wrapper class that only builds some attributes.
+
+    Response keys that only unselected attributes are built from are dropped before parsing, so
+    no entities or nested objects are built for them, and other attributes are dropped after.
+    Projected classes are cached, and parse responses like the original class otherwise.
+
+    Parameters
+    ----------
+    cls : type
+        Wrapper class (e.g. :any:`MatchDetails`)
+    fields : list(str)
+        Attribute paths, with ``.`` separating nested attributes and ``[]`` marking lists
+        (e.g. ``['match_id', 'winner', 'players[].hero']``)
+
+    Returns
+    -------
+    type
+        Subclass of ``cls``
+
+    Raises
+    ------
+    ValueError
+        If a path does not match the attributes of the class
+    """
+    return _project(cls, _freeze(_selection(fields)))
+
+@lru_cache(maxsize = None)
+def _project(cls, frozen):
+    selection = dict(frozen)
+    by_name = {f.name: f for f in cls._schema.fields}
+    for name in selection:
+        if name not in by_name:
+            raise ValueError('{} has no attribute {!r}'.format(cls.__name__, name))
+
+    fields = []
+    kept = set(cls._schema.context)
+    for f in cls._schema.fields:
+        if f.name not in selection:
+            continue
+        sub = selection[f.name]
+        if sub is not None:
+            if f.kind not in ('nested', 'nested_list') or f.source is None:
+                raise ValueError('Attribute {!r} of {} can only be selected whole'.format(f.name, cls.__name__))
+            f = f.replace(target = _project(f.target, sub))
+        fields.append(f)
+        kept.update(f.response_keys())
+    dropped = tuple(sorted({k for f in cls._schema.fields for k in f.response_keys()} - kept))
+    selected = frozenset(selection)
+    projected_schema = cls._schema.replace(*fields)
+
+    method = 'parse_response' if hasattr(cls, 'parse_response') else 'parse'
+    base = getattr(cls, method)
+    custom = getattr(cls, '_parse_schema', None) is not base
+    parse_schema = _compile(projected_schema, method, cls.__name__, unwrap = not custom)
+    if not custom:
+        base = parse_schema
+    envelope = cls._schema.envelope
+
+    def parse(self):
+        data = self.data.get(envelope, {}) if envelope is not None else self.data
+        for k in dropped:
+            data.pop(k, None)
+        base(self)
+        data = self.data
+        for k in [k for k in data if k not in selected]:
+            del data[k]
+
+    return derive(cls, _project, (cls, frozen), {
+        '_schema': projected_schema,
+        '_parse_schema': parse_schema,
+        method: parse
+    })
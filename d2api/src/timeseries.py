@@ -0,0 +1,225 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+"""Compact time series of live game snapshots.
+
+Every poll of :any:`get_live_league_games` contains the state of each player at that point of
+the game. :class:`LiveRecorder` appends these snapshots to per-match columns, storing the
+difference to the previous value in the narrowest integer array that fits::
+
+    recorder = LiveRecorder()
+    recorder.record(api.get_live_league_games())
+    times, lead = recorder[match_id].lead('net_worth')
+"""
+import bisect
+from array import array
+from itertools import accumulate, chain, islice
+
+# Player values recorded by default
+FIELDS = ('gold', 'net_worth', 'level', 'kills', 'deaths', 'assists', 'last_hits', 'denies', 'position_x', 'position_y')
+
+# Array typecodes from narrowest to widest, with the range of values they hold
+_WIDTHS = [(code, -(1 << (8 * array(code).itemsize - 1)), (1 << (8 * array(code).itemsize - 1)) - 1) for code in ('b', 'h', 'i', 'q')]
+
+class DeltaColumn:
+    """Append-only integer column, stored as deltas.
+
+    The first value is kept aside, and the differences between consecutive values are stored in
+    an array of 8-bit integers, which is widened the first time a difference does not fit.
+
+    Parameters
+    ----------
+    start : int
+        Index of the first value within the series (for values that appear later than others)
+    """
+    def __init__(self, start = 0):
+        self.start = start
+        self.first = self.last = None
+        self._width = 0
+        self._deltas = array(_WIDTHS[0][0])
+
+    def append(self, value):
+        if self.first is None:
+            self.first = self.last = value
+        delta = value - self.last
+        while not _WIDTHS[self._width][1] <= delta <= _WIDTHS[self._width][2]:
+            self._width += 1
+            self._deltas = array(_WIDTHS[self._width][0], self._deltas)
+        self._deltas.append(delta)
+        self.last = value
+
+    def values(self, start = 0, stop = None):
+        """Decoded values between positions ``start`` and ``stop`` of the column."""
+        if self.first is None:
+            return []
+        return list(islice(accumulate(chain((self.first,), islice(self._deltas, 1, None))), start, stop))
+
+    @property
+    def typecode(self):
+        return self._deltas.typecode
+
+    @property
+    def nbytes(self):
+        return len(self._deltas) * self._deltas.itemsize
+
+    def __len__(self):
+        return len(self._deltas)
+
+class MatchSeries:
+    """Recorded snapshots of a single match.
+
+    Values are recorded per player slot; non-integer values (e.g. positions) are rounded.
+
+    Parameters
+    ----------
+    match_id : int
+        Match ID
+    fields : tuple(str)
+        Recorded player values
+    """
+    def __init__(self, match_id, fields = FIELDS):
+        self.match_id = match_id
+        self.fields = tuple(fields)
+        self.sides = {}
+        self._times = DeltaColumn()
+        self._columns = {}
+
+    def __len__(self):
+        return len(self._times)
+
+    @property
+    def nbytes(self):
+        """Memory used by recorded values (in bytes)."""
+        return self._times.nbytes + sum(c.nbytes for cols in self._columns.values() for c in cols)
+
+    def append(self, game_time, players):
+        """Record a snapshot.
+
+        Parameters
+        ----------
+        game_time : float
+            Game time of the snapshot (in seconds). Snapshots not later than the last one are ignored.
+        players : list(tuple)
+            ``(side, player_live)`` pairs
+
+        Returns
+        -------
+        bool
+            ``True`` if the snapshot was recorded
+        """
+        game_time = int(game_time)
+        if len(self._times) and game_time <= self._times.last:
+            return False
+
+        index = len(self._times)
+        self._times.append(game_time)
+        seen = set()
+        for side, player in players:
+            slot = player.get('player_slot')
+            columns = self._columns.get(slot)
+            if columns is None:
+                columns = self._columns[slot] = [DeltaColumn(index) for _ in self.fields]
+                self.sides[slot] = side
+            for column, field in zip(columns, self.fields):
+                column.append(int(round(player.get(field) or 0)))
+            seen.add(slot)
+
+        # players missing from a snapshot keep their last values
+        for slot, columns in self._columns.items():
+            if slot not in seen:
+                for column in columns:
+                    column.append(column.last)
+        return True
+
+    def _window(self, start, stop):
+        times = self._times.values()
+        lo = 0 if start is None else bisect.bisect_left(times, start)
+        hi = len(times) if stop is None else bisect.bisect_right(times, stop)
+        return times, lo, hi
+
+    def times(self, start = None, stop = None):
+        """Game times of the snapshots between ``start`` and ``stop`` (inclusive, in seconds)."""
+        times, lo, hi = self._window(start, stop)
+        return times[lo:hi]
+
+    def player(self, slot, field, start = None, stop = None):
+        """Values of a player between game times ``start`` and ``stop``.
+
+        Returns
+        -------
+        tuple(list, list)
+            Game times and values (snapshots before the player appeared are left out)
+        """
+        times, lo, hi = self._window(start, stop)
+        column = self._columns[slot][self.fields.index(field)]
+        lo = max(lo, column.start)
+        return times[lo:hi], column.values(lo - column.start, hi - column.start)
+
+    def team(self, side, field, start = None, stop = None):
+        """Sum of a value over the players of a side (radiant/dire), see :any:`player`."""
+        times, lo, hi = self._window(start, stop)
+        total = [0] * (hi - lo)
+        for slot, columns in self._columns.items():
+            if self.sides[slot] != side:
+                continue
+            column = columns[self.fields.index(field)]
+            first = max(lo, column.start)
+            for i, v in enumerate(column.values(first - column.start, hi - column.start), first - lo):
+                total[i] += v
+        return times[lo:hi], total
+
+    def lead(self, field = 'net_worth', start = None, stop = None):
+        """Radiant lead (radiant total minus dire total) of a value over time, see :any:`player`."""
+        times, radiant = self.team('radiant', field, start, stop)
+        dire = self.team('dire', field, start, stop)[1]
+        return times, [r - d for r, d in zip(radiant, dire)]
+
+class LiveRecorder:
+    """Record live league games, keyed by match ID.
+
+    Parameters
+    ----------
+    fields : tuple(str)
+        Recorded player values (see :any:`PlayerLive`)
+    """
+    def __init__(self, fields = FIELDS):
+        self.fields = tuple(fields)
+        self._matches = {}
+
+    def record(self, games):
+        """Record a :any:`LiveLeagueGames` response (or a list of :any:`Game`).
+
+        Returns
+        -------
+        int
+            Number of recorded snapshots (games whose game time did not advance are skipped)
+        """
+        games = games['games'] if 'games' in games else games
+        recorded = 0
+        for game in games:
+            scoreboard = game.get('scoreboard', {})
+            if 'duration' not in scoreboard:
+                continue
+            players = [(side, p) for side in ('radiant', 'dire') for p in scoreboard.get(side, {}).get('players', [])]
+            series = self._matches.get(game['match_id'])
+            if series is None:
+                series = self._matches[game['match_id']] = MatchSeries(game['match_id'], self.fields)
+            recorded += series.append(scoreboard['duration'], players)
+        return recorded
+
+    def __getitem__(self, match_id):
+        return self._matches[match_id]
+
+    def __contains__(self, match_id):
+        return match_id in self._matches
+
+    def match_ids(self):
+        return list(self._matches)
+
+    def drop(self, match_id):
+        """Forget a match (e.g. once it is finished) and return its series."""
+        return self._matches.pop(match_id, None)
+
+    @property
+    def nbytes(self):
+        """Memory used by recorded values of all matches (in bytes)."""
+        return sum(m.nbytes for m in self._matches.values())
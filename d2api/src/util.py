@@ -20,4 +20,21 @@ def _parse_object_pairs(pairs):
 
     return dct
 
-decode_json = JSONDecoder(object_pairs_hook = _parse_object_pairs).decode
\ No newline at end of file
+_decoder = JSONDecoder(object_pairs_hook = _parse_object_pairs)
+
+def decode_json(response):
+    """Decode a json response, keeping values of repeated keys.
+
+    Parameters
+    ----------
+    response : str, bytes, bytearray or memoryview
+        Response body. Binary bodies are decoded as UTF-8 straight from the buffer.
+
+    Returns
+    -------
+    dict
+        Decoded response
+    """
+    if not isinstance(response, str):
+        response = str(response, 'utf-8', 'replace')
+    return _decoder.decode(response)
\ No newline at end of file
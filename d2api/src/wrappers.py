@@ -3,9 +3,12 @@
 """Parse wrapper definitions"""
 
 import pprint
+import threading
 from collections.abc import MutableMapping 
+from functools import lru_cache
 
 from . import entities
+from . import schema
 from . import util
 
 def _get_side_from_slot(player_slot):
@@ -16,10 +19,75 @@ def _get_side_from_team(team):
     """Map integer reference to string"""
     return {0:'radiant', 1:'dire', 2:'broadcaster', 4:'unassigned'}.get(team, 'unassigned')
 
+def _get_side(player_slot, team):
+    """Side of a player, from its team if known, else from its slot"""
+    return _get_side_from_team(team) if team is not None else _get_side_from_slot(player_slot)
+
 def _get_subdict(d, keys):
     """Get a subdict with specific keys"""
     return {k: d.get(k) for k in keys}
 
+_BUILDINGS_KEYS = ('tower_status', 'barracks_status')
+_PLAYER_MINIMAL_KEYS = ('account_id', 'player_slot', 'hero_id')
+_TEAM_INFO_KEYS = ('team_name', 'team_id')
+
+def _buildings(tower_status, barracks_status):
+    return Buildings({'tower_status': tower_status, 'barracks_status': barracks_status})
+
+def _minimal_players(players):
+    return [PlayerMinimal(_get_subdict(p, _PLAYER_MINIMAL_KEYS)) for p in players]
+
+def _team_info(team_name, team_id):
+    return TeamInfo({'team_name': team_name, 'team_id': team_id})
+
+_COMMUNITY_VISIBILITY = {
+    1: 'private',
+    2: 'friends_only',
+    3: 'friends_of_friends',
+    4: 'users_only',
+    5: 'public'
+}
+
+_PERSONA_STATE = {
+    0: 'offline',
+    1: 'online',
+    2: 'busy',
+    3: 'away',
+    4: 'snooze',
+    5: 'looking_to_trade',
+    6: 'looking_to_play'
+}
+
+# Keys of fixed sets of response values, built once instead of on every parse
+_INVENTORY_SLOTS = tuple('item_{}'.format(i) for i in range(6))
+_BACKPACK_SLOTS = tuple('backpack_{}'.format(i) for i in range(3))
+_LIVE_INVENTORY_SLOTS = tuple('item{}'.format(i) for i in range(6))
+_PLAYER_ABILITIES = tuple('abilities_{}'.format(i) for i in range(5))
+_TOWERS = ('top_t1', 'top_t2', 'top_t3', 'mid_t1', 'mid_t2', 'mid_t3', 'bot_t1', 'bot_t2', 'bot_t3', 'bot_ancient', 'top_ancient')
+_BARRACKS = ('top_melee', 'top_ranged', 'mid_melee', 'mid_ranged', 'bot_melee', 'bot_ranged')
+_BUILDING_STATUS = tuple((side, 'tower_status_{}'.format(side), 'barracks_status_{}'.format(side), '{}_buildings'.format(side)) for side in ('radiant', 'dire'))
+
+# Holds the ParseProfiler sampling the current thread's parsers, if any
+_profiling = threading.local()
+
+def _run_parser(obj, parser):
+    """Run a parse method, timing it if the current thread is being profiled"""
+    profiler = getattr(_profiling, 'active', None)
+    if profiler is None:
+        parser()
+    else:
+        profiler.record('{}.{}'.format(type(obj).__name__, parser.__name__), parser)
+
+class _NotModified:
+    """Returned in place of a response object if the response did not change since it was last fetched."""
+    def __repr__(self):
+        return 'NOT_MODIFIED'
+
+    def __bool__(self):
+        return False
+
+NOT_MODIFIED = _NotModified()
+
 class Dota2Dict(MutableMapping):
     def __getitem__(self, key):
         return self.data[key]
@@ -55,7 +123,7 @@ class AbstractParse(Dota2Dict):
             The class wraps around this dict.
         """
         super().__init__(default_obj)
-        self.parse()
+        _run_parser(self, self.parse)
 
     def parse(self):
         pass
@@ -66,13 +134,111 @@ class AbstractResponse(Dota2Dict):
         return pprint.pformat(self.data)
 
     def __init__(self, response_text):
+        """
+        Parameters
+        ----------
+        response_text : str or bytes
+            Response body
+        """
         self.raw_json = response_text
         super().__init__(util.decode_json(response_text))
-        self.parse_response()
+        _run_parser(self, self.parse_response)
+
+    @classmethod
+    def from_json(cls, data, response_text = None):
+        """Build a response object from already decoded json.
+
+        Parameters
+        ----------
+        data : dict
+            Decoded response
+        response_text : str or bytes, optional
+            Response body that ``data`` was decoded from (omit to not keep it)
+        """
+        obj = cls.__new__(cls)
+        obj.raw_json = response_text
+        Dota2Dict.__init__(obj, data)
+        _run_parser(obj, obj.parse_response)
+        return obj
+
+    @property
+    def raw_json(self):
+        """Response body as text (``None`` if it was not kept)."""
+        raw = self._raw
+        if raw is None or isinstance(raw, str):
+            return raw
+        return str(raw, 'utf-8', 'replace')
+
+    @raw_json.setter
+    def raw_json(self, value):
+        # Binary bodies are kept as is, and only converted to text when accessed
+        self._raw = value
+
+    @property
+    def raw_bytes(self):
+        """Response body as UTF-8 encoded bytes (``None`` if it was not kept)."""
+        raw = self._raw
+        if raw is None or isinstance(raw, bytes):
+            return raw
+        return raw.encode('utf-8') if isinstance(raw, str) else bytes(raw)
 
     def parse_response(self):
         self.assign_subkey('result')
 
+def parse_many(cls, bodies, columnar = False, keep_raw_json = True, fields = None, where = None):
+    """Parse a batch of response bodies of the same type.
+
+    Bodies are decoded by a single decoder, and heroes, items and abilities repeated across
+    the batch are resolved once (see :any:`shared_entities`).
+
+    Parameters
+    ----------
+    cls : type
+        Response class (e.g. :any:`MatchDetails`)
+    bodies : iterable(str or bytes)
+        Response bodies
+    columnar : bool
+        Return a dict of columns (one list per top-level attribute) instead of a list of responses
+    keep_raw_json : bool
+        Set to ``False`` to not keep the response bodies in ``raw_json``
+    fields : list(str), optional
+        Only build these attributes (see :any:`project`)
+    where : callable, optional
+        Predicate over decoded matches (see :mod:`d2api.src.filters`). Matches of
+        :any:`MatchHistory` pages, or whole responses of other classes, are skipped before
+        parsing unless accepted.
+
+    Returns
+    -------
+    list or dict
+        Parsed responses, or their attributes by name
+    """
+    decode = util.decode_json
+    if fields is not None:
+        cls = schema.project(cls, fields)
+    if where is not None and issubclass(cls, MatchHistory):
+        cls, where = filtered(cls, where), None
+    envelope = cls._schema.envelope if hasattr(cls, '_schema') else None
+    with entities.shared_entities():
+        parsed = []
+        for body in bodies:
+            data = decode(body)
+            if where is not None and not where(data.get(envelope, {}) if envelope is not None else data):
+                continue
+            parsed.append(cls.from_json(data, body if keep_raw_json else None))
+    if not columnar:
+        return parsed
+
+    columns = {}
+    for i, response in enumerate(parsed):
+        for k, v in response.items():
+            column = columns.get(k)
+            if column is None:
+                column = columns[k] = [None] * len(parsed)
+            column[i] = v
+    return columns
+
+@schema.generated
 class PlayerMinimal(AbstractParse):
     """A minimal information wrapper for a player
 
@@ -85,20 +251,15 @@ class PlayerMinimal(AbstractParse):
     hero : Hero
         hero played
     """
-    def parse(self):
-        self['steam_account'] = entities.SteamAccount(self.pop('account_id', None))
-
-        player_slot = self.pop('player_slot', None)
-        if not player_slot == None:
-            self['side'] = _get_side_from_slot(player_slot)
-
-        team = self.pop('team', None)
-        if not team == None:
-            self['side'] = _get_side_from_team(team)
-
-        self['hero'] = entities.Hero(self.pop('hero_id', None))
+    _schema = schema.Schema(
+        schema.entity('steam_account', entities.SteamAccount, 'account_id'),
+        schema.entity('hero', entities.Hero, 'hero_id'),
+        schema.derived('side', _get_side, ('player_slot', 'team'), optional = True),
+        drop = ('player_slot', 'team')
+    )
 
 # TODO : parse lobby_type or add enumeration for lobby_type
+@schema.generated
 class MatchSummary(AbstractParse):
     """A brief summary of queried games
 
@@ -115,9 +276,19 @@ class MatchSummary(AbstractParse):
     players : list(PlayerMinimal)
         List of player summaries
     """
-    def parse(self):
-        self['players'] = [PlayerMinimal(p) for p in self.get('players', [])]
-
+    _schema = schema.Schema(
+        schema.value('match_id'),
+        schema.value('match_seq_num'),
+        schema.value('start_time'),
+        schema.value('lobby_type'),
+        schema.value('radiant_team_id'),
+        schema.value('dire_team_id'),
+        schema.nested_list('players', PlayerMinimal, 'players'),
+        context = ('start_time',),
+        patch = 'start_time'
+    )
+
+@schema.generated
 class MatchHistory(AbstractResponse):
     """:any:`get_match_history` or :any:`get_match_history_by_sequence_num` response object
 
@@ -126,9 +297,52 @@ class MatchHistory(AbstractResponse):
     matches : list(MatchSummary)
         List of match summaries
     """
+    _schema = schema.Schema(
+        schema.value('status'),
+        schema.value('num_results'),
+        schema.value('total_results'),
+        schema.value('results_remaining'),
+        schema.nested_list('matches', MatchSummary, 'matches'),
+        envelope = 'result'
+    )
+
+    # predicate over raw matches (see filtered), and (match_id, match_seq_num) of every match
+    # of the page before filtering, used to request the next page
+    _where = None
+    scanned = None
+
     def parse_response(self):
         self.assign_subkey('result')
-        self['matches'] = [MatchSummary(match) for match in self.get('matches', [])]
+        where = self._where
+        if where is not None:
+            matches = self.get('matches', [])
+            self.scanned = [(m.get('match_id'), m.get('match_seq_num')) for m in matches]
+            self['matches'] = [m for m in matches if where(m)]
+        self._parse_schema()
+
+def filtered(cls, where):
+    """Variant of :any:`MatchHistory` (or of a projection of it) that only parses matches accepted by ``where``.
+
+    Parameters
+    ----------
+    cls : type
+        Response class
+    where : callable
+        Predicate over the decoded json of a match (see :mod:`d2api.src.filters`). Filtered
+        classes are pickled along with their predicate, which must then be picklable too.
+
+    Returns
+    -------
+    type
+        Subclass of ``cls``
+    """
+    if not issubclass(cls, MatchHistory):
+        raise ValueError('{} does not support filtering matches'.format(cls.__name__))
+    return _filtered(cls, where)
+
+@lru_cache(maxsize = 64)
+def _filtered(cls, where):
+    return schema.derive(cls, _filtered, (cls, where), {'_where': staticmethod(where)})
 
 class InventoryUnit(AbstractParse):
     """Any unit having item slots."""
@@ -142,18 +356,7 @@ class InventoryUnit(AbstractParse):
         tot = self['inventory'] + self['backpack']
         return tot
 
-    def _build_item_list(self):
-        self['inventory'] = []
-        self['backpack'] = []
-
-        for item_slot in ['item_{}'.format(i) for i in range(6)]:
-            cur_item = entities.Item(self.pop(item_slot, None))
-            self['inventory'].append(cur_item)
-
-        for backpack_slot in ['backpack_{}'.format(i) for i in range(3)]:
-            cur_item = entities.Item(self.pop(backpack_slot, None))
-            self['backpack'].append(cur_item)
-
+@schema.generated
 class AdditionalUnit(InventoryUnit):
     """An inventoried unit besides heroes (e.g. Lone druid bear)
 
@@ -164,10 +367,13 @@ class AdditionalUnit(InventoryUnit):
     backpack : list(Item)
         List of backpack items
     """
+    _schema = schema.Schema(
+        schema.value('unitname'),
+        schema.entity_list('inventory', entities.Item, _INVENTORY_SLOTS),
+        schema.entity_list('backpack', entities.Item, _BACKPACK_SLOTS)
+    )
 
-    def parse(self):
-        self._build_item_list()
-
+@schema.generated
 class AbilityInfo(AbstractParse):
     """Ability upgrade during game.
 
@@ -179,12 +385,19 @@ class AbilityInfo(AbstractParse):
         Game time at which ability was upgraded
     level : int
         Level of the player at which ability was upgraded.
+    ability_level : int
+        Current level of the ability (live games)
     """
-    def parse(self):
-        self['ability'] = entities.Ability(self.pop('ability_id', None))
+    _schema = schema.Schema(
+        schema.entity('ability', entities.Ability, 'ability_id'),
+        schema.value('time'),
+        schema.value('level'),
+        schema.value('ability_level')
+    )
 
 # TODO: add leaver status enumeration
 
+@schema.generated
 class PlayerUnit(InventoryUnit):
     """An inventoried hero unit
 
@@ -231,21 +444,31 @@ class PlayerUnit(InventoryUnit):
     ability_upgrades : list(AbilityInfo)
         Ability upgrade information
     """
-    def parse(self):
-        self._build_item_list()
-
-        self['steam_account'] = entities.SteamAccount(self.pop('account_id', None))
-        self['side'] = _get_side_from_slot(self.pop('player_slot', 0))
-        self['hero'] = entities.Hero(self.pop('hero_id', None))
-
-        self['additional_units'] = [AdditionalUnit(a) for a in self.get('additional_units', [])]
-
-        au_list = []
-        for au in self.get('ability_upgrades', []):
-            au['ability_id'] = au.pop('ability', None)
-            au_list.append(AbilityInfo(au))
-        self['ability_upgrades'] = au_list
-
+    _schema = schema.Schema(
+        schema.entity_list('inventory', entities.Item, _INVENTORY_SLOTS),
+        schema.entity_list('backpack', entities.Item, _BACKPACK_SLOTS),
+        schema.entity('steam_account', entities.SteamAccount, 'account_id'),
+        schema.convert('side', _get_side_from_slot, 'player_slot', 0),
+        schema.entity('hero', entities.Hero, 'hero_id'),
+        schema.nested_list('additional_units', AdditionalUnit, 'additional_units'),
+        schema.nested_list('ability_upgrades', AbilityInfo, 'ability_upgrades', renames = {'ability': 'ability_id'}),
+        schema.value('kills'),
+        schema.value('deaths'),
+        schema.value('assists'),
+        schema.value('leaver_status'),
+        schema.value('gold'),
+        schema.value('last_hits'),
+        schema.value('denies'),
+        schema.value('gold_per_min'),
+        schema.value('xp_per_min'),
+        schema.value('level'),
+        schema.value('gold_spent'),
+        schema.value('hero_damage'),
+        schema.value('tower_damage'),
+        schema.value('hero_healing')
+    )
+
+@schema.generated
 class Buildings(AbstractParse):
     """Represents current state of buildings
 
@@ -259,25 +482,19 @@ class Buildings(AbstractParse):
         Ancient top tower
     {lane}_{type} : bool
         Barracks status [lane = top, mid, bot][type = ranged, melee] (e.g. mid_melee)
+    tower_status : int
+        Bitmask of tower statuses
+    barracks_status : int
+        Bitmask of barracks statuses
     """
-    def parse(self):
-
-        towers = ['top_t1', 'top_t2', 'top_t3', 'mid_t1', 'mid_t2', 'mid_t3', 'bot_t1', 'bot_t2', 'bot_t3', 'bot_ancient', 'top_ancient']
-        barracks = ['top_melee', 'top_ranged', 'mid_melee', 'mid_ranged', 'bot_melee', 'bot_ranged']
-
-        tower_status = self.get('tower_status')
-        if tower_status != None:
-            for i, t in enumerate(towers):
-                cur_tower_status = ((1<<i) & tower_status) >> i
-                self[t] = cur_tower_status
-
-        barracks_status = self.get('barracks_status')
-        if barracks_status != None:
-            for i, b in enumerate(barracks):
-                cur_barracks_status = ((1<<i) & barracks_status) >> i
-                self[b] = cur_barracks_status
-
-
+    _schema = schema.Schema(
+        schema.value('tower_status'),
+        schema.value('barracks_status'),
+        *([schema.bit(t, 'tower_status', i) for i, t in enumerate(_TOWERS)] +
+          [schema.bit(b, 'barracks_status', i) for i, b in enumerate(_BARRACKS)])
+    )
+
+@schema.generated
 class PickBan(AbstractParse):
     """Reprents a pick/ban during a game
 
@@ -292,12 +509,14 @@ class PickBan(AbstractParse):
     order : int
         Order in which the hero was picked/banned
     """
-    def parse(self):
-        self['hero'] = entities.Hero(self.pop('hero_id', None))
-        self['side'] = 'dire' if self.pop('team', 0) == 0 else 'radiant'
-
-
-
+    _schema = schema.Schema(
+        schema.value('is_pick'),
+        schema.entity('hero', entities.Hero, 'hero_id'),
+        schema.convert('side', lambda team: 'dire' if team == 0 else 'radiant', 'team', 0),
+        schema.value('order')
+    )
+
+@schema.generated
 class MatchDetails(AbstractResponse):
     """:any:`get_match_details` response object
 
@@ -350,6 +569,38 @@ class MatchDetails(AbstractResponse):
     flags : ?
         TODO
     """
+    _schema = schema.Schema(
+        # built from the raw players, before they are parsed
+        schema.derived('players_minimal', _minimal_players, ('players',), [], cls = PlayerMinimal, many = True, keys = _PLAYER_MINIMAL_KEYS),
+        schema.nested_list('players', PlayerUnit, 'players'),
+        schema.nested_list('picks_bans', PickBan, 'picks_bans', sort_key = lambda pb: pb['order']),
+        schema.value('season'),
+        schema.derived('winner', lambda radiant_win: 'radiant' if radiant_win else 'dire', ('radiant_win',), optional = True),
+        schema.value('duration'),
+        schema.value('pre_game_duration'),
+        schema.value('start_time'),
+        schema.value('match_id'),
+        schema.value('match_seq_num'),
+        schema.derived('radiant_buildings', _buildings, _BUILDING_STATUS[0][1:3], cls = Buildings, keys = _BUILDINGS_KEYS),
+        schema.derived('dire_buildings', _buildings, _BUILDING_STATUS[1][1:3], cls = Buildings, keys = _BUILDINGS_KEYS),
+        schema.value('cluster'),
+        schema.value('first_blood_time'),
+        schema.value('lobby_type'),
+        schema.value('human_players'),
+        schema.value('leagueid'),
+        schema.value('positive_votes'),
+        schema.value('negative_votes'),
+        schema.value('game_mode'),
+        schema.value('engine'),
+        schema.value('radiant_score'),
+        schema.value('dire_score'),
+        schema.value('flags'),
+        envelope = 'result',
+        context = ('start_time',),
+        patch = 'start_time',
+        drop = ('radiant_win',) + tuple(k for status in _BUILDING_STATUS for k in status[1:3])
+    )
+
     def leavers(self):
         """
         Returns
@@ -371,26 +622,7 @@ class MatchDetails(AbstractResponse):
             has_leaver |= p.get('leaver_status', 0) != 0
         return has_leaver
 
-    def parse_response(self):
-        self.assign_subkey('result')
-
-        minimal = lambda x: PlayerMinimal(_get_subdict(x, ['account_id', 'player_slot', 'hero_id']))
-
-        self['players_minimal'] = [minimal(p) for p in self.get('players', [])]
-        self['players'] = [PlayerUnit(pl) for pl in self.get('players', [])]
-
-        if 'radiant_win' in self:
-            self['winner'] = 'radiant' if self.pop('radiant_win', None) else 'dire'
-
-        picks_bans = [PickBan(pb) for pb in self.get('picks_bans', [])]
-        self['picks_bans'] = sorted(picks_bans, key = lambda x: x['order'])
-
-
-        for side in ['radiant', 'dire']:
-            tower_status = self.pop('tower_status_{}'.format(side), None)
-            barracks_status = self.pop('barracks_status_{}'.format(side), None)
-            self['{}_buildings'.format(side)] = Buildings({'tower_status': tower_status, 'barracks_status': barracks_status})
-
+@schema.generated
 class LocalizedHero(AbstractParse):
     """Localized hero information
 
@@ -403,8 +635,13 @@ class LocalizedHero(AbstractParse):
     localized_name : str
         Name of hero in language specified
     """
-    pass
+    _schema = schema.Schema(
+        schema.value('name'),
+        schema.value('id'),
+        schema.value('localized_name')
+    )
 
+@schema.generated
 class LocalizedGameItem(AbstractParse):
     """Localized item information
 
@@ -425,8 +662,17 @@ class LocalizedGameItem(AbstractParse):
     localized_name : str
         Name of item in language specified
     """
-    pass
-
+    _schema = schema.Schema(
+        schema.value('id'),
+        schema.value('name'),
+        schema.value('cost'),
+        schema.value('secret_shop'),
+        schema.value('side_shop'),
+        schema.value('recipe'),
+        schema.value('localized_name')
+    )
+
+@schema.generated
 class Heroes(AbstractResponse):
     """:any:`get_heroes` response object
 
@@ -437,10 +683,13 @@ class Heroes(AbstractResponse):
     count : int
         Number of heroes returned
     """
-    def parse_response(self):
-        self.assign_subkey('result')
-        self['heroes'] = [LocalizedHero(h) for h in self.get('heroes', [])]
+    _schema = schema.Schema(
+        schema.nested_list('heroes', LocalizedHero, 'heroes'),
+        schema.value('count'),
+        envelope = 'result'
+    )
 
+@schema.generated
 class GameItems(AbstractResponse):
     """:any:`get_game_items` response object
 
@@ -449,10 +698,12 @@ class GameItems(AbstractResponse):
     game_items : list(LocalizedGameItems)
         List of localized item information
     """
-    def parse_response(self):
-        self.assign_subkey('result')
-        self['game_items'] = [LocalizedGameItem(i) for i in self.pop('items', [])]
+    _schema = schema.Schema(
+        schema.nested_list('game_items', LocalizedGameItem, 'items'),
+        envelope = 'result'
+    )
 
+@schema.generated
 class TournamentPrizePool(AbstractResponse):
     """:any:`get_tournament_prize_pool` response object
 
@@ -463,9 +714,14 @@ class TournamentPrizePool(AbstractResponse):
     league_id : int
         League ID for which prize pool was fetched
     """
-    pass
+    _schema = schema.Schema(
+        schema.value('prize_pool'),
+        schema.value('league_id'),
+        envelope = 'result'
+    )
 
 # TODO: add enumeration for state of ultimate
+@schema.generated
 class PlayerLive(AbstractParse):
     """Information of a player in live game
 
@@ -512,16 +768,30 @@ class PlayerLive(AbstractParse):
     net_worth : int
         Net worth of the hero
     """
-    def parse(self):
-        self['hero'] = entities.Hero(self.pop('hero_id', None))
-        self['steam_account'] = entities.SteamAccount(self.pop('account_id', None))
-
-        self['deaths'] = self.pop('death', 0)
-
-        self['inventory'] = [entities.Item(self.pop('item{}'.format(i), None)) for i in range(6)]
-
-        self['abilities'] = [AbilityInfo(au) for au in self.get('abilities', [])]
-
+    _schema = schema.Schema(
+        schema.value('player_slot'),
+        schema.entity('hero', entities.Hero, 'hero_id'),
+        schema.entity('steam_account', entities.SteamAccount, 'account_id'),
+        schema.value('kills'),
+        schema.value('deaths', 'death', 0),
+        schema.value('assists'),
+        schema.value('last_hits'),
+        schema.value('denies'),
+        schema.value('gold'),
+        schema.value('level'),
+        schema.value('gold_per_min'),
+        schema.value('xp_per_min'),
+        schema.entity_list('inventory', entities.Item, _LIVE_INVENTORY_SLOTS),
+        schema.nested_list('abilities', AbilityInfo, 'abilities'),
+        schema.value('ultimate_state'),
+        schema.value('ultimate_cooldown'),
+        schema.value('respawn_timer'),
+        schema.value('position_x'),
+        schema.value('position_y'),
+        schema.value('net_worth')
+    )
+
+@schema.generated
 class TeamLive(AbstractParse):
     """Information of a team in live game
 
@@ -538,26 +808,20 @@ class TeamLive(AbstractParse):
     players : list(PlayerLive)
         List of player summaries
     """
-    def parse(self):
-
-        tower_status = self.get('tower_state')
-        barracks_status = self.get('barracks_state')
-        self['buildings'] = Buildings({'tower_status': tower_status, 'barracks_status': barracks_status})
-
-        self['picks'] = [entities.Hero(h['hero_id']) for h in self.get('picks', [])]
-        self['bans'] = [entities.Hero(h['hero_id']) for h in self.get('bans', [])]
-
-        players = self.get('players', [])
+    _schema = schema.Schema(
+        schema.value('score'),
+        schema.derived('buildings', _buildings, ('tower_state', 'barracks_state'), cls = Buildings, keys = _BUILDINGS_KEYS),
+        schema.entity_each('picks', entities.Hero, 'picks', 'hero_id'),
+        schema.entity_each('bans', entities.Hero, 'bans', 'hero_id'),
         # because the WebAPI is stupid
         # Steam WebAPI returns multiple entries with the same name which I can only assume correspond to each player
         # util.decode_json describes the modified parser (to handle repeated names)
-        for i, player in enumerate(players):
-            player['abilities'] = self.pop('abilities_{}'.format(i), [])
-
-        self.pop("abilities", None)
-
-        self['players'] = [PlayerLive(p) for p in players]
+        schema.nested_list('players', PlayerLive, 'players', inputs = ('players', 'abilities') + _PLAYER_ABILITIES,
+                           spread = ('abilities', _PLAYER_ABILITIES)),
+        drop = ('abilities',)
+    )
 
+@schema.generated
 class Scoreboard(AbstractParse):
     """Scoreboard of live game
 
@@ -572,10 +836,14 @@ class Scoreboard(AbstractParse):
     dire : TeamLive
         Dire team summary
     """
-    def parse(self):
-        self['radiant'] = TeamLive(self.get('radiant', {}))
-        self['dire'] = TeamLive(self.get('dire', {}))
-
+    _schema = schema.Schema(
+        schema.value('duration'),
+        schema.value('roshan_respawn_timer'),
+        schema.nested('radiant', TeamLive, 'radiant'),
+        schema.nested('dire', TeamLive, 'dire')
+    )
+
+@schema.generated
 class TeamInfo(AbstractParse):
     """Information about team
 
@@ -590,9 +858,15 @@ class TeamInfo(AbstractParse):
     complete : bool
         Whether the players for this team are all team members.
     """
-    pass
+    _schema = schema.Schema(
+        schema.value('team_name'),
+        schema.value('team_id'),
+        schema.value('team_logo'),
+        schema.value('complete')
+    )
 
 # TODO: enumerate series type
+@schema.generated
 class Game(AbstractParse):
     """Summary of a live league game
 
@@ -625,12 +899,23 @@ class Game(AbstractParse):
     series_type : int
         Type of series
     """
-    def parse(self):
-        self['radiant_team'] = TeamInfo(self.get('radiant_team', {}))
-        self['dire_team'] = TeamInfo(self.get('dire_team', {}))
-        self['scoreboard'] = Scoreboard(self.get('scoreboard', {}))
-        self['players'] = [PlayerMinimal(p) for p in self.get('players', [])]
-
+    _schema = schema.Schema(
+        schema.nested('radiant_team', TeamInfo, 'radiant_team'),
+        schema.nested('dire_team', TeamInfo, 'dire_team'),
+        schema.nested('scoreboard', Scoreboard, 'scoreboard'),
+        schema.nested_list('players', PlayerMinimal, 'players'),
+        schema.value('lobby_id'),
+        schema.value('match_id'),
+        schema.value('spectators'),
+        schema.value('league_id'),
+        schema.value('league_node_id'),
+        schema.value('stream_delay_s'),
+        schema.value('radiant_series_wins'),
+        schema.value('dire_series_wins'),
+        schema.value('series_type')
+    )
+
+@schema.generated
 class LiveLeagueGames(AbstractResponse):
     """:any:`get_live_league_games` response object
 
@@ -639,12 +924,14 @@ class LiveLeagueGames(AbstractResponse):
     games : list(Game)
         List of games
     """
-    def parse_response(self):
-        self.assign_subkey('result')
-        self['games'] = [Game(g) for g in self['games']]
+    _schema = schema.Schema(
+        schema.nested_list('games', Game, 'games'),
+        envelope = 'result'
+    )
 
 # TODO: add lobby type enumeration
 # TODO: add game mode enumeration
+@schema.generated
 class LiveGameSummary(AbstractParse):
     """Summary of a live game
 
@@ -697,24 +984,37 @@ class LiveGameSummary(AbstractParse):
     dire_score : int
         TODO
     """
-    def parse(self):
-        tower_states = self.pop('building_state', 0)
-        dire_tower_state = tower_states // 2**11
-        radiant_tower_state = tower_states % 2**11
-
-
-        self['radiant_towers'] = Buildings({'tower_status': radiant_tower_state})
-        self['dire_towers'] = Buildings({'tower_status': dire_tower_state})
-        self['players'] = [PlayerMinimal(p) for p in self.get('players', [])]
-
-        radiant_team_name = self.pop('team_name_radiant', None)
-        dire_team_name = self.pop('team_name_dire', None)
-        radiant_team_id = self.pop('team_id_radiant', None)
-        dire_team_id = self.pop('team_id_dire', None)
-
-        self['radiant_team'] = TeamInfo({'team_name': radiant_team_name, 'team_id': radiant_team_id})
-        self['dire_team'] = TeamInfo({'dire_name': dire_team_name, 'dire_id': dire_team_id})
-
+    _schema = schema.Schema(
+        schema.nested_list('players', PlayerMinimal, 'players'),
+        # towers of both sides are packed in 11 bits each
+        schema.derived('radiant_towers', lambda state: Buildings({'tower_status': state % 2**11}), ('building_state',), 0, cls = Buildings,
+                       keys = ('tower_status',)),
+        schema.derived('dire_towers', lambda state: Buildings({'tower_status': state // 2**11}), ('building_state',), 0, cls = Buildings,
+                       keys = ('tower_status',)),
+        schema.value('activate_time'),
+        schema.value('deactivate_time'),
+        schema.value('server_steam_id'),
+        schema.value('lobby_id'),
+        schema.value('league_id'),
+        schema.value('lobby_type'),
+        schema.value('game_time'),
+        schema.value('delay'),
+        schema.value('spectators'),
+        schema.value('game_mode'),
+        schema.value('average_mmr'),
+        schema.value('match_id'),
+        schema.value('series_id'),
+        schema.derived('radiant_team', _team_info, ('team_name_radiant', 'team_id_radiant'), cls = TeamInfo, keys = _TEAM_INFO_KEYS),
+        schema.derived('dire_team', _team_info, ('team_name_dire', 'team_id_dire'), cls = TeamInfo, keys = _TEAM_INFO_KEYS),
+        schema.value('sort_score'),
+        schema.value('last_update_time'),
+        schema.value('radiant_lead'),
+        schema.value('radiant_score'),
+        schema.value('dire_score'),
+        drop = ('building_state', 'team_name_radiant', 'team_id_radiant', 'team_name_dire', 'team_id_dire')
+    )
+
+@schema.generated
 class TopLiveGame(AbstractResponse):
     """:any:`get_top_live_game` response object
 
@@ -723,9 +1023,9 @@ class TopLiveGame(AbstractResponse):
     game_list : list(LiveGameSummary)
         List of top live games
     """
-    def parse_response(self):
-        self['game_list'] = [LiveGameSummary(g) for g in self.get('game_list', [])]
+    _schema = schema.Schema(schema.nested_list('game_list', LiveGameSummary, 'game_list'))
 
+@schema.generated
 class TeamInfoByTeamID(AbstractResponse):
     """:any:`get_team_info_by_team_id` response object
 
@@ -734,10 +1034,12 @@ class TeamInfoByTeamID(AbstractResponse):
     teams : list(TeamInfo)
         List of team information
     """
-    def parse_response(self):
-        self.assign_subkey('result')
-        self['teams'] = [TeamInfo(t) for t in self.get('teams', [])]
+    _schema = schema.Schema(
+        schema.nested_list('teams', TeamInfo, 'teams'),
+        envelope = 'result'
+    )
 
+@schema.generated
 class BroadcasterInfo(AbstractResponse):
     """:any:`get_broadcaster_info` response object
 
@@ -752,9 +1054,14 @@ class BroadcasterInfo(AbstractResponse):
     allow_live_video : bool
         ``True`` if the user has allowed live video
     """
-    def parse_response(self):
-        self['steam_account'] = entities.SteamAccount(self.pop('account_id', None))
-
+    _schema = schema.Schema(
+        schema.entity('steam_account', entities.SteamAccount, 'account_id'),
+        schema.value('server_steam_id'),
+        schema.value('live'),
+        schema.value('allow_live_video')
+    )
+
+@schema.generated
 class SteamDetails(AbstractParse):
     """Information about a player as on Steam.
 
@@ -766,7 +1073,7 @@ class SteamDetails(AbstractParse):
         A string representing the access setting of the profile
     profilestate : int
         Set to ``1`` if the user has configured their profile
-    personname : str
+    personaname : str
         Display name
     lastlogoff : int
         Unix timestamp of when the player was last online
@@ -801,30 +1108,16 @@ class SteamDetails(AbstractParse):
     gameserverip : str
         The server URL given as an IP address and port number
     """
-    def parse(self):
-        self['steam_account'] = entities.SteamAccount(self.get('steamid'))
-
-        comm_descr = {
-            1: 'private',
-            2: 'friends_only',
-            3: 'friends_of_friends',
-            4: 'users_only',
-            5: 'public'
-        }
-
-        self['communityvisibility'] = comm_descr[self.pop('communityvisibilitystate', 1)]
-
-        persona_descr = {
-            0: 'offline',
-            1: 'online',
-            2: 'busy',
-            3: 'away',
-            4: 'snooze',
-            5: 'looking_to_trade',
-            6: 'looking_to_play'
-        }
-        self['personastate'] = persona_descr[self.pop('personastate', 0)]
-
+    _schema = schema.Schema(
+        schema.derived('steam_account', entities.SteamAccount, ('steamid',)),
+        schema.convert('communityvisibility', _COMMUNITY_VISIBILITY.__getitem__, 'communityvisibilitystate', 1),
+        schema.convert('personastate', _PERSONA_STATE.__getitem__, 'personastate', 0),
+        *(schema.value(k) for k in ('profilestate', 'personaname', 'lastlogoff', 'profileurl', 'avatar', 'avatarmedium',
+          'avatarfull', 'commentpermission', 'realname', 'primaryclanid', 'timecreated', 'loccountrycode', 'locstatecode',
+          'loccityid', 'gameid', 'gameextrainfo', 'gameserverip'))
+    )
+
+@schema.generated
 class PlayerSummaries(AbstractResponse):
     """:any:`get_player_summaries` response object
 
@@ -833,7 +1126,8 @@ class PlayerSummaries(AbstractResponse):
     players : list(SteamDetails)
         List of steam information in ascending order of account ids
     """
-    def parse_response(self):
-        self.assign_subkey('response')
-        # For some reason, the WebAPI doesn't maintain relative ordering. Sorted to make the response consistent.
-        self['players'] = sorted([SteamDetails(p) for p in self.get('players', [])], key = lambda x: x['steam_account']['id64'])
\ No newline at end of file
+    # For some reason, the WebAPI doesn't maintain relative ordering. Sorted to make the response consistent.
+    _schema = schema.Schema(
+        schema.nested_list('players', SteamDetails, 'players', sort_key = lambda p: p['steam_account']['id64']),
+        envelope = 'response'
+    )
\ No newline at end of file
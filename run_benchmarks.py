@@ -0,0 +1,21 @@
+"""Run offline parser benchmarks and optionally compare against a previous report.
+
+Usage::
+
+    python run_benchmarks.py [--output results.json] [--baseline old.json] [--iterations 200]
+
+Same as ``d2api bench``, using the recorded live game of the test fixtures by default.
+"""
+import os
+import sys
+
+from d2api.src import cli
+
+def path_to_fixture(x = ''):
+    return os.path.abspath(os.path.join(os.path.dirname(__file__), 'tests', 'ref', x))
+
+if __name__ == '__main__':
+    argv = sys.argv[1:]
+    if not any(a == '--live-game' or a.startswith('--live-game=') for a in argv):
+        argv = ['--live-game', path_to_fixture('livegame.json')] + argv
+    cli.main(['bench'] + argv)
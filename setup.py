@@ -34,16 +34,18 @@ setup(
     packages = ['d2api', 'd2api.src', 'd2api.ref'],
     package_data = {'d2api.ref': ['abilities.json',
                                    'heroes.json',
+                                   'history.json',
                                    'items.json',
                                    'meta.json']},
+    python_requires = '>=3.5',
     install_requires = ['requests'],
+    entry_points = {'console_scripts': ['d2api = d2api.src.cli:main']},
     classifiers=[
         "Intended Audience :: Developers",
         "Topic :: Software Development :: Libraries :: Python Modules",
         "Development Status :: 5 - Production/Stable",
         "License :: OSI Approved :: GNU General Public License (GPL)",
         "Programming Language :: Python",
-        "Programming Language :: Python :: 3.4",
         "Programming Language :: Python :: 3.5",
         "Programming Language :: Python :: 3.6",
         "Programming Language :: Python :: 3.7"
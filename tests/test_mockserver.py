@@ -0,0 +1,563 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+import asyncio
+import json
+import os
+import shutil
+import sqlite3
+import tempfile
+import threading
+import time
+import unittest
+from unittest import mock
+
+import d2api
+from d2api.src import breaker
+from d2api.src import caching
+from d2api.src import cli
+from d2api.src import entities
+from d2api.src import errors as d2errors
+from d2api.src import filters
+from d2api.src import metrics
+from d2api.src import ratelimit
+from d2api.src import wrappers
+from d2api.src.leagues import LeagueTracker
+from d2api.src.mockserver import MockServer
+from d2api.src.pipeline import ParsePipeline
+from d2api.src.profiles import PlayerProfileBuilder
+
+# These tests run against a local mock server, and do not require network access or an API key.
+
+class MockServerTests(unittest.TestCase):
+    @classmethod
+    def setUpClass(cls):
+        cls.server = MockServer(api_key = 'mock').start()
+        cls.api = d2api.APIWrapper(api_key = 'mock', base_url = cls.server.url, requests_per_second = -1)
+
+    @classmethod
+    def tearDownClass(cls):
+        cls.server.stop()
+
+    def test_endpoint_dtypes(self):
+        calls = [
+            (self.api.get_match_history, {}, wrappers.MatchHistory),
+            (self.api.get_match_history_by_sequence_num, {'start_at_match_seq_num': 1, 'matches_requested': 2}, wrappers.MatchHistory),
+            (self.api.get_match_details, {'match_id': 4176987886}, wrappers.MatchDetails),
+            (self.api.get_heroes, {'language': 'en_us'}, wrappers.Heroes),
+            (self.api.get_game_items, {'language': 'en_us'}, wrappers.GameItems),
+            (self.api.get_tournament_prize_pool, {'leagueid': 1}, wrappers.TournamentPrizePool),
+            (self.api.get_top_live_game, {}, wrappers.TopLiveGame),
+            (self.api.get_team_info_by_team_id, {'start_at_team_id': 46}, wrappers.TeamInfoByTeamID),
+            (self.api.get_live_league_games, {}, wrappers.LiveLeagueGames),
+            (self.api.get_broadcaster_info, {'account_id': 40}, wrappers.BroadcasterInfo),
+            (self.api.get_player_summaries, {'account_ids': [1, 2]}, wrappers.PlayerSummaries)
+        ]
+        for func, kwargs, cls in calls:
+            self.assertIsInstance(func(**kwargs), cls, '{0}() should return a {1} object'.format(func.__name__, cls.__name__))
+
+    def test_deterministic_payloads(self):
+        res1 = self.api.get_match_details(1234)
+        res2 = self.api.get_match_details(1234)
+        self.assertEqual(res1, res2, 'Mock server should serve deterministic payloads')
+
+    def test_account_filter(self):
+        steam_account = entities.SteamAccount(76561198088874284)
+        res = self.api.get_match_history(steam_account = steam_account, matches_requested = 3)
+        for match in res['matches']:
+            self.assertIn(steam_account, [p['steam_account'] for p in match['players']],
+            'Every match should contain the filtered account')
+
+    def test_field_projection(self):
+        full = self.api.get_match_details(1234)
+        res = self.api.get_match_details(1234, fields = ['match_id', 'winner', 'players[].hero'])
+        self.assertIsInstance(res, wrappers.MatchDetails)
+        self.assertEqual(sorted(res), ['match_id', 'players', 'winner'], 'Only selected attributes should be built')
+        self.assertEqual([dict(p) for p in res['players']], [{'hero': p['hero']} for p in full['players']])
+
+        pages = self.api.iter_match_history(max_pages = 2, fields = ['matches[].match_id'])
+        self.assertEqual(len([m for p in pages for m in p['matches']]), 200, 'Projected pages should still be followed')
+
+    def test_errors(self):
+        with self.assertRaises(d2errors.APIAuthenticationError):
+            d2api.APIWrapper(api_key = 'wrong', base_url = self.server.url, requests_per_second = -1).get_heroes()
+        with self.assertRaises(d2errors.APIInsufficientArguments):
+            self.api.get_match_details(match_id = None)
+        with self.assertRaises(d2errors.APIMethodUnavailable):
+            self.api._api_call(d2api.endpoints.ROOT_URL + '/IDOTA2Match_570/RANDOMMETHOD/v0001/')
+
+class MockServerThrottlingTests(unittest.TestCase):
+    def test_rate_limit(self):
+        with MockServer(requests_per_second = 0.1) as server:
+            api = d2api.APIWrapper(api_key = 'mock', base_url = server.url, requests_per_second = -1)
+            api.get_heroes()
+            with self.assertRaises(d2errors.APIRateLimitError, msg = 'Requests beyond the rate limit should be throttled'):
+                api.get_heroes()
+
+    def test_error_injection(self):
+        with MockServer(error_rates = {503: 1}) as server:
+            api = d2api.APIWrapper(api_key = 'mock', base_url = server.url, requests_per_second = -1)
+            with self.assertRaises(d2errors.APITimeoutError):
+                api.get_heroes()
+
+        with MockServer(error_rates = {500: 1}) as server:
+            api = d2api.APIWrapper(api_key = 'mock', base_url = server.url, requests_per_second = -1)
+            with self.assertRaises(d2errors.BaseError, msg = 'Any HTTP error status should be answered'):
+                api.get_heroes()
+
+class InstrumentationTests(unittest.TestCase):
+    def test_hooks_and_metrics(self):
+        with MockServer(error_rates = {429: 0.5}, seed = 1) as server:
+            api = d2api.APIWrapper(api_key = 'mock', base_url = server.url, requests_per_second = -1)
+            collector = metrics.MetricsCollector().attach(api)
+            events = []
+            for event in ('before_request', 'after_response', 'after_decode', 'after_parse', 'on_error'):
+                api.add_hook(event, lambda info, event = event: events.append((event, info['endpoint'])))
+
+            failures = 0
+            for _ in range(10):
+                try:
+                    api.get_match_details(1234)
+                except d2errors.APIRateLimitError:
+                    failures += 1
+
+        self.assertEqual(events.count(('on_error', 'GetMatchDetails')), failures, 'Every failure should run on_error hooks')
+        self.assertEqual(events.count(('after_parse', 'GetMatchDetails')), 10 - failures, 'Every parsed response should run after_parse hooks')
+        self.assertEqual(collector.throttled('GetMatchDetails'), failures, 'Throttled responses should be counted')
+
+        exported = collector.to_prometheus()
+        self.assertIn('d2api_requests_total{endpoint="GetMatchDetails",status="200"} ' + str(10 - failures), exported)
+        self.assertIn('d2api_request_duration_seconds_count{endpoint="GetMatchDetails",phase="parse"}', exported)
+
+    def test_parse_profiler(self):
+        with MockServer() as server:
+            api = d2api.APIWrapper(api_key = 'mock', base_url = server.url, requests_per_second = -1)
+            profiler = api.enable_profiling(sample_rate = 1)
+            api.get_match_details(1234)
+            api.disable_profiling()
+            api.get_match_details(1234)
+
+        report = profiler.report()
+        self.assertEqual(report['responses'], {'GetMatchDetails': 1}, 'Only responses parsed while profiling should be sampled')
+        self.assertEqual(report['parsers']['PlayerUnit.parse']['calls'], 10, 'Nested parsers should be profiled')
+        self.assertTrue(report['parsers']['MatchDetails.parse_response']['total'] >= report['parsers']['PlayerUnit.parse']['total'],
+        'Inclusive parse time should include nested parsers')
+
+class ConditionalRequestTests(unittest.TestCase):
+    def test_unchanged_body_skipped(self):
+        with MockServer(live_update_interval = 3600) as server:
+            api = d2api.APIWrapper(api_key = 'mock', base_url = server.url, requests_per_second = -1, conditional_requests = True)
+            res1 = api.get_live_league_games()
+            res2 = api.get_live_league_games()
+            self.assertIs(res1, res2, 'An unchanged response should return the previously parsed object')
+
+            res3 = api.get_match_details(1234)
+            res4 = api.get_match_details(1234)
+            self.assertIsNot(res3, res4, 'Only live endpoints should be cached by default')
+
+    def test_etag_not_modified(self):
+        with MockServer(live_update_interval = 3600, etags = True) as server:
+            api = d2api.APIWrapper(api_key = 'mock', base_url = server.url, requests_per_second = -1,
+                                   conditional_requests = True, return_not_modified = True)
+            self.assertIsInstance(api.get_top_live_game(), wrappers.TopLiveGame)
+            self.assertIs(api.get_top_live_game(), d2api.NOT_MODIFIED, 'An unchanged response should return NOT_MODIFIED')
+            self.assertEqual(server.statuses.get(304), 1, 'The second request should be answered with HTTP 304')
+
+class PipelineTests(unittest.TestCase):
+    def test_process_pool_parsing(self):
+        match_ids = list(range(1000, 1020))
+        with MockServer() as server:
+            api = d2api.APIWrapper(api_key = 'mock', base_url = server.url, requests_per_second = -1)
+            pipeline = ParsePipeline(api, fetch_workers = 4, parse_workers = 2, max_pending = 4)
+            calls = [('get_match_details', {'match_id': m}) for m in match_ids] + [('get_match_details', {'match_id': None})]
+            results = list(pipeline.run(calls))
+
+        parsed = sorted(res['match_id'] for call, res, err in results if err is None)
+        errors = [err for call, res, err in results if err is not None]
+        self.assertEqual(parsed, match_ids, 'Every successful call should be parsed exactly once')
+        self.assertEqual(len(errors), 1, 'Failed calls should be reported')
+        self.assertIsInstance(errors[0], d2errors.APIInsufficientArguments)
+
+    def test_failing_input(self):
+        def calls():
+            yield ('get_match_details', {'match_id': 1000})
+            raise ValueError('unreadable input')
+
+        with MockServer() as server:
+            api = d2api.APIWrapper(api_key = 'mock', base_url = server.url, requests_per_second = -1)
+            results = []
+            with self.assertRaises(ValueError, msg = 'Errors reading the calls should be raised'):
+                for result in ParsePipeline(api, parse_workers = 0).run(calls()):
+                    results.append(result)
+        self.assertEqual([res['match_id'] for call, res, err in results], [1000])
+
+    def test_wrapper_settings(self):
+        with MockServer() as server:
+            api = d2api.APIWrapper(api_key = 'mock', base_url = server.url, requests_per_second = -1, keep_raw_json = False)
+            (call, res, err), = ParsePipeline(api, parse_workers = 1).run([('get_match_details', {'match_id': 1000})])
+            self.assertIsNone(res.raw_json, 'Raw bodies should not be kept without keep_raw_json')
+
+            api = d2api.APIWrapper(api_key = 'mock', base_url = server.url, requests_per_second = -1, parse_response = False)
+            (call, res, err), = ParsePipeline(api, parse_workers = 1).run([('get_match_details', {'match_id': 1000})])
+            self.assertEqual(res, api.get_match_details(match_id = 1000))
+
+    def test_process_pool_projection(self):
+        with MockServer() as server:
+            api = d2api.APIWrapper(api_key = 'mock', base_url = server.url, requests_per_second = -1)
+            pipeline = ParsePipeline(api, fetch_workers = 2, parse_workers = 2)
+            calls = [('get_match_details', {'match_id': m, 'fields': ['match_id', 'players[].hero']}) for m in range(1000, 1005)]
+            results = list(pipeline.run(calls))
+
+        self.assertEqual([err for call, res, err in results], [None] * 5)
+        for call, res, err in results:
+            self.assertEqual(sorted(res), ['match_id', 'players'], 'Projected classes should parse in worker processes')
+            self.assertEqual(list(res['players'][0]), ['hero'])
+
+    def test_process_pool_filter(self):
+        with MockServer() as server:
+            api = d2api.APIWrapper(api_key = 'mock', base_url = server.url, requests_per_second = -1)
+            pipeline = ParsePipeline(api, fetch_workers = 2, parse_workers = 2)
+            where = filters.all_of(filters.lobby_type(7), filters.no_leavers)
+            calls = [('get_match_history', {'matches_requested': 20, 'where': where})]
+            (call, res, err), = pipeline.run(calls)
+            expected = api.get_match_history(matches_requested = 20, where = where)
+
+        self.assertIsNone(err)
+        self.assertEqual([m['match_id'] for m in res['matches']], [m['match_id'] for m in expected['matches']])
+
+class DeadlineTests(unittest.TestCase):
+    def test_slow_response(self):
+        with MockServer(latency = 0.5) as server:
+            api = d2api.APIWrapper(api_key = 'mock', base_url = server.url, requests_per_second = -1)
+            start = time.monotonic()
+            with self.assertRaises(d2errors.APIDeadlineExceeded):
+                api.get_heroes(timeout = 0.1)
+            self.assertLess(time.monotonic() - start, 0.4, 'Calls should not outlive their deadline')
+
+    def test_unparsed_with_deadline(self):
+        with MockServer() as server:
+            api = d2api.APIWrapper(api_key = 'mock', base_url = server.url, requests_per_second = -1, parse_response = False)
+            text = api.get_match_details(match_id = 1, timeout = 5)
+            self.assertEqual(json.loads(text), json.loads(api.get_match_details(match_id = 1)))
+            self.assertEqual(api.get_heroes(cancel = ratelimit.CancelToken()), api.get_heroes())
+
+    def test_rate_limit_fail_fast(self):
+        with MockServer() as server:
+            api = d2api.APIWrapper(api_key = 'mock', base_url = server.url, requests_per_second = 0.5)
+            api.get_heroes(timeout = 1)
+            start = time.monotonic()
+            with self.assertRaises(d2errors.APIDeadlineExceeded):
+                api.get_heroes(timeout = 1)
+            self.assertLess(time.monotonic() - start, 0.1, 'Calls that cannot get a slot in time should fail immediately')
+
+            token = ratelimit.CancelToken()
+            threading.Timer(0.2, token.cancel).start()
+            with self.assertRaises(d2errors.APICancelled):
+                api.get_heroes(cancel = token)
+            self.assertLess(time.monotonic() - start, 1, 'Cancelling should stop waiting for the rate limit')
+
+    def test_async_cancel(self):
+        from d2api.src import aio
+        with MockServer() as server:
+            api = d2api.APIWrapper(api_key = 'mock', base_url = server.url, requests_per_second = 0.2)
+
+            async def run():
+                heroes = await aio.call(api, 'get_heroes', language = 'en_us')
+                task = asyncio.ensure_future(aio.call(api, 'get_heroes'))
+                await asyncio.sleep(0.1)
+                task.cancel()
+                with self.assertRaises(asyncio.CancelledError):
+                    await task
+                return heroes
+
+            loop = asyncio.new_event_loop()
+            start = time.monotonic()
+            try:
+                self.assertIsInstance(loop.run_until_complete(run()), wrappers.Heroes)
+            finally:
+                loop.close()
+            self.assertLess(time.monotonic() - start, 2, 'Cancelled tasks should stop their call')
+
+class CircuitBreakerTests(unittest.TestCase):
+    def test_failing_endpoint(self):
+        with MockServer(error_rates = {503: 1}) as server:
+            circuits = breaker.CircuitBreaker(failures = 3, window = 60, cooldown = 0.3)
+            api = d2api.APIWrapper(api_key = 'mock', base_url = server.url, requests_per_second = 5, circuit_breaker = circuits)
+            for _ in range(3):
+                with self.assertRaises(d2errors.APITimeoutError):
+                    api.get_heroes()
+            self.assertEqual(circuits.state('GetHeroes'), breaker.OPEN)
+
+            start = time.monotonic()
+            with self.assertRaises(d2errors.APICircuitOpen):
+                api.get_heroes()
+            self.assertLess(time.monotonic() - start, 0.05, 'Open circuits should fail without waiting for the rate limit')
+
+            # a failed probe opens the circuit again, a successful one closes it
+            time.sleep(0.3)
+            with self.assertRaises(d2errors.APITimeoutError):
+                api.get_heroes()
+            self.assertEqual(circuits.state('GetHeroes'), breaker.OPEN)
+            time.sleep(0.3)
+            server.error_rates = {}
+            api.get_heroes()
+            self.assertEqual(circuits.state('GetHeroes'), breaker.CLOSED)
+
+            stats = api.circuit_stats()['GetHeroes']
+            self.assertEqual((stats['opened'], stats['rejected']), (2, 1))
+
+    def test_client_errors_ignored(self):
+        with MockServer() as server:
+            api = d2api.APIWrapper(api_key = 'mock', base_url = server.url, requests_per_second = -1, circuit_breaker = True)
+            for _ in range(10):
+                with self.assertRaises(d2errors.APIInsufficientArguments):
+                    api.get_match_details(match_id = None)
+            self.assertEqual(api.circuit_stats()['GetMatchDetails']['state'], breaker.CLOSED)
+
+class CatalogCacheTests(unittest.TestCase):
+    def test_refresh_ahead(self):
+        with MockServer() as server:
+            catalogs = caching.CatalogCache(ttl = 0.5, refresh_ahead = 0.5)
+            api = d2api.APIWrapper(api_key = 'mock', base_url = server.url, requests_per_second = -1, catalog_cache = catalogs)
+            calls = []
+            api.add_hook('after_parse', calls.append)
+
+            heroes = api.get_heroes(language = 'en_us')
+            self.assertIs(api.get_heroes(language = 'en_us'), heroes, 'Catalogs should be served from memory')
+            self.assertIsNot(api.get_heroes(language = 'de_de'), heroes, 'Languages should be cached separately')
+            hero = heroes['heroes'][0]
+            self.assertIs(api.hero_catalog(language = 'en_us')[hero['id']], hero)
+            self.assertEqual(len(calls), 2)
+
+            time.sleep(0.3)
+            self.assertIs(api.get_heroes(language = 'en_us'), heroes, 'Stale catalogs should be served while refreshing')
+            time.sleep(0.1)
+            self.assertEqual(calls[-1]['lane'], 'background')
+            self.assertIsNot(api.get_heroes(language = 'en_us'), heroes)
+
+            items = api.item_catalog()
+            self.assertIs(api.item_catalog(), items)
+            self.assertEqual(catalogs.stats()['misses'], 3)
+            self.assertEqual(catalogs.stats()['refreshes'], 1)
+
+    def test_deferred_and_unparsed(self):
+        with MockServer() as server:
+            api = d2api.APIWrapper(api_key = 'mock', base_url = server.url, requests_per_second = -1, catalog_cache = True)
+            results = list(ParsePipeline(api, parse_workers = 0).run([('get_heroes', {}), ('hero_catalog', {}), ('item_catalog', {})]))
+            self.assertEqual([err for call, res, err in results], [None] * 3, 'Catalogs should be parsed within pipelines')
+            heroes = api.get_heroes()
+            self.assertIs(api.hero_catalog()[heroes['heroes'][0]['id']], heroes['heroes'][0])
+
+            api = d2api.APIWrapper(api_key = 'mock', base_url = server.url, requests_per_second = -1, parse_response = False)
+            self.assertIsInstance(api.get_heroes(), str)
+            self.assertEqual(sorted(api.hero_catalog()), sorted(h['id'] for h in json.loads(api.get_heroes())['result']['heroes']))
+            self.assertIsInstance(api.item_catalog(), dict)
+
+class PriorityLaneTests(unittest.TestCase):
+    def test_interactive_preempts_background(self):
+        with MockServer() as server:
+            api = d2api.APIWrapper(api_key = 'mock', base_url = server.url, requests_per_second = 10)
+            order = []
+            api.add_hook('before_request', lambda info: order.append(info['lane']))
+            api.get_heroes()
+
+            threads = [threading.Thread(target = api.get_heroes) for _ in range(5)]
+            for t in threads:
+                t.start()
+            time.sleep(0.05)
+            api.get_heroes(lane = 'interactive')
+            for t in threads:
+                t.join()
+
+            self.assertEqual(len(order), 7)
+            self.assertLessEqual(order.index('interactive'), 2, 'Interactive calls should not wait behind the background queue')
+            stats = api.lane_stats()
+            self.assertEqual(stats['background']['granted'], 6)
+            self.assertEqual(stats['interactive']['granted'], 1)
+            self.assertGreaterEqual(stats['background']['max_queued'], 4)
+            self.assertEqual(stats['background']['queued'], 0)
+
+            with self.assertRaises(ValueError):
+                api.get_heroes(lane = 'unknown')
+
+    def test_custom_lanes(self):
+        with MockServer() as server:
+            api = d2api.APIWrapper(api_key = 'mock', base_url = server.url, requests_per_second = -1, lanes = {'high': 3, 'low': 1})
+            api.get_heroes()
+            api.get_heroes(lane = 'high')
+            self.assertEqual(api.lane_stats()['low']['granted'], 1, 'Calls without a lane should use the lane of lowest weight')
+            self.assertEqual(ratelimit.RateLimiter(lanes = {'a': 1, 'b': 2}, default_lane = 'b').default_lane, 'b')
+            with self.assertRaises(ValueError):
+                ratelimit.RateLimiter(lanes = {'a': 1}, default_lane = 'b')
+
+    def test_no_catch_up_burst(self):
+        limiter = ratelimit.RateLimiter(10)
+        limiter.acquire()
+        time.sleep(0.19)
+        limiter.acquire()
+        start = time.monotonic()
+        limiter.acquire()
+        self.assertGreaterEqual(time.monotonic() - start, 0.09, 'Slots missed while idle should not be granted in a burst')
+
+    def test_weighted_share(self):
+        limiter = ratelimit.RateLimiter(50, lanes = {'interactive': 3, 'background': 1})
+        order = []
+        lock = threading.Lock()
+
+        def acquire(lane):
+            limiter.acquire(lane = lane)
+            with lock:
+                order.append(lane)
+
+        limiter.acquire()
+        threads = [threading.Thread(target = acquire, args = (lane,)) for lane in ['background'] * 8 + ['interactive'] * 8]
+        for t in threads:
+            t.start()
+            time.sleep(0.001)
+        for t in threads:
+            t.join()
+        # while both lanes are backlogged, slots are shared 3:1
+        self.assertGreaterEqual(order[:8].count('interactive'), 5)
+        self.assertEqual(order[-1], 'background')
+
+class PagingTests(unittest.TestCase):
+    @classmethod
+    def setUpClass(cls):
+        cls.server = MockServer().start()
+        cls.api = d2api.APIWrapper(api_key = 'mock', base_url = cls.server.url, requests_per_second = -1)
+
+    @classmethod
+    def tearDownClass(cls):
+        cls.server.stop()
+
+    def test_match_history_pages(self):
+        pages = list(self.api.iter_match_history(matches_requested = 100))
+        match_ids = [m['match_id'] for p in pages for m in p['matches']]
+        self.assertEqual(len(pages), 5, 'Every page of the history should be fetched')
+        self.assertEqual(len(set(match_ids)), 500, 'Pages should not overlap')
+
+    def test_sequence_num_pages(self):
+        pages = list(self.api.iter_match_history_by_sequence_num(100, prefetch = 0, max_pages = 3, matches_requested = 5))
+        seq_nums = [m['match_seq_num'] for p in pages for m in p['matches']]
+        self.assertEqual(seq_nums, list(range(100, 115)), 'Pages should continue from the last sequence number')
+
+    def test_filtered_pages(self):
+        ranked = filters.all_of(filters.lobby_type(7), filters.no_leavers)
+        pages = list(self.api.iter_match_history_by_sequence_num(100, prefetch = 0, max_pages = 4, matches_requested = 5, where = ranked))
+        matches = [m for p in pages for m in p['matches']]
+        self.assertEqual(len(pages), 4, 'Pages emptied by the filter should still be followed')
+        self.assertEqual(pages[-1].scanned[-1][1], 119)
+        self.assertTrue(matches and all(m['lobby_type'] == 7 for m in matches))
+
+    def test_backpressure(self):
+        pages = self.api.iter_match_history_by_sequence_num(1, prefetch = 3, max_buffered_bytes = 1, matches_requested = 2)
+        next(pages)
+        time.sleep(0.2)
+        self.assertEqual(pages.fetched_pages, 2, 'Fetching should pause once the byte budget is used')
+        pages.close()
+
+    def test_close_during_fetch(self):
+        with MockServer(latency = 0.2) as server:
+            api = d2api.APIWrapper(api_key = 'mock', base_url = server.url, requests_per_second = -1)
+            pages = api.iter_match_history_by_sequence_num(1, prefetch = 2, matches_requested = 2)
+            next(pages)
+            time.sleep(0.05)
+            pages.close()
+            time.sleep(0.3)
+            self.assertEqual((len(pages._buffer), pages.buffered_bytes), (0, 0), 'Pages fetched after closing should be dropped')
+            with self.assertRaises(StopIteration):
+                next(pages)
+
+class PlayerProfileTests(unittest.TestCase):
+    def test_incremental_update(self):
+        with MockServer() as server:
+            api = d2api.APIWrapper(api_key = 'mock', base_url = server.url, requests_per_second = -1)
+            builder = PlayerProfileBuilder(api, 76561198088874284)
+            builder.state['last_match_id'] = 4176987886 - 5
+
+            self.assertEqual(builder.update(), 5, 'Only matches newer than the last update should be aggregated')
+            self.assertEqual(builder.update(), 0, 'An up to date profile should not fetch match details')
+            self.assertEqual(server.requests.get('/IDOTA2Match_570/GetMatchDetails/v001'), 5)
+
+            profile = builder.profile()
+            self.assertEqual(profile['matches'], 5)
+            self.assertEqual(sum(h['matches'] for h in profile['heroes'].values()), 5)
+
+class LeagueTrackerTests(unittest.TestCase):
+    @classmethod
+    def setUpClass(cls):
+        cls.server = MockServer(live_update_interval = 0).start()
+        cls.api = d2api.APIWrapper(api_key = 'mock', base_url = cls.server.url, requests_per_second = -1)
+
+    @classmethod
+    def tearDownClass(cls):
+        cls.server.stop()
+
+    def test_live_league(self):
+        game = self.api.get_live_league_games()['games'][0]
+        matches = []
+        tracker = LeagueTracker(self.api, [game['league_id']], on_match = matches.append)
+
+        self.assertEqual(tracker.poll(now = 0), 15, 'Live leagues should be polled at the fastest interval')
+        self.assertIn(game['match_id'], tracker.live)
+        self.assertEqual(len(tracker.series), 1, 'Series should be tracked from live games')
+        self.assertEqual(matches, [], 'Matches finished before tracking should not be fetched')
+
+        # two more matches finish
+        league_id = game['league_id']
+        tracker._last_match_id[league_id] -= 2
+        tracker.live[1] = game
+        tracker.poll(now = 15)
+        self.assertEqual(len(matches), 2, 'Newly finished matches should be fetched once')
+        tracker.poll(now = 30)
+        self.assertEqual(len(matches), 2, 'Newly finished matches should be fetched once')
+
+    def test_idle_backoff(self):
+        tracker = LeagueTracker(self.api, [-1], live_interval = (15, 120))
+        now = 0
+        for _ in range(6):
+            now += tracker.poll(now = now)
+        self.assertEqual(tracker._schedules['live'].interval, 120, 'Idle leagues should be polled less often')
+
+class CommandLineTests(unittest.TestCase):
+    @classmethod
+    def setUpClass(cls):
+        cls.server = MockServer(api_key = 'mock').start()
+        cls.options = ['--key', 'mock', '--base-url', cls.server.url, '--rate', '-1']
+
+    @classmethod
+    def tearDownClass(cls):
+        cls.server.stop()
+
+    def setUp(self):
+        self.tmp = tempfile.mkdtemp()
+
+    def tearDown(self):
+        shutil.rmtree(self.tmp)
+
+    def path(self, name):
+        return os.path.join(self.tmp, name)
+
+    def test_crawl_and_export(self):
+        crawl = self.options + ['crawl-seq', '--matches-requested', '5', '--max-pages', '2', '--state', self.path('state.json'),
+                                '--fields', 'match_id', 'lobby_type', '-o', self.path('matches.ndjson')]
+        with mock.patch('sys.stderr'):
+            cli.main(crawl + ['--start', '100'])
+            cli.main(crawl)
+        with open(self.path('state.json')) as f:
+            self.assertEqual(json.load(f), {'start_at_match_seq_num': 120}, 'The crawl should resume from its state')
+
+        cli.main(['export', self.path('matches.ndjson'), '--format', 'sqlite', '-o', self.path('matches.db')])
+        con = sqlite3.connect(self.path('matches.db'))
+        rows = con.execute('SELECT match_id, lobby_type FROM matches ORDER BY match_id').fetchall()
+        con.close()
+        self.assertEqual([r[0] for r in rows], list(range(500000100, 500000120)))
+
+    def test_fetch_details(self):
+        with open(self.path('ids.txt'), 'w') as f:
+            f.write('1\n2\n\n3\n')
+        with mock.patch('sys.stderr'):
+            cli.main(self.options + ['fetch-details', self.path('ids.txt'), '--fields', 'match_id', 'winner', '-o', self.path('details.ndjson')])
+        with open(self.path('details.ndjson')) as f:
+            details = [json.loads(line) for line in f]
+        self.assertEqual(sorted(d['match_id'] for d in details), [1, 2, 3])
+        self.assertEqual(set(details[0]), {'match_id', 'winner'})
@@ -1,11 +1,23 @@
 #!/usr/bin/env python
 # -*- coding: utf-8 -*-
+import json
 import os
+import pickle
+import shutil
+import tempfile
 import unittest
+from unittest import mock
 
 import d2api
+from d2api.src import benchmark
 from d2api.src import entities
+from d2api.src import filters
+from d2api.src import polling
 from d2api.src import errors as d2errors
+from d2api.src import samples
+from d2api.src import schema
+from d2api.src import timeseries
+from d2api.src import util
 from d2api.src import wrappers
 from d2api import update_local_data
 
@@ -88,6 +100,17 @@ class EntityTests(unittest.TestCase):
         self.assertTrue(not acct1, "not {0} should be True".format(acct1))
         self.assertFalse(not acct2, "not {0} should be False".format(acct2))
 
+    def test_lookup_by_name(self):
+        self.assertEqual(entities.Item.by_name('bkb'), entities.Item.by_name('item_black_king_bar'), 'Items should be found by alias')
+        self.assertEqual(entities.Item.by_name('BLINK DAGGER'), entities.Item(1), 'Lookups should ignore case')
+        self.assertEqual(entities.Hero.by_name('antimage'), entities.Hero(1), 'Prefixes of internal names should be optional')
+        self.assertIsNone(entities.Ability.by_name('not_an_ability'), 'Unknown names should return None')
+
+    def test_lookup_by_prefix(self):
+        heroes = entities.Hero.by_prefix('anti')
+        self.assertIn(entities.Hero(1), heroes, 'Heroes should be found by name prefix')
+        self.assertEqual(len(entities.Item.by_prefix('b', limit = 3)), 3, 'Prefix lookups should respect the limit')
+
 
 class DtypeTests(unittest.TestCase):
     def test_steam_32_64(self):
@@ -96,4 +119,242 @@ class DtypeTests(unittest.TestCase):
         account1 = entities.SteamAccount(account_id = steam64)
         account2 = entities.SteamAccount(account_id = steam32)
         self.assertEqual(account1, account2,
-        'SteamAccount created with 32 Bit or 64 Bit SteamID should be indistinguishable')
\ No newline at end of file
+        'SteamAccount created with 32 Bit or 64 Bit SteamID should be indistinguishable')
+
+    def test_steam_account_immutable(self):
+        account = entities.SteamAccount(123456)
+        self.assertIs(account, entities.SteamAccount(123456), 'Equal account ids should share an instance')
+        with self.assertRaises(TypeError):
+            account['id32'] = 1
+        self.assertEqual(pickle.loads(pickle.dumps(account)), account, 'SteamAccount should survive pickling')
+
+    def test_steam_ids_batch(self):
+        steam32 = [123456, None, 76561197960265728 + 42]
+        self.assertEqual(entities.steam_ids_to_32(steam32), [123456, None, 42])
+        self.assertEqual(entities.steam_ids_to_64(steam32), [76561197960265728 + 123456, None, 76561197960265728 + 42])
+
+    @unittest.skipIf(entities.numpy is None, 'numpy is not installed')
+    def test_steam_ids_array(self):
+        ids = entities.numpy.array([123456, 76561197960265728 + 42])
+        self.assertEqual(entities.steam_ids_to_32(ids).tolist(), [123456, 42])
+        self.assertEqual(entities.steam_ids_to_64(ids).tolist(), [76561197960265728 + 123456, 76561197960265728 + 42])
+
+class BenchmarkTests(unittest.TestCase):
+    def test_synthetic_match_details(self):
+        res = wrappers.MatchDetails(samples.match_details_text(match_id = 1234))
+        self.assertEqual(len(res['players']), 10, 'Synthetic match should contain 10 players')
+        self.assertEqual(res['match_id'], 1234, 'Synthetic match should keep its match_id')
+
+    def test_report_content(self):
+        report = benchmark.run([('decode', util.decode_json, lambda: '{"a": 1}', 1)], iterations = 5)
+        result = report['results']['decode']
+        self.assertTrue(result['p50'] <= result['p99'], 'Latency percentiles should be ordered')
+        self.assertEqual(benchmark.compare(report, report), {}, 'A report should not regress against itself')
+
+class RawBodyTests(unittest.TestCase):
+    def test_bytes_response(self):
+        text = samples.match_details_text(match_id = 1234)
+        res1 = wrappers.MatchDetails(text)
+        res2 = wrappers.MatchDetails(memoryview(text.encode('utf-8')))
+        self.assertEqual(res1, res2, 'Parsing bytes-like bodies should match parsing text')
+        self.assertEqual(wrappers.MatchDetails(text.encode('utf-8')).raw_json, text, 'raw_json should be returned as text')
+
+    def test_discard_raw_json(self):
+        res = wrappers.MatchDetails.from_json(util.decode_json(samples.match_details_text()))
+        self.assertIsNone(res.raw_json, 'raw_json should not be kept unless provided')
+
+class LocalDataSyncTests(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.mkdtemp()
+        shutil.copytree(os.path.join(os.path.dirname(entities.__file__), '..', 'ref'), os.path.join(self.tmp, 'ref'))
+        os.makedirs(os.path.join(self.tmp, 'src'))
+        self.here = mock.patch.object(entities, '_here', os.path.join(self.tmp, 'src'))
+        self.here.start()
+
+    def tearDown(self):
+        self.here.stop()
+        shutil.rmtree(self.tmp)
+        entities._reload()
+
+    def test_only_changed_files_downloaded(self):
+        heroes = json.dumps({'1': {'hero_name': 'npc_dota_hero_updated'}}).encode('utf-8')
+        remote_meta = json.loads(open(entities._local_path('meta.json')).read())
+        remote_meta['version'] = 'next'
+        remote_meta['checksums']['heroes.json'] = entities._checksum(heroes)
+
+        downloaded = []
+        def load_remote_file(file_name):
+            downloaded.append(file_name)
+            return heroes
+
+        with mock.patch.object(entities, '_load_remote_json', lambda f: remote_meta), \
+             mock.patch.object(entities, '_load_remote_file', load_remote_file):
+            self.assertEqual(update_local_data(), remote_meta)
+
+        self.assertEqual(downloaded, ['heroes.json'], 'Only files with a changed checksum should be downloaded')
+        self.assertEqual(entities.Hero(1)['hero_name'], 'npc_dota_hero_updated', 'Updated data should be reloaded')
+        self.assertEqual(json.loads(open(entities._local_path('meta.json')).read())['version'], 'next')
+
+    def test_unreachable_remote_keeps_data(self):
+        with mock.patch.object(entities, '_load_remote_json', lambda f: {}):
+            update_local_data()
+        self.assertTrue(os.path.exists(entities._local_path('heroes.json')), 'Local data should be kept if the remote is unavailable')
+
+class PatchVersionTests(unittest.TestCase):
+    def setUp(self):
+        self.history = mock.patch.object(entities, '_history', {'7.20': {'items': {'1': {'item_cost': '2150', 'item_aliases': [], 'item_name': 'item_blink'}}}})
+        self.history.start()
+
+    def tearDown(self):
+        self.history.stop()
+
+    def test_patch_for_time(self):
+        self.assertEqual(entities.patch_for_time(1545000000), '7.20', 'Patch 7.20 was live in December 2018')
+        self.assertEqual(entities.patch_for_time(1600000000), '7.21', 'The latest patch should be used after its release')
+
+    def test_item_versions(self):
+        self.assertEqual(entities.Item(1, patch = '7.20')['item_cost'], '2150', 'Overridden data should be used for older patches')
+        self.assertEqual(entities.Item(1, timestamp = 1600000000)['item_cost'], entities.all_items['1']['item_cost'])
+        self.assertEqual(entities.Item(2, patch = '7.20'), entities.Item(2), 'Data without overrides should be shared with the latest patch')
+
+    def test_match_details_patch(self):
+        payload = samples.match_details(match_id = 1234)
+        payload['start_time'] = 1545000000
+        payload['players'][0]['item_0'] = 1
+        res = wrappers.MatchDetails(samples.dumps({'result': payload}))
+        self.assertEqual(res['players'][0]['inventory'][0]['item_cost'], '2150', 'Matches should resolve items as of their patch')
+
+class PollSchedulerTests(unittest.TestCase):
+    def simulate(self, scheduler, duration):
+        self.now = 0
+        while self.now < duration:
+            self.now += max(scheduler.poll(now = self.now), 0.01)
+
+    def test_learns_update_period(self):
+        # updated every 5 seconds
+        fetch = lambda: {'game_list': [{'last_update_time': 1547000000 + int((self.now - 1.3) // 5) * 5}]}
+        scheduler = polling.PollScheduler(requests_per_second = None)
+        scheduler.watch('top', fetch, version = polling.top_live_game_version)
+        self.simulate(scheduler, 600)
+
+        stats = scheduler.stats()['top']
+        self.assertGreaterEqual(stats['updates'], 110, 'Most updates should be observed')
+        self.assertLess(stats['polls'], 2 * stats['updates'], 'Polls should follow the update period')
+
+    def test_request_budget(self):
+        polls = []
+        scheduler = polling.PollScheduler(requests_per_second = 0.5, initial_interval = 1)
+        for key in range(4):
+            scheduler.watch(key, lambda: polls.append(self.now))
+        self.simulate(scheduler, 60)
+        self.assertLessEqual(len(polls), 31, 'Polls should not exceed the request budget')
+
+class BatchParsingTests(unittest.TestCase):
+    def test_parse_many(self):
+        bodies = [samples.match_details_text(match_id).encode('utf-8') for match_id in (1, 2, 3)]
+        parsed = wrappers.parse_many(wrappers.MatchDetails, bodies)
+        self.assertEqual(parsed, [wrappers.MatchDetails(b) for b in bodies], 'Batches should parse like single responses')
+
+        parsed[0]['players'][0]['hero']['hero_name'] = 'changed'
+        self.assertNotEqual(parsed[1]['players'][0]['hero']['hero_name'], 'changed', 'Shared entities should be copies')
+
+        columns = wrappers.parse_many(wrappers.MatchDetails, bodies, columnar = True)
+        self.assertEqual(columns['match_id'], [1, 2, 3])
+
+class SchemaTests(unittest.TestCase):
+    def test_generated_parser(self):
+        player = {'account_id': 4294967295, 'player_slot': 128, 'hero_id': 1, 'item_0': 1, 'kills': 3,
+            'ability_upgrades': [{'ability': 5003, 'time': 100, 'level': 1}]}
+        parsed = wrappers.PlayerUnit(player)
+        self.assertEqual(parsed['side'], 'dire')
+        self.assertEqual(parsed['inventory'][0]['item_name'], 'item_blink')
+        self.assertEqual(len(parsed['inventory'] + parsed['backpack']), 9)
+        self.assertEqual(str(parsed['ability_upgrades'][0]['ability']['ability_id']), '5003')
+        self.assertNotIn('item_0', parsed, 'Source keys should be consumed')
+        self.assertIn("pop('item_5', None)", wrappers.PlayerUnit._parse_schema.source, 'Item slots should be unrolled')
+
+    def test_derived_fields(self):
+        summary = wrappers.LiveGameSummary({'building_state': 5 + (3 << 11), 'team_name_dire': 'B', 'team_id_dire': 2})
+        self.assertEqual((summary['radiant_towers']['top_t1'], summary['radiant_towers']['top_t2'], summary['radiant_towers']['top_t3']), (1, 0, 1))
+        self.assertEqual((summary['dire_towers']['top_t1'], summary['dire_towers']['top_t3']), (1, 0))
+        self.assertEqual(dict(summary['dire_team']), {'team_name': 'B', 'team_id': 2})
+        self.assertNotIn('building_state', summary, 'Sources of derived attributes should be dropped')
+
+        team = wrappers.TeamLive({'players': [{}, {}], 'abilities_0': [{'ability_id': 5003}], 'abilities_1': [], 'tower_state': 1})
+        self.assertEqual(len(team['players'][0]['abilities']), 1)
+        self.assertNotIn('abilities_0', team)
+        self.assertEqual(team['buildings']['top_t1'], 1)
+
+        details = wrappers.MatchDetails(samples.match_details_text(1))
+        self.assertEqual([pb['order'] for pb in details['picks_bans']], sorted(pb['order'] for pb in details['picks_bans']))
+        self.assertIn(details['winner'], ('radiant', 'dire'))
+        self.assertEqual(schema.describe(wrappers.MatchDetails)['list(players_minimal)'], schema.describe(wrappers.PlayerMinimal))
+
+    def test_describe(self):
+        structure = schema.describe(wrappers.MatchHistory)
+        self.assertEqual(list(structure), ['list(matches)', 'num_results', 'results_remaining', 'status', 'total_results'])
+        self.assertEqual(structure['list(matches)']['list(players)']['steam_account'], {'id32': {}, 'id64': {}})
+
+        live = schema.describe(wrappers.LiveGameSummary)
+        self.assertEqual(live['dire_team'], {'team_id': {}, 'team_name': {}}, 'Derived objects should only list the attributes they get')
+        self.assertNotIn('barracks_status', live['radiant_towers'])
+
+    def test_projection(self):
+        body = samples.match_details_text(1)
+        projected = schema.project(wrappers.MatchDetails, ['start_time', 'players[].kills'])
+        self.assertIs(projected, schema.project(wrappers.MatchDetails, ['players[].kills', 'start_time']), 'Projections should be cached')
+        self.assertEqual(wrappers.parse_many(wrappers.MatchDetails, [body], fields = ['start_time', 'players[].kills']), [projected(body)])
+
+        full = wrappers.MatchDetails(body)
+        self.assertEqual(projected(body)['players'], [{'kills': p['kills']} for p in full['players']])
+        self.assertIs(pickle.loads(pickle.dumps(projected)), projected, 'Projections should be picklable')
+        self.assertEqual(pickle.loads(pickle.dumps(projected(body))), projected(body))
+        with self.assertRaises(ValueError):
+            schema.project(wrappers.MatchDetails, ['players[].unknown'])
+        with self.assertRaises(ValueError):
+            schema.project(wrappers.MatchDetails, ['winner.side'])
+
+class FilterTests(unittest.TestCase):
+    def test_parse_many_where(self):
+        matches = [samples.match_details(match_id) for match_id in range(1, 21)]
+        bodies = [samples.dumps({'result': m}) for m in matches]
+        parsed = wrappers.parse_many(wrappers.MatchDetails, bodies, where = filters.no_leavers)
+        self.assertEqual([m['match_id'] for m in parsed], [m['match_id'] for m in matches if not wrappers.MatchDetails(samples.dumps({'result': m})).has_leavers()])
+
+        page = samples.dumps({'result': {'status': 1, 'matches': matches}})
+        ranked = filters.all_of(filters.lobby_type(7), filters.human_players(10))
+        history = wrappers.parse_many(wrappers.MatchHistory, [page], where = ranked)[0]
+        self.assertEqual([m['match_id'] for m in history['matches']], [m['match_id'] for m in matches if m['lobby_type'] == 7])
+        self.assertEqual(len(history.scanned), 20)
+
+        filtered = wrappers.filtered(wrappers.MatchHistory, ranked)
+        self.assertEqual(ranked, filters.all_of(filters.lobby_type(7), filters.human_players(10)))
+        self.assertIs(pickle.loads(pickle.dumps(filtered)), filtered, 'Filtered classes should be picklable')
+
+        with self.assertRaises(ValueError):
+            wrappers.filtered(wrappers.MatchDetails, filters.no_leavers)
+
+class TimeSeriesTests(unittest.TestCase):
+    def test_record_live_games(self):
+        game = wrappers.Game(util.decode_json(samples.dumps(samples.live_league_game())))
+        recorder = timeseries.LiveRecorder()
+        for i in range(100):
+            game['scoreboard']['duration'] = i * 5.5
+            for p in game['scoreboard']['radiant']['players']:
+                p['net_worth'] += 100
+            self.assertEqual(recorder.record([game]), 1)
+        self.assertEqual(recorder.record([game]), 0, 'Snapshots that do not advance game time should be skipped')
+
+        series = recorder[game['match_id']]
+        times, lead = series.lead('net_worth', 110, 165)
+        self.assertEqual(times, [110, 115, 121, 126, 132, 137, 143, 148, 154, 159, 165])
+        self.assertEqual(lead[1] - lead[0], 500, 'Team values should be summed over players')
+        self.assertLess(series.nbytes, 100 * 10 * 15, 'Small changes should be stored in narrow arrays')
+
+    def test_column_widening(self):
+        column = timeseries.DeltaColumn()
+        values = [5, 100, -20, 40000, 2 ** 40]
+        for v in values:
+            column.append(v)
+        self.assertEqual(column.values(), values)
+        self.assertEqual(column.typecode, 'q')